@@ -0,0 +1,103 @@
+import json
+import os
+
+
+"""
+Append-only journal shared by the scripts that interact with the databases (Create_Tables_or_SPs.py, Get_Types_and_Lenght.py).
+
+Each finished unit of work (a statement executed in SQL Server, a query described in Oracle) is written as one JSON line
+as soon as it finishes, so:
+    - Saving progress costs one line, instead of rewriting the whole Excel file
+    - After a crash the script can be run again with --resume: the work already in the journal is skipped
+"""
+
+
+
+class CheckpointJournal:
+    """
+    Journal in JSON Lines format: one record per line, with a 'key' identifying the unit of work.
+    """
+
+
+    def __init__(self, journal_path: str, resume: bool = False) -> None:
+        """
+        Opens the journal.
+
+        Args:
+            journal_path (str): Path of the .jsonl file.
+            resume (bool): Keep the records of the previous run (otherwise the journal starts empty).
+        """
+
+        self.journal_path = journal_path
+        self.entries = {}
+
+        if resume and os.path.exists(journal_path):
+            self.entries = self.read(journal_path)
+            print(f"📒 Resuming from {journal_path}: {len(self.entries)} records")
+
+        self.file = open(journal_path, "a" if resume else "w", encoding="utf-8")
+        if resume and self.file.tell() > 0 and not self.ends_with_newline(journal_path):
+            self.file.write("\n") # Cierra la línea incompleta
+
+
+
+    @staticmethod
+    def read(journal_path: str) -> dict:
+        """
+        Reads a journal. The last line may be incomplete if the process was killed while writing it: it is ignored.
+
+        Returns:
+            dict: {key: last record of the key}
+        """
+
+        entries = {}
+        with open(journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[record["key"]] = record
+        return entries
+
+
+
+    @staticmethod
+    def ends_with_newline(journal_path: str) -> bool:
+        with open(journal_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+
+
+    def get(self, key: str) -> dict:
+        """
+        Returns the last record of a key (None if it isn't in the journal).
+        """
+        return self.entries.get(key)
+
+
+
+    def record(self, key: str, **fields) -> dict:
+        """
+        Appends a record to the journal (written to disk straight away).
+        """
+
+        record = {"key": key, **fields}
+        self.file.write(json.dumps(record, default=str) + "\n")
+        self.file.flush()
+        self.entries[key] = record
+        return record
+
+
+
+    def close(self) -> None:
+        self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -1,9 +1,11 @@
 import cx_Oracle
 import pandas as pd
-import time
+import argparse
+import hashlib
 import os
 
 from Utils.params import *
+from Code_to_interact_with_DBs.Checkpoint_Journal import CheckpointJournal
 
 
 """
@@ -13,11 +15,6 @@ Objective: Fill the columns TIPO, SIZE, PRECISION and SCALE in the Excel file
 This python script isn't part of the package, it's a standalone script to be run in the remote computer
 """
 
-# Load the Excel file
-file_path = DATA_DICT_FILE
-output_file_path = F'updated_{file_path}'
-
-
 # Functions to connect to Oracle databases
 def get_origin_1_connection():
     dsn_tns = cx_Oracle.makedsn(ORIGIN_1_HOST_NAME, ORIGIN_1_PORT, service_name=ORIGIN_1_SERVICE_NAME)
@@ -29,148 +26,395 @@ def get_origin_2_connection():
     conexion = cx_Oracle.connect(user=ORIGIN_2_USER, password=ORIGIN_2_PASSWORD, dsn=dsn_tns)
     return conexion
 
-def execute_query(cursor, query):
-    cursor.execute(query)
-    return cursor.fetchall(), cursor.description
+def describe_query(cursor, query):
+    """
+    Returns the description (name, type, size, precision, scale...) of the columns of a query, without moving any row:
+    the query is wrapped in a 'WHERE 1=0' filter and nothing is fetched.
+    """
+    metadata_query = f"SELECT * FROM (\n{query.strip().rstrip(';')}\n) WHERE 1=0"
+    cursor.execute(metadata_query)
+    return cursor.description
 
 
-df = pd.read_excel(file_path)
+class OracleSessionManager:
+    """
+    Keeps one long-lived session per origin for the whole run, instead of one connection per query.
+    If a call fails and the session doesn't answer a ping anymore, it reconnects and repeats the call once.
+    """
 
-# Ensure the TIPO and Longitud columns are of type object to store strings
-df[COLUMNA_TIPO] = df[COLUMNA_TIPO].astype('object')
-df[COLUMNA_LONGITUD] = df[COLUMNA_LONGITUD].astype('object')
-df[COLUMNA_PRECISION] = df[COLUMNA_PRECISION].astype('object')
-df[COLUMNA_ESCALA] = df[COLUMNA_ESCALA].astype('object')
+    def __init__(self, connectors=None):
+        """
+        Args:
+            connectors (dict): {origin name: function returning a new connection}. Defaults to the two origins of params.
+        """
+        self.connectors = connectors if connectors is not None else {ORIGIN_1_NAME: get_origin_1_connection, ORIGIN_2_NAME: get_origin_2_connection}
+        self.sessions = {}
 
-print(df.head())
 
+    def get_session(self, origen):
+        if origen not in self.connectors:
+            raise ValueError(f"Unknown origin: {origen}")
+        if origen not in self.sessions:
+            self.sessions[origen] = self.connectors[origen]()
+        return self.sessions[origen]
 
 
+    def is_alive(self, origen):
+        try:
+            self.sessions[origen].ping()
+            return True
+        except Exception:
+            return False
 
-# Dictionary to cache query results
-query_cache = {}
 
-# Process each row in the DataFrame
-total_rows = len(df)
-for index, row in df.iterrows():
-    
-    # Save the file every X iterations to avoid losing progress
-    if (index + 1) % 600 == 0:
-        interim_file_path = f"{output_file_path[:-5]}_v{(index + 1) // 10}.xlsx"
-        df.to_excel(interim_file_path, index=False)
-        print(f"💾 Interim save: {interim_file_path}")
-        print("⏳ Taking a short break...\n")
-        time.sleep(2)
-    
-    
-    match = 0
-    
-    tipo = row[COLUMNA_TIPO]
-    origen = row['ORIGEN']
-    query = row['QUERY']
-    campo_origen = row['CAMPO ORIGEN']
-    
-    size = row[COLUMNA_LONGITUD]
-    precision = row[COLUMNA_PRECISION]
-    scale = row[COLUMNA_ESCALA]
-    
-    
-    
-    
-    if pd.notna(tipo):
-        
-        if 'CLOB'in str(tipo):
-            continue 
-    
-        if pd.notna(size): # If the size is already filled...
-                
-            if not 'NUMBER' in str(tipo).upper(): # If it's not a number, skip to the next row
-                continue
+    def reconnect(self, origen):
+        session = self.sessions.pop(origen, None)
+        if session is not None:
+            try:
+                session.close()
+            except Exception:
+                pass
+        print(f"🔌 Reconnecting to {origen}...")
+        return self.get_session(origen)
 
-            else:
-                if pd.notna(precision) and pd.notna(scale): # If precision and scale are already filled, skip to the next row
-                    continue
-                
-                if size == 127: # Bug: of size is 127, skip to the next row
-                    continue
-       
 
+    def run(self, origen, function):
+        """
+        Calls function(cursor) with a cursor of the session of the origin.
+        """
+        session = self.get_session(origen)
+        try:
+            return self._run_with_cursor(session, function)
+        except Exception:
+            if self.is_alive(origen): # Error de la query, no de la sesión
+                raise
+        return self._run_with_cursor(self.reconnect(origen), function)
 
-    
-    print(f"Processing {campo_origen} at row {index} of {total_rows}...")
-    
-    if query not in query_cache:
-        # Connect to the appropriate database
-        if origen == ORIGIN_1_NAME:
-            connection = get_origin_1_connection()
-        elif origen == ORIGIN_2_NAME:
-            connection = get_origin_2_connection()
-
-        
-        cursor = connection.cursor()
-        
-        # Execute the query
-                    # Execute the query
+
+    @staticmethod
+    def _run_with_cursor(session, function):
+        cursor = session.cursor()
         try:
-            results, description = execute_query(cursor, query)
+            return function(cursor)
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+
+    def close(self):
+        for session in self.sessions.values():
+            try:
+                session.close()
+            except Exception:
+                pass
+        self.sessions = {}
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def get_query_description(query, origen, query_cache, sessions):
+    """
+    Returns the description of a query (cached: each query is described only once).
+    """
+    if query in query_cache:
+        return query_cache[query]
+
+    description = sessions.run(origen, lambda cursor: describe_query(cursor, query))
+
+    # Cache the results
+    query_cache[query] = description
+    return description
+
+
+# Bulk discovery: ALL_TAB_COLUMNS of all the tables of an origin, in one round trip (chunks of CATALOG_TABLES_PER_QUERY tables)
+CATALOG_TABLES_PER_QUERY = 500
+
+# DATA_TYPE of ALL_TAB_COLUMNS --> name of the type in cursor.description (what the rest of the project expects)
+CATALOG_TYPE_NAMES = {
+    'NUMBER': 'DB_TYPE_NUMBER', 'FLOAT': 'DB_TYPE_NUMBER', 'INTEGER': 'DB_TYPE_NUMBER',
+    'VARCHAR2': 'DB_TYPE_VARCHAR', 'NVARCHAR2': 'DB_TYPE_NVARCHAR', 'CHAR': 'DB_TYPE_CHAR', 'NCHAR': 'DB_TYPE_NCHAR',
+    'DATE': 'DB_TYPE_DATE', 'TIMESTAMP': 'DB_TYPE_TIMESTAMP', 'TIMESTAMP WITH TIME ZONE': 'DB_TYPE_TIMESTAMP_TZ',
+    'TIMESTAMP WITH LOCAL TIME ZONE': 'DB_TYPE_TIMESTAMP_LTZ',
+    'CLOB': 'DB_TYPE_CLOB', 'NCLOB': 'DB_TYPE_NCLOB', 'BLOB': 'DB_TYPE_BLOB', 'RAW': 'DB_TYPE_RAW', 'LONG': 'DB_TYPE_LONG',
+    'BINARY_FLOAT': 'DB_TYPE_BINARY_FLOAT', 'BINARY_DOUBLE': 'DB_TYPE_BINARY_DOUBLE', 'ROWID': 'DB_TYPE_ROWID',
+}
+CATALOG_TEXT_TYPES = ['VARCHAR2', 'NVARCHAR2', 'CHAR', 'NCHAR']
+
+# SIZE = display size of cursor.description (not DATA_LENGTH): characters for the text types, bytes for RAW,
+# p + 1 (+ s + 1 with decimals) for NUMBER (127 without precision), 23 for DATE / TIMESTAMP, empty for the rest
+CATALOG_DISPLAY_SIZES = {'DATE': 23, 'TIMESTAMP': 23}
+
+
+def normalize_field_name(values):
+    """
+    Normalizes the names of the fields to compare them with the columns of Oracle (same rules as the description loop).
+    """
+    return values.astype(str).str.replace(",", "").str.lower().str.strip()
+
+
+def rows_to_discover(df):
+    """
+    Vectorized version of the checks of the main loop: True for the rows whose TIPO / SIZE / PRECISION / SCALE are still missing.
+    """
+    tipo = df[COLUMNA_TIPO].astype(str).str.upper()
+    tipo_filled = df[COLUMNA_TIPO].notna()
+    size_filled = df[COLUMNA_LONGITUD].notna()
+    is_number = tipo.str.contains('NUMBER')
+    number_done = (df[COLUMNA_PRECISION].notna() & df[COLUMNA_ESCALA].notna()) | (pd.to_numeric(df[COLUMNA_LONGITUD], errors='coerce') == 127)
+
+    done = tipo_filled & (tipo.str.contains('CLOB') | (size_filled & (~is_number | number_done)))
+    return ~done
+
+
+def query_all_tab_columns(cursor, owner_tables):
+    """
+    Reads the columns of a list of (OWNER, TABLE_NAME) from ALL_TAB_COLUMNS (names passed as bind variables).
+    """
+    pairs = ", ".join(f"(:o{i}, :t{i})" for i in range(len(owner_tables)))
+    binds = {}
+    for i, (owner, table) in enumerate(owner_tables):
+        binds[f"o{i}"] = owner
+        binds[f"t{i}"] = table
+
+    cursor.execute(f"""SELECT OWNER, TABLE_NAME, COLUMN_NAME, DATA_TYPE, DATA_LENGTH, CHAR_LENGTH, DATA_PRECISION, DATA_SCALE
+                       FROM ALL_TAB_COLUMNS
+                       WHERE (OWNER, TABLE_NAME) IN ({pairs})""", binds)
+    return cursor.fetchall()
+
+
+def harvest_table_columns(sessions, origen, owner_tables):
+    """
+    Returns the columns of all the tables of an origin (OWNER, TABLE_NAME, COLUMN_NAME) with their TIPO, SIZE, PRECISION and SCALE,
+    as cursor.description would give them.
+    """
+    rows = []
+    for start in range(0, len(owner_tables), CATALOG_TABLES_PER_QUERY):
+        chunk = owner_tables[start:start + CATALOG_TABLES_PER_QUERY]
+        rows += sessions.run(origen, lambda cursor: query_all_tab_columns(cursor, chunk))
+
+    catalog = pd.DataFrame(rows, columns=['OWNER', 'TABLE_NAME', 'COLUMN_NAME', 'DATA_TYPE', 'DATA_LENGTH', 'CHAR_LENGTH', 'DATA_PRECISION', 'DATA_SCALE'])
+    catalog['ORIGEN'] = origen
+
+    data_type = catalog['DATA_TYPE'].astype(str).str.replace(r"\(\d+\)", "", regex=True)
+    is_number = data_type.isin(['NUMBER', 'FLOAT', 'INTEGER'])
+    no_precision = is_number & catalog['DATA_PRECISION'].isna()
+
+    catalog[COLUMNA_TIPO] = data_type.map(CATALOG_TYPE_NAMES).fillna("DB_TYPE_" + data_type)
+
+    # Precisión y escala del driver: NUMBER sin precisión --> precision 0 y scale -127 (Bug del 127), INTEGER --> 38 y 0, FLOAT --> scale -127
+    precision = pd.to_numeric(catalog['DATA_PRECISION'], errors='coerce').where(~no_precision, catalog['DATA_SCALE'].notna() * 38)
+    scale = pd.to_numeric(catalog['DATA_SCALE'], errors='coerce').where(catalog['DATA_SCALE'].notna() | ~is_number, -127)
+    catalog[COLUMNA_PRECISION] = precision
+    catalog[COLUMNA_ESCALA] = scale
+
+    # Display size, como cursor.description[2] (ver CATALOG_DISPLAY_SIZES)
+    number_size = (precision + 1 + (scale + 1).where(scale > 0, 0)).where(precision > 0, 127)
+    catalog[COLUMNA_LONGITUD] = data_type.map(CATALOG_DISPLAY_SIZES)
+    catalog[COLUMNA_LONGITUD] = catalog[COLUMNA_LONGITUD].where(~data_type.isin(CATALOG_TEXT_TYPES), catalog['CHAR_LENGTH'])
+    catalog[COLUMNA_LONGITUD] = catalog[COLUMNA_LONGITUD].where(data_type != 'RAW', catalog['DATA_LENGTH'])
+    catalog[COLUMNA_LONGITUD] = catalog[COLUMNA_LONGITUD].where(~is_number, number_size)
+    for column in [COLUMNA_LONGITUD, COLUMNA_PRECISION, COLUMNA_ESCALA]: # Enteros, como en cursor.description
+        catalog[column] = catalog[column].map(lambda value: int(value) if pd.notna(value) else '').astype(object)
+    catalog[COLUMNA_PRECISION] = catalog[COLUMNA_PRECISION].where(is_number, '')
+    catalog[COLUMNA_ESCALA] = catalog[COLUMNA_ESCALA].where(is_number, '')
+
+    catalog['CAMPO_NORMALIZADO'] = normalize_field_name(catalog['COLUMN_NAME'])
+    return catalog.drop_duplicates(subset=['ORIGEN', 'OWNER', 'TABLE_NAME', 'CAMPO_NORMALIZADO'])
+
+
+def fill_from_all_tab_columns(df, sessions):
+    """
+    Fills TIPO, SIZE, PRECISION and SCALE of the rows to discover with one ALL_TAB_COLUMNS query per origin and one merge.
+    The rows that can't be found there (no owner in 'STG TABLA ORIGEN', expressions...) are left for the describe of their query.
+
+    Returns:
+        int: Number of rows filled.
+    """
+    pending = df[rows_to_discover(df)]
+    owner_table = pending[COLUMNA_TABLA].astype(str).str.strip().str.upper().str.split(".", n=1, expand=True)
+    if owner_table.shape[1] < 2:
+        return 0
+
+    keys = pd.DataFrame({
+        'ORIGEN': pending['ORIGEN'],
+        'OWNER': owner_table[0],
+        'TABLE_NAME': owner_table[1],
+        'CAMPO_NORMALIZADO': normalize_field_name(pending['CAMPO ORIGEN']),
+    }).dropna()
+
+    catalogs = []
+    for origen, origin_keys in keys.groupby('ORIGEN'):
+        owner_tables = list(origin_keys[['OWNER', 'TABLE_NAME']].drop_duplicates().itertuples(index=False, name=None))
+        try:
+            catalogs.append(harvest_table_columns(sessions, origen, owner_tables))
         except Exception as e:
-            print(f"⚠️ Database error occurred for query at row {index + 1}: {e}")
-            continue
-        print(description)
-        
-        # Cache the results
-        query_cache[query] = description
-        
-        cursor.close()
-        connection.close()
-        
-        # Pause to avoid overwhelming the database
-        time.sleep(5)
-        
-    else:
-        description = query_cache[query]
-  
-    try:
-    # Iterate over all rows with the same query
-        query_rows = df[df['QUERY'] == query].copy()
-
-        for query_index, query_row in query_rows.iterrows():
-            campo_origen = query_row['CAMPO ORIGEN'].replace(",","").lower().strip()
-
-            # Find the column in the description
-            for col in description:
-                field_name = col[0].replace(",","").lower().strip()
-                field_type = col[1].name 
-                field_size = col[2] if col[2] is not None else ''  
-                field_precision = col[4] if col[4] is not None else ''
-                field_scale = col[5] if col[5] is not None else ''
-
-                if field_name == campo_origen:
-                    query_rows.at[query_index, COLUMNA_TIPO] = field_type
-                    query_rows.at[query_index, COLUMNA_LONGITUD] = field_size 
-                    
-                    if 'NUMBER' in field_type.upper() and field_precision is not None:
-                        query_rows.at[query_index, COLUMNA_PRECISION] = field_precision
-                        query_rows.at[query_index, COLUMNA_ESCALA] = field_scale
-                        
-                        print(f"📊 Field '{field_name}' - Type: {field_type}, Size: {field_size}, Precision: {field_precision}, Scale: {field_scale}")
-                    
-                    else:
-                        query_rows.at[query_index, COLUMNA_PRECISION] = ''
-                        query_rows.at[query_index, COLUMNA_ESCALA] = ''
-                    
-                    break
-
-
-        # Perform the left join to update the original DataFrame
-        df.update(query_rows)
+            print(f"⚠️ ALL_TAB_COLUMNS not available for {origen} ({e}): the queries will be described one by one")
+    if not catalogs:
+        return 0
+
+    catalog = pd.concat(catalogs, ignore_index=True)
+    found = keys.reset_index().merge(catalog, on=['ORIGEN', 'OWNER', 'TABLE_NAME', 'CAMPO_NORMALIZADO'], how='inner').set_index('index')
+
+    for column in [COLUMNA_TIPO, COLUMNA_LONGITUD, COLUMNA_PRECISION, COLUMNA_ESCALA]:
+        df.loc[found.index, column] = found[column].astype(object)
+
+    print(f"📚 {len(found)} of {len(pending)} fields found in ALL_TAB_COLUMNS")
+    return len(found)
+
+
+# Describe: the metadata of the queries is collected in long format and written to the data dictionary at the end
+METADATA_COLUMNS = ['QUERY', 'CAMPO_NORMALIZADO', COLUMNA_TIPO, COLUMNA_LONGITUD, COLUMNA_PRECISION, COLUMNA_ESCALA]
+
+
+def description_to_records(query, description):
+    """
+    Converts the description of a query into one record per column: (QUERY, normalized name, TIPO, SIZE, PRECISION, SCALE).
+    """
+    records = []
+    for col in description:
+        field_name = col[0].replace(",","").lower().strip()
+        field_type = col[1].name
+        field_size = col[2] if col[2] is not None else ''
+
+        if 'NUMBER' in field_type.upper():
+            field_precision = col[4] if col[4] is not None else ''
+            field_scale = col[5] if col[5] is not None else ''
+            print(f"📊 Field '{field_name}' - Type: {field_type}, Size: {field_size}, Precision: {field_precision}, Scale: {field_scale}")
+        else:
+            field_precision = ''
+            field_scale = ''
+
+        records.append((query, field_name, field_type, field_size, field_precision, field_scale))
+
+    return records
+
+
+def query_key(query):
+    """
+    Key of a query in the journal.
+    """
+    return hashlib.sha1(str(query).encode("utf-8")).hexdigest()
+
+
+def apply_metadata(df, metadata):
+    """
+    Writes the metadata (long format, see description_to_records) in the data dictionary with one merge on (QUERY, normalized CAMPO ORIGEN).
+    Every row of a described query is updated; the fields not found in the description keep their values.
+
+    Returns:
+        int: Number of rows filled.
+    """
+    if metadata.empty:
+        return 0
+
+    metadata = metadata.drop_duplicates(subset=['QUERY', 'CAMPO_NORMALIZADO']) # Como antes: la primera columna con el nombre
+    keys = pd.DataFrame({'QUERY': df['QUERY'], 'CAMPO_NORMALIZADO': normalize_field_name(df['CAMPO ORIGEN'])}, index=df.index)
+    found = keys.reset_index().merge(metadata, on=['QUERY', 'CAMPO_NORMALIZADO'], how='inner').set_index('index')
+
+    for column in [COLUMNA_TIPO, COLUMNA_LONGITUD, COLUMNA_PRECISION, COLUMNA_ESCALA]:
+        df.loc[found.index, column] = found[column].astype(object)
+
+    return len(found)
+
+
+def fill_types_and_lenghts(df, output_file_path, query_cache=None, sessions=None, use_catalog=True, resume=False):
+    """
+    Fills the columns TIPO, SIZE, PRECISION and SCALE of the data dictionary with the description of each query.
+
+    Args:
+        df (pd.DataFrame): Data dictionary.
+        output_file_path (str): Path of the output Excel file.
+        query_cache (dict): Descriptions already known, by query.
+        sessions (OracleSessionManager): Sessions to the origins. By default one session per origin is opened, and closed at the end.
+        use_catalog (bool): Read first the columns of all the tables from ALL_TAB_COLUMNS (one query per origin).
+                            Only the fields not found there are looked up with the description of their query.
+        resume (bool): Take the descriptions of the journal of a previous run, and describe only the rest of the queries.
+    """
+    if sessions is None:
+        with OracleSessionManager() as sessions:
+            return fill_types_and_lenghts(df, output_file_path, query_cache, sessions, use_catalog, resume)
     
-    except Exception as e:
-        print(f"⚠️ Error processing query results for row {index + 1}: {e}")
-        continue
+    # Ensure the TIPO and Longitud columns are of type object to store strings
+    df[COLUMNA_TIPO] = df[COLUMNA_TIPO].astype('object')
+    df[COLUMNA_LONGITUD] = df[COLUMNA_LONGITUD].astype('object')
+    df[COLUMNA_PRECISION] = df[COLUMNA_PRECISION].astype('object')
+    df[COLUMNA_ESCALA] = df[COLUMNA_ESCALA].astype('object')
+
+    print(df.head())
+
+    # Bulk: all the tables of each origin in one round trip
+    if use_catalog:
+        fill_from_all_tab_columns(df, sessions)
+
+
+
+    # Dictionary to cache query results
+    if query_cache is None:
+        query_cache = {}
+
+    # Queries with at least one field to discover (each query is described only once)
+    pending = df[rows_to_discover(df) & df['QUERY'].notna()]
+    queries = pending[['QUERY', 'ORIGEN']].drop_duplicates(subset=['QUERY'])
+
+    metadata_records = []   # Formato largo: un registro por (QUERY, campo)
+    described_queries = 0
+
+    # Each described query is saved in the journal as soon as it's done (one line, the Excel is written only at the end)
+    with CheckpointJournal(f"{output_file_path[:-5]}_journal.jsonl", resume=resume) as journal:
+
+        total_queries = len(queries)
+        for number, (query, origen) in enumerate(queries.itertuples(index=False, name=None), start=1):
+
+            key = query_key(query)
+            entry = journal.get(key)
+            if entry is not None and entry['status'] == 'ok': # Ya descrita en la ejecución anterior
+                metadata_records += [(query, *fields) for fields in entry['fields']]
+                continue
+
+            print(f"Processing query {number} of {total_queries}...")
+
+            # Describe the query (metadata only, no rows are fetched)
+            try:
+                description = get_query_description(query, origen, query_cache, sessions)
+            except Exception as e:
+                print(f"⚠️ Database error occurred for query {number}: {e}")
+                journal.record(key, status='error', origen=origen, error=str(e))
+                continue
+
+            records = description_to_records(query, description)
+            metadata_records += records
+            described_queries += 1
+            journal.record(key, status='ok', origen=origen, fields=[list(record[1:]) for record in records])
+
+    # Write all the discovered metadata at once
+    filled_rows = apply_metadata(df, pd.DataFrame(metadata_records, columns=METADATA_COLUMNS))
+    print(f"🧩 {filled_rows} fields filled ({described_queries} queries described in this run)")
+
+
+    # Save the final output file
+    df.to_excel(output_file_path, index=False)
+    print(f"✅ Final output saved to {output_file_path}")
+    return df
+
+
+
+
+if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description="Fill TIPO, SIZE, PRECISION and SCALE of the data dictionary")
+    parser.add_argument("--resume", action="store_true", help="Skip the queries already described according to the journal")
+    args, _ = parser.parse_known_args()
 
+    # Load the Excel file
+    file_path = DATA_DICT_FILE
+    output_file_path = F'updated_{file_path}'
 
-# Save the final output file
-df.to_excel(output_file_path, index=False)
-print(f"✅ Final output saved to {output_file_path}")
\ No newline at end of file
+    fill_types_and_lenghts(pd.read_excel(file_path), output_file_path, resume=args.resume)
@@ -1,26 +1,47 @@
-
 """
 Python script to create tables or stored procedures in SQL Server.
 Better if executed in a Jupyter Notebook.
 
 The columns 'SQL Server message' and 'ACTION' in the output Excel file will tell us what happened
 
+The statements are executed concurrently (DEPLOY_WORKERS threads) over a small pool of connections, instead of opening
+one connection per statement and sleeping between them:
+    - A token bucket limits the statements sent per second (instead of time.sleep)
+    - Transient errors (deadlock, timeout, lost connection) are retried with exponential backoff
+    - Rows already deployed in a previous run (ACTION 'Table Created' / 'No action: Table already existed') are skipped
+    - Every result is appended to a journal (see Checkpoint_Journal.py) as soon as it arrives: with --resume, the statements
+      already deployed by an interrupted run are not executed again. The Excel report is written once, at the end.
+
+The connection is created by a 'connect' function, so any DB-API module (e.g. sqlite3) can replace pyodbc to test the script.
+
 This python script isn't part of the package, it's a standalone script to be run in the remote computer
 """
 
 from Utils.params import *
+from Code_to_interact_with_DBs.Checkpoint_Journal import CheckpointJournal
 
 
 ########## Cell 1
 USED_DB = "STG"    # STG , ODS
 
+DEPLOY_WORKERS = 4              # Statements executed at the same time (one connection each)
+STATEMENTS_PER_SECOND = 5       # Rate limit of the statements sent to SQL Server (None: no limit)
+MAX_RETRIES = 3                 # Retries of a statement with a transient error
+RETRY_BACKOFF_SECONDS = 2       # Wait before the first retry (doubles in every retry)
+RESUME = False                  # Skip the statements already deployed according to the journal (or run the script with --resume)
+
 
 
 ########## Cell 2
 print("Kernel Works")
 import pandas as pd
-import pyodbc
+import argparse
+import hashlib
+import queue
+import threading
 import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 
@@ -31,92 +52,319 @@ server = SQL_SERVER_HOST_NAME
 database = DATA_BASE_DESTINO
 
 
-def execute_query(server: str, database: str, query: str) -> str:
+# Clasificación de lo que ha hecho SQL Server (columna ACTION)
+ACTION_CREATED = "Table Created"
+ACTION_EXISTED = "No action: Table already existed"
+ACTION_RETRY = "RETRY"
+ACTION_ERROR = "ERROR"
+
+DONE_ACTIONS = [ACTION_CREATED, ACTION_EXISTED] # No se vuelven a ejecutar
+
+# Errores que pueden desaparecer si se repite la sentencia: deadlock, timeouts, conexión perdida, Azure throttling
+TRANSIENT_ERRORS = ["(1205)", "HYT00", "HYT01", "08S01", "08001", "(40001)", "(40197)", "(40501)", "(40613)", "(49918)", "(10928)", "(10929)"]
+
+
+
+def get_sql_server_connection(server: str = server, database: str = database):
     """
-    Function to execute a query in SQL Server and return the messages from the server
+    Function to open a connection to SQL Server (the default 'connect' of the deployment)
     """
-    driver = '{ODBC Driver 13 for SQL Server}'  
+    import pyodbc
+
+    driver = '{ODBC Driver 13 for SQL Server}'
     connection_string = f'DRIVER={driver};SERVER={server};DATABASE={database};Trusted_Connection=yes;'
-    
-    conn = pyodbc.connect(connection_string)
-    cursor = conn.cursor()
-    
+
+    return pyodbc.connect(connection_string)
+
+
+
+
+class ConnectionPool:
+    """
+    Pool of DB-API connections shared by the deployment threads.
+    The connections are opened when needed (up to 'size') and reused for all the statements.
+    """
+
+    def __init__(self, connect, size: int) -> None:
+        self.connect = connect
+        self.size = size
+        self.idle_connections = queue.Queue()
+        self.opened = 0
+        self.lock = threading.Lock()
+
+
+    @contextmanager
+    def connection(self):
+        """
+        Lends a connection. If an exception leaves the block (e.g. BrokenConnection), the connection is closed instead of reused.
+        """
+        conn = self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            self._close(conn)
+            raise
+        else:
+            self.idle_connections.put(conn)
+
+
+    def _acquire(self):
+        try:
+            return self.idle_connections.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            can_open = self.opened < self.size
+            if can_open:
+                self.opened += 1
+
+        if not can_open:
+            return self.idle_connections.get()
+
+        try:
+            return self.connect()
+        except BaseException:
+            with self.lock:
+                self.opened -= 1
+            raise
+
+
+    def _close(self, conn) -> None:
+        with self.lock:
+            self.opened -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+    def close_all(self) -> None:
+        while True:
+            try:
+                conn = self.idle_connections.get_nowait()
+            except queue.Empty:
+                break
+            self._close(conn)
+
+
+
+
+class BrokenConnection(Exception):
+    """
+    Raised inside ConnectionPool.connection() to discard a connection after a transient error.
+    """
+
+
+
+
+class RateLimiter:
+    """
+    Token bucket: at most 'rate' statements per second (with bursts of 'burst' statements), shared by all the threads.
+    """
+
+    def __init__(self, rate: float = None, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def acquire(self) -> None:
+        if not self.rate:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+
+
+def execute_query(connection, query: str) -> tuple:
+    """
+    Function to execute a query in SQL Server and return the messages from the server
+
+    Returns:
+        tuple: (True if the statement was executed, messages of the server or error)
+    """
+    cursor = connection.cursor()
+
     try:
         cursor.execute(query)
-        conn.commit()
-        messages = "\n".join([msg[1] for msg in cursor.messages])
-    except pyodbc.ProgrammingError as e:
-        messages = str(e)
-    except AttributeError as e:
-        messages = str(e)
+        connection.commit()
+        messages = "\n".join([msg[1] for msg in (getattr(cursor, "messages", None) or [])])
+        return True, messages
+    except Exception as e: # Error del driver (pyodbc.Error, sqlite3.Error...)
+        try:
+            connection.rollback()
+        except Exception:
+            pass
+        return False, str(e)
     finally:
-        conn.close()
-    
-    return messages
+        try:
+            cursor.close()
+        except Exception:
+            pass
 
 
 
 
-def determine_action_done_by_SQL_Server(mensaje_sql):
+def determine_action_done_by_SQL_Server(mensaje_sql: str, executed: bool = False) -> str:
     """
     Function to determine the action taken based on the SQL Server message
     """
-    if "'pyodbc.Cursor' object has no attribute 'messages'" in mensaje_sql:
-        return "Table Created"
+    if executed or "'pyodbc.Cursor' object has no attribute 'messages'" in mensaje_sql:
+        return ACTION_CREATED
     elif "There is already an object named" in mensaje_sql and "(2714)" in mensaje_sql:
-        return "No action: Table already existed"
+        return ACTION_EXISTED
+    elif any(error in mensaje_sql for error in TRANSIENT_ERRORS):
+        return ACTION_RETRY
     else:
-        return "ERROR"
+        return ACTION_ERROR
 
 
-def create_tables_in_SQL_Server(queries_df, base_file_path):
+
+
+def deploy_statement(pool: ConnectionPool, rate_limiter: RateLimiter, query: str, max_retries: int = MAX_RETRIES, backoff: float = RETRY_BACKOFF_SECONDS) -> tuple:
+    """
+    Executes one statement, retrying the transient errors with exponential backoff.
+
+    Returns:
+        tuple: (messages of the server, ACTION)
+    """
+    for attempt in range(max_retries + 1):
+        rate_limiter.acquire()
+
+        try:
+            with pool.connection() as conn:
+                executed, messages = execute_query(conn, query)
+                action = determine_action_done_by_SQL_Server(messages, executed)
+                if action == ACTION_RETRY:
+                    raise BrokenConnection(messages) # La conexión puede haber quedado inservible: se descarta
+        except BrokenConnection:
+            pass
+        except Exception as e: # No se ha podido abrir la conexión
+            messages = str(e)
+            action = ACTION_RETRY if any(error in messages for error in TRANSIENT_ERRORS) else ACTION_ERROR
+
+        if action != ACTION_RETRY:
+            return messages, action
+
+        if attempt < max_retries:
+            time.sleep(backoff * 2 ** attempt)
+
+    return messages, ACTION_ERROR
+
+
+
+
+def statement_key(query: str) -> str:
+    """
+    Key of a statement in the journal (hash of its text: if the query changes, it is executed again).
+    """
+    return hashlib.sha1(str(query).encode("utf-8")).hexdigest()
+
+
+
+def create_tables_in_SQL_Server(queries_df, base_file_path, connect = get_sql_server_connection, workers: int = DEPLOY_WORKERS, rate: float = STATEMENTS_PER_SECOND, max_retries: int = MAX_RETRIES, backoff: float = RETRY_BACKOFF_SECONDS, resume: bool = RESUME):
     """
     Function to create tables in SQL Server and register the returning messages of the server
+
+    Args:
+        queries_df (pd.DataFrame): Queries to execute ('TABLA ORIGEN', 'QUERY CREATE'). If it has the columns of a previous run, the rows already deployed are skipped.
+        base_file_path (str): Base path of the output Excel files.
+        connect (callable): Function returning a new DB-API connection.
+        workers (int): Statements executed at the same time.
+        rate (float): Maximum statements per second (None: no limit).
+        max_retries (int): Retries of a statement with a transient error.
+        backoff (float): Wait before the first retry, in seconds.
+        resume (bool): Take the results of the journal of a previous run, and execute only the statements not deployed yet.
+
+    Returns:
+        pd.DataFrame: The queries with the columns 'SQL Server message' and 'ACTION'.
     """
-    messages_list = []
-    queries_df['SQL Server message'] = ""
-    queries_df['ACTION'] = ""
-    
-    for index, row in queries_df.iterrows():
-        
-        if row['SQL Server message'] != "":
-            continue
-        
-        table_name = row['TABLA ORIGEN'].split('.')[-1]
-        query = row['QUERY CREATE']
-
-        print(f"Executing query for table: {table_name}")
-        messages = execute_query(server, database, query)
-        queries_df.at[index, 'SQL Server message'] = messages
-        action = determine_action_done_by_SQL_Server(messages)
-        queries_df.at[index, 'ACTION'] = action
-        print(f"Table {table_name} checked/created. SQL Server Messages: {messages}")
-        
-        time.sleep(3)
-        
-        if (index + 1) % 10 == 0:
-            iteration_file_path = f"{base_file_path.rsplit('.', 1)[0]}_part_{(index + 1) // 10}.xlsx"
-            queries_df.to_excel(iteration_file_path, index=False)
-            print(f"Saved progress at iteration {index + 1} as {iteration_file_path}")
-
-    final_file_path = f"{base_file_path.rsplit('.', 1)[0]}_final_{USED_DB}.xlsx"
+    if 'SQL Server message' not in queries_df.columns:
+        queries_df['SQL Server message'] = ""
+    if 'ACTION' not in queries_df.columns:
+        queries_df['ACTION'] = ""
+    queries_df['SQL Server message'] = queries_df['SQL Server message'].fillna("").astype(str)
+    queries_df['ACTION'] = queries_df['ACTION'].fillna("").astype(str)
+
+    base_path = base_file_path.rsplit('.', 1)[0]
+    journal = CheckpointJournal(f"{base_path}_journal_{USED_DB}.jsonl", resume = resume)
+    keys = queries_df['QUERY CREATE'].map(statement_key)
+
+    # Resultados de la ejecución anterior
+    for index, key in keys.items():
+        entry = journal.get(key)
+        if entry is not None:
+            queries_df.at[index, 'SQL Server message'] = entry['message']
+            queries_df.at[index, 'ACTION'] = entry['action']
+
+    pending_df = queries_df[~queries_df['ACTION'].isin(DONE_ACTIONS)]
+    print(f"{len(pending_df)} statements to execute ({len(queries_df) - len(pending_df)} already deployed)")
+
+    pool = ConnectionPool(connect, size = workers)
+    rate_limiter = RateLimiter(rate, burst = workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers = workers) as executor:
+            futures = {executor.submit(deploy_statement, pool, rate_limiter, row['QUERY CREATE'], max_retries, backoff): (index, row['TABLA ORIGEN'])
+                       for index, row in pending_df.iterrows()}
+
+            try:
+                for future in as_completed(futures):
+                    index, table_origin = futures[future]
+                    messages, action = future.result()
+
+                    queries_df.at[index, 'SQL Server message'] = messages
+                    queries_df.at[index, 'ACTION'] = action
+                    journal.record(keys[index], table = table_origin, message = messages, action = action)
+                    print(f"Table {str(table_origin).split('.')[-1]}: {action}. SQL Server Messages: {messages}")
+            except BaseException: # Interrumpido: no se lanzan más sentencias (se retoma con --resume)
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        pool.close_all()
+        journal.close()
+
+    final_file_path = f"{base_path}_final_{USED_DB}.xlsx"
     queries_df.to_excel(final_file_path, index=False)
     print(f"Final save completed as {final_file_path}.")
 
+    return queries_df
+
+
 
 
 
+if __name__ == "__main__":
 
-########## Cell 4
-file_path = f'Created_Tables_Queries_{USED_DB}.xlsx'  
-base_output_file_path = 'Updated_Created_Tables_Queries.xlsx'
-excel_data = pd.ExcelFile(file_path)
-df_queries = excel_data.parse('Sheet1')
+    parser = argparse.ArgumentParser(description = "Create tables or stored procedures in SQL Server")
+    parser.add_argument("--resume", action = "store_true", help = "Skip the statements already deployed according to the journal")
+    args, _ = parser.parse_known_args() # parse_known_args: en Jupyter llegan los argumentos del kernel
 
-print(df_queries.head(30))
+    ########## Cell 4
+    file_path = f'Created_Tables_Queries_{USED_DB}.xlsx'
+    base_output_file_path = 'Updated_Created_Tables_Queries.xlsx'
+    excel_data = pd.ExcelFile(file_path)
+    df_queries = excel_data.parse('Sheet1')
 
+    print(df_queries.head(30))
 
 
-########## Cell 5
-create_tables_in_SQL_Server(df_queries, base_output_file_path)
 
+    ########## Cell 5
+    create_tables_in_SQL_Server(df_queries, base_output_file_path, resume = RESUME or args.resume)
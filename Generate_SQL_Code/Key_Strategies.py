@@ -0,0 +1,162 @@
+import pandas as pd
+from Utils.params import *
+
+
+"""
+Python Script with the strategies of the row key (HSH_PK0), computed in the Oracle select from the primary key.
+
+The key is the join column of the whole load (MERGE, soft delete, STG index, ODS primary key, partitions of the
+extraction), so its type must be the same in the select, in the SSIS metadata and in the STG / ODS tables: all of
+them take it from KEY_STRATEGIES.
+
+Strategies (KEY_STRATEGY in params, column 'CLAVE HSH_PK0' of Info_Pks):
+    - LEGACY (default): standard_hash(TO_CHAR(pk1 || pk2), 'MD5'), binary(16). The key of the tables already loaded:
+      the columns are concatenated without separator and the dates with the NLS format of the session
+    - MD5: standard_hash MD5 of the separator-safe text (see below), binary(16)
+    - SHA1: standard_hash SHA1, binary(20)
+    - ORA_HASH: two ORA_HASH of 32 bits with different seeds, joined in a 64-bit integer. Much cheaper for Oracle
+      than standard_hash; collisions are unlikely below billions of rows per table
+    - NATIVE: the primary key itself as text, without hashing. Only for the tables whose primary key fits in
+      KEY_NATIVE_MAX_CHARS characters
+
+Changing the strategy of a table changes all its keys (the next MERGE would insert every row again and mark the old
+ones as deleted): its ODS table has to be created and loaded again.
+
+In every strategy but LEGACY, with several columns in the primary key, every value is prefixed with its length
+(LENGTH || ':' || value), so the text of two different keys can't be the same (('1', '23') and ('12', '3') were the same
+key with a plain ||). The tables opt in one by one (column 'CLAVE HSH_PK0'), each one with a full reload of its ODS table.
+"""
+
+
+# Texto de cada tipo Oracle dentro de la clave y del hash de la fila (el resto de tipos: TO_CHAR)
+VALUE_TEXT = {
+    'DB_TYPE_VARCHAR': "{field}", 'DB_TYPE_NVARCHAR': "{field}", 'DB_TYPE_CHAR': "{field}", 'DB_TYPE_NCHAR': "{field}",
+    'DB_TYPE_DATE': "TO_CHAR({field}, 'YYYY-MM-DD HH24:MI:SS')",
+    'DB_TYPE_TIMESTAMP': "TO_CHAR({field}, 'YYYY-MM-DD HH24:MI:SS.FF9')",
+    'DB_TYPE_RAW': "RAWTOHEX({field})",
+}
+VALUE_CHARS = {'DB_TYPE_DATE': 19, 'DB_TYPE_TIMESTAMP': 29, 'DB_TYPE_RAW': 4000} # Resto: SIZE del diccionario (40 si no hay)
+
+
+# Type of HSH_PK0 in SQL Server and in the SSIS package (dataType, length, precision, scale) for each strategy
+KEY_STRATEGIES = {
+    "LEGACY": {"sql_type": "binary(16)", "ssis_type": "bytes", "length": 16, "precision": None, "scale": None},
+    "MD5": {"sql_type": "binary(16)", "ssis_type": "bytes", "length": 16, "precision": None, "scale": None},
+    "SHA1": {"sql_type": "binary(20)", "ssis_type": "bytes", "length": 20, "precision": None, "scale": None},
+    "ORA_HASH": {"sql_type": "numeric(19, 0)", "ssis_type": "numeric", "length": 22, "precision": "19", "scale": "0"},
+    "NATIVE": {"sql_type": f"nvarchar({KEY_NATIVE_MAX_CHARS})", "ssis_type": "wstr", "length": KEY_NATIVE_MAX_CHARS, "precision": None, "scale": None},
+}
+
+
+
+def value_text(field: str, oracle_type: str) -> str:
+    """
+    Text of a value of the select, the same whatever the NLS settings of the session (dates with a fixed format).
+    """
+
+    return VALUE_TEXT.get(oracle_type, "TO_CHAR({field})").format(field = field)
+
+
+
+
+def value_chars(oracle_type: str, size) -> int:
+    """
+    Maximum characters of the text of a value (see value_text).
+    """
+
+    size = pd.to_numeric(size, errors = 'coerce')
+    return VALUE_CHARS.get(oracle_type, int(size) if pd.notna(size) and size > 0 else 40)
+
+
+
+
+def get_key_strategy(info_tabla, table_name: str) -> str:
+    """
+    Key strategy of a table (see KEY_STRATEGIES).
+
+    Args:
+        info_tabla (InfoTabla): The info of the table in Info_Pks (see obtain_table_info).
+        table_name (str): The name of the table, for the error message.
+    """
+
+    strategy = info_tabla.opciones.get(INFO_PKS_KEY_STRATEGY, KEY_STRATEGY).upper()
+    if strategy not in KEY_STRATEGY_OPTIONS:
+        raise ValueError(f"Unknown key strategy '{strategy}' for the table {table_name}. Options: {KEY_STRATEGY_OPTIONS}")
+
+    return strategy
+
+
+
+
+def key_sql_type(info_tabla, table_name: str) -> str:
+    """
+    SQL Server type of HSH_PK0 in the tables of a table (binary(16), numeric(19, 0)...).
+    """
+
+    return KEY_STRATEGIES[get_key_strategy(info_tabla, table_name)]["sql_type"]
+
+
+
+
+def key_ssis_column(info_tabla, table_name: str) -> dict:
+    """
+    SSIS metadata of HSH_PK0 (dataType, length, precision and scale, with the names of the columns of the data dictionary).
+    """
+
+    strategy = KEY_STRATEGIES[get_key_strategy(info_tabla, table_name)]
+
+    return {COLUMNA_CAMPO: 'HSH_PK0', COLUMNA_TIPO: strategy["ssis_type"], COLUMNA_LONGITUD: strategy["length"],
+            COLUMNA_PRECISION: strategy["precision"], COLUMNA_ESCALA: strategy["scale"]}
+
+
+
+
+def key_expression(info_tabla, table_name: str, fields: list, types: list, sizes: list) -> str:
+    """
+    Oracle expression of HSH_PK0 in the select of a table.
+
+    Args:
+        info_tabla (InfoTabla): The info of the table in Info_Pks (its primary key and key strategy).
+        table_name (str): The name of the table, for the error messages.
+        fields (list): Names of the fields of the table.
+        types (list): Oracle type of each field (DB_TYPE_...).
+        sizes (list): Size of each field in the data dictionary.
+
+    Returns:
+        str: The expression.
+    """
+
+    strategy = get_key_strategy(info_tabla, table_name)
+    if strategy == "LEGACY":
+        return f"standard_hash(TO_CHAR({info_tabla.pks}), 'MD5')"
+
+    pks = [pk.strip() for pk in info_tabla.pks.split('||') if pk.strip()]
+
+    # Tipo y tamaño de cada PK en el diccionario (PK que no es un campo: TO_CHAR, 40 caracteres)
+    field_info = {str(field).strip().upper(): (oracle_type, size) for field, oracle_type, size in zip(fields, types, sizes)}
+    pk_info = [field_info.get(pk.upper(), (None, None)) for pk in pks]
+
+    texts = [value_text(pk, oracle_type) for pk, (oracle_type, _) in zip(pks, pk_info)]
+    chars = [value_chars(oracle_type, size) for oracle_type, size in pk_info]
+
+    if len(pks) == 1:
+        key_text = texts[0]
+        key_chars = chars[0]
+    else:
+        key_text = " || ".join(f"LENGTH({text}) || ':' || {text}" for text in texts)
+        key_chars = sum(value + len(str(value)) + 1 for value in chars)
+
+    if strategy == "MD5":
+        return f"standard_hash({key_text}, 'MD5')"
+
+    if strategy == "SHA1":
+        return f"standard_hash({key_text}, 'SHA1')"
+
+    if strategy == "ORA_HASH": # [-2^63, 2^63 - 1]: cabe en un bigint
+        return f"CAST((ORA_HASH({key_text}, 4294967295, 0) - 2147483648) * 4294967296 + ORA_HASH({key_text}, 4294967295, 1) AS NUMBER(19))"
+
+    if key_chars > KEY_NATIVE_MAX_CHARS:
+        raise ValueError(f"The primary key of {table_name} ({', '.join(pks)}) can take {key_chars} characters: too wide for the key strategy NATIVE "
+                         f"(KEY_NATIVE_MAX_CHARS = {KEY_NATIVE_MAX_CHARS}). Use a hash strategy in the column '{INFO_PKS_KEY_STRATEGY}' of Info_Pks")
+
+    return f"CAST({key_text} AS VARCHAR2({KEY_NATIVE_MAX_CHARS} CHAR))"
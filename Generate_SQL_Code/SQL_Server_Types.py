@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from Utils.params import *
+
+
+"""
+Python Script to derive the SQL Server data type of every field of the data dictionary.
+
+The type is computed for the whole dictionary in one pass (pandas / NumPy masks) and stored in the SQL_TYPE column,
+so the STG and ODS generators (and the Stored Procedures) share the same rules:
+    - DB_TYPE_INT                                       --> int
+    - DB_TYPE_DATE, DB_TYPE_TIMESTAMP, DB_TYPE_DATETIME  --> datetime
+    - DB_TYPE_CLOB                                      --> nvarchar(max)
+    - DB_TYPE_NVARCHAR, DB_TYPE_VARCHAR, DB_TYPE_CHAR    --> nvarchar(size)
+    - DB_TYPE_NUMBER                                    --> numeric(precision, scale), or nvarchar(38) if size is 127 (Bug del 127)
+    - DB_TYPE_DECIMAL                                   --> decimal(precision, scale)
+    - Anything else: the type as it comes in the dictionary
+"""
+
+
+# Column with the fields of each table already joined (see join_fields_by_table)
+FIELDS_COLUMN = 'FIELDS'
+
+# Valores que clean_columns deja como texto pero que en realidad están vacíos
+EMPTY_VALUES = ['', 'nan', 'None', 'NaN', '<NA>']
+
+
+
+def pick_column(df: pd.DataFrame, ods_column: str, stg_column: str, use_ods_overrides: bool) -> pd.Series:
+    """
+    Returns the STG column, overridden by the ODS column where the ODS value is filled (if use_ods_overrides).
+    """
+
+    stg_values = df[stg_column]
+    if not use_ods_overrides:
+        return stg_values
+
+    ods_values = df[ods_column]
+    ods_filled = ods_values.notna() & ~ods_values.astype(str).str.strip().isin(EMPTY_VALUES)
+    return ods_values.where(ods_filled, stg_values)
+
+
+
+
+def to_integer(values: pd.Series) -> pd.Series:
+    """
+    Converts a column to integers (float --> int, truncating), leaving NaN where the value isn't convertible.
+    """
+
+    return np.trunc(pd.to_numeric(values, errors='coerce'))
+
+
+
+
+def format_with_precision_and_scale(tipo: str, precision: pd.Series, scale: pd.Series, default_precision: int = 2, default_scale: int = 0) -> pd.Series:
+    """
+    Vectorized version of 'tipo(precision, scale)':
+        - Precision below or equal to 0 --> default_precision
+        - Scale below 0 --> default_scale
+        - If precision or scale are empty: only the type
+    """
+
+    both_filled = precision.notna() & scale.notna()
+    precision = precision.where(precision > 0, default_precision)
+    scale = scale.where(scale >= 0, default_scale)
+
+    formatted = tipo + "(" + precision.fillna(0).astype(int).astype(str) + ", " + scale.fillna(0).astype(int).astype(str) + ")"
+    return formatted.where(both_filled, tipo)
+
+
+
+
+def resolve_sql_types(df: pd.DataFrame, use_ods_overrides: bool = False) -> pd.Series:
+    """
+    Computes the SQL Server data type of every row of the data dictionary.
+
+    Args:
+        df (pd.DataFrame): Data dictionary (one row per field).
+        use_ods_overrides (bool): If True, the ODS columns (TIPO, SIZE, PRECISION, SCALE) take precedence over the STG ones when filled.
+
+    Returns:
+        pd.Series: The SQL Server type of each row (same index as df).
+    """
+
+    tipo = pick_column(df, ODS_TIPO, STG_TIPO, use_ods_overrides)
+    size = to_integer(pick_column(df, ODS_SIZE, STG_SIZE, use_ods_overrides))
+    precision = to_integer(pick_column(df, ODS_PRECISION, STG_PRECISION, use_ods_overrides))
+    scale = to_integer(pick_column(df, ODS_SCALE, STG_SCALE, use_ods_overrides))
+
+    is_int = tipo == 'DB_TYPE_INT'
+    is_datetime = tipo.isin(['DB_TYPE_DATE', 'DB_TYPE_TIMESTAMP', 'DB_TYPE_DATETIME'])
+    is_clob = tipo == 'DB_TYPE_CLOB'
+    is_text = tipo.isin(['DB_TYPE_NVARCHAR', 'DB_TYPE_VARCHAR', 'DB_TYPE_CHAR'])
+    is_number = tipo == 'DB_TYPE_NUMBER'
+    is_number_127 = is_number & (size == 127) # Bug del 127
+    is_decimal = tipo == 'DB_TYPE_DECIMAL'
+
+    nvarchar = ("nvarchar(" + size.fillna(0).astype(int).astype(str) + ")").where(size.notna(), "nvarchar")
+
+    sql_type = tipo.astype(object).copy()
+    sql_type[is_int] = "int"
+    sql_type[is_datetime] = "datetime"
+    sql_type[is_clob] = "nvarchar(max)"
+    sql_type[is_text] = nvarchar[is_text]
+    sql_type[is_number] = format_with_precision_and_scale("numeric", precision, scale)[is_number]
+    sql_type[is_number_127] = "nvarchar(38)"
+    sql_type[is_decimal] = format_with_precision_and_scale("decimal", precision, scale)[is_decimal]
+
+    return sql_type
+
+
+
+
+def add_sql_type_column(df: pd.DataFrame, use_ods_overrides: bool = False) -> pd.DataFrame:
+    """
+    Returns a copy of the data dictionary with the SQL_TYPE column (see resolve_sql_types).
+    """
+
+    df = df.copy()
+    df[SQL_TYPE] = resolve_sql_types(df, use_ods_overrides)
+    return df
+
+
+
+
+def join_fields_by_table(df: pd.DataFrame, table_column: str, fields: pd.Series, separator: str = ",\n") -> pd.DataFrame:
+    """
+    Groups the fields definitions of the DDL by table (groupby + string join).
+
+    Args:
+        df (pd.DataFrame): Data dictionary (one row per field).
+        table_column (str): Column with the table name (STG_TABLAS or ODS_TABLAS).
+        fields (pd.Series): Definition of each field ("[name] type NULL"...), same index as df.
+        separator (str): Separator between the fields.
+
+    Returns:
+        pd.DataFrame: One row per table (sorted by name, like groupby), with the values of the first row of the table
+                      in the dictionary and the column FIELDS with all its fields joined.
+    """
+
+    joined_fields = fields.groupby(df[table_column], sort=True).agg(separator.join)
+
+    first_rows = df.drop_duplicates(subset=[table_column]).set_index(table_column)
+    tables_df = first_rows.loc[joined_fields.index].copy()
+    tables_df[FIELDS_COLUMN] = joined_fields
+
+    return tables_df.reset_index()
@@ -1,6 +1,9 @@
 import pandas as pd
 from Utils.params import *
-from Utils.Utils import load_table_info_df, obtain_table_info, convert_oracle_to_ssis_data_type
+from Utils.Utils import obtain_table_info, convert_oracle_to_ssis_data_type
+from Utils.class_TableInfoRegistry import get_table_info_registry
+from Generate_SQL_Code.Watermarks import watermark_filter, find_watermark_type
+from Generate_SQL_Code.Key_Strategies import key_expression, value_text, value_chars
 
 
 
@@ -8,10 +11,61 @@ from Utils.Utils import load_table_info_df, obtain_table_info, convert_oracle_to
 Python Script to generate the Select Statements from Oracle for every table
 - Those selects statements will be used to extract the data from Oracle to SSIS
 - The SSIS package will then load the data to SQL Server
+
+Besides the fields, every select returns:
+- HSH_PK0: key of the row, from the primary key (hash or the key itself, see Key_Strategies.py)
+- HSH_ROW: hash of the content of the row, so the Stored Procedures only update the rows that changed
 """
 
 
 
+def row_hash_expression(fields: list, types: list, sizes: list) -> str:
+    """
+    Oracle expression of the hash of the content of a row (HSH_ROW).
+
+    Every value is prefixed with its length (LENGTH || ':' || value), so moving characters from one field to the next changes the hash.
+    The fields are hashed in chunks of ROW_HASH_CHUNK_CHARS characters at most (a VARCHAR2 concatenation can't go beyond 4000 bytes),
+    and the hashes of the chunks (fixed length) are hashed again. The types of ROW_HASH_EXCLUDED_TYPES (LOBs) are left out.
+
+    Args:
+        fields (list): Names of the fields of the table.
+        types (list): Oracle type of each field (DB_TYPE_...).
+        sizes (list): Size of each field in the data dictionary.
+
+    Returns:
+        str: The expression (None if no field can be hashed).
+    """
+
+    chunks = [[]]
+    chunk_chars = 0
+    for field, oracle_type, size in zip(fields, types, sizes):
+        if oracle_type in ROW_HASH_EXCLUDED_TYPES:
+            continue
+
+        text = value_text(field, oracle_type)
+        chars = value_chars(oracle_type, size) + 6
+
+        if chunks[-1] and chunk_chars + chars > ROW_HASH_CHUNK_CHARS:
+            chunks.append([])
+            chunk_chars = 0
+        chunks[-1].append(text)
+        chunk_chars += chars
+
+    if not chunks[-1]:
+        return None
+
+    def chunk_hash(texts: list) -> str:
+        if len(texts) == 1: # Un solo campo, posiblemente de 4000: sin prefijo
+            return f"standard_hash({texts[0]}, 'MD5')"
+        return "standard_hash(" + " || ".join(f"LENGTH({text}) || ':' || {text}" for text in texts) + ", 'MD5')"
+
+    if len(chunks) == 1:
+        return chunk_hash(chunks[0])
+
+    return "standard_hash(" + " || ".join(f"NVL(RAWTOHEX({chunk_hash(texts)}), '-')" for texts in chunks) + ", 'MD5')"
+
+
+
 def apply_query(group):
     
     tabla_origen = group.name[1]
@@ -19,17 +73,28 @@ def apply_query(group):
     campo_origen_series = group[COLUMNA_CAMPO]
     campos = ',\n'.join(campo_origen_series)
     
-    InfoTabla = obtain_table_info(tabla_origen, info_pks_df)
+    row_hash = row_hash_expression(list(campo_origen_series), list(group[COLUMNA_TIPO]), list(group[COLUMNA_LONGITUD]))
+    row_hash_select = f"\n,{row_hash} as HSH_ROW\n" if row_hash else ""
+    
+    InfoTabla = obtain_table_info(tabla_origen, table_registry)
     
     tipo_tabla = InfoTabla.tipo_tabla 
-    pks_names = InfoTabla.pks
+    key = key_expression(InfoTabla, tabla_origen, list(campo_origen_series), list(group[COLUMNA_TIPO]), list(group[COLUMNA_LONGITUD]))
     incremental_oracle = InfoTabla.incremental_ORACLE_a_STG
+    if incremental_oracle.strip() in ('None', 'nan'): # Celda vacía en Info_Pks
+        incremental_oracle = ""
+    
+    # Incremental por watermark: sustituye al texto de 'INCREMENTAL ORACLE STG' (ver Watermarks.py)
+    watermark_column = InfoTabla.opciones.get(INFO_PKS_WATERMARK_COLUMN)
+    if watermark_column:
+        watermark_type = find_watermark_type(watermark_column, campo_origen_series, group[COLUMNA_TIPO], tabla_origen)
+        incremental_oracle = watermark_filter(watermark_column, watermark_type)
         
     query_content = f"""SELECT 
     {campos}
 
-    ,standard_hash(TO_CHAR({pks_names}), 'MD5') as HSH_PK0
-
+    ,{key} as HSH_PK0
+    {row_hash_select}
     FROM {tabla_origen}"""   
     
     query = '\n'.join(line.strip() for line in query_content.split("\n")) 
@@ -44,23 +109,44 @@ def apply_query(group):
 
 
 
-def prepare_data_frame(input_path_file, output_path_file):
+def partition_query(query: str, partition: int, partitions: int) -> str:
+    """
+    Select of one bucket of a table whose extraction is split in several partitions (column 'PARTICIONES' of Info_Pks).
+    The buckets are ORA_HASH buckets of HSH_PK0 (always in the select), so they don't overlap and have similar sizes.
+
+    Args:
+        query (str): The select of the table (see apply_query).
+        partition (int): The bucket, from 0 to partitions - 1.
+        partitions (int): Number of buckets.
+
+    Returns:
+        str: The select of the bucket.
+    """
+    
+    return f"SELECT * FROM (\n{query}\n)\nWHERE ORA_HASH(HSH_PK0, {partitions - 1}) = {partition}"
+
+
+
+
+
+
+def prepare_data_frame(data_dict_df, output_path_file):
     
     
-    # Import and Clean
-    df = pd.read_excel(input_path_file)    
+    # Import and Clean (diccionario ya cargado, ver Utils/data_loader.py)
+    df = data_dict_df.copy()
     df[COLUMNA_CAMPO] = df[COLUMNA_CAMPO].str.replace(";", "", regex=False)
     df[COLUMNA_CAMPO] = df[COLUMNA_CAMPO].str.replace(",", "", regex=False)
     df = df.apply(lambda x: x.str.strip() if x.dtype == "object" else x)
     df = df.drop_duplicates(subset=[COLUMNA_TABLA, COLUMNA_CAMPO])
     
-    # Limpiar el archivo de PKs
-    global info_pks_df
-    info_pks_df = load_table_info_df()
+    # Registro del archivo de PKs
+    global table_registry
+    table_registry = get_table_info_registry()
     
     
     # Crear un DataFrame auxiliar con las queries
-    filtered_df = df[[COLUMNA_ORIGEN, COLUMNA_TABLA, COLUMNA_CAMPO]]
+    filtered_df = df[[COLUMNA_ORIGEN, COLUMNA_TABLA, COLUMNA_CAMPO, COLUMNA_TIPO, COLUMNA_LONGITUD]]
     query_df = filtered_df.groupby([COLUMNA_ORIGEN, COLUMNA_TABLA]).apply(apply_query).reset_index()
     query_df.rename(columns={0: COLUMNA_QUERY}, inplace=True)
     
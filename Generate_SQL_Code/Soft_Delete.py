@@ -0,0 +1,146 @@
+from Utils.params import *
+
+
+"""
+Python Script with the SQL of the soft delete of the Stored Procedures STG to ODS: the rows of ODS missing from STG
+are marked with REG_ACT = 0.
+
+Modes (SP_SOFT_DELETE in params, column 'BORRADO ODS' of Info_Pks):
+    - MERGE (default): branch WHEN NOT MATCHED BY SOURCE of the MERGE. The MERGE becomes a full outer join, and the whole ODS
+      table is read in every load, even when the incremental predicate ('INCREMENTAL STG ODS') limits the rows marked
+    - ANTI_JOIN (opt-in): a separate UPDATE after the MERGE, with NOT EXISTS against STG, limited to the incremental window of
+      FCH_CAR (the predicate of Info_Pks, or the last SP_SOFT_DELETE_WINDOW_DAYS days). The ODS table gets an index
+      on FCH_CAR (see Tables_Creation_ODS.py), so only the rows of the window are read
+    - NONE: no soft delete (always the case of the tables loaded by watermark: their STG only holds the delta)
+
+A window of FCH_CAR (the 'INCREMENTAL STG ODS' predicate in both modes, or SP_SOFT_DELETE_WINDOW_DAYS in ANTI_JOIN) requires
+FCH_CAR to mean "last load in which the row was in STG". The MERGE only updates the rows whose HSH_ROW changed, so for
+these tables the Stored Procedure also copies FCH_CAR of STG to the unchanged rows (see needs_fch_car_refresh and
+fch_car_refresh_update): without it, a row that never changes leaves the window and is never marked as deleted.
+"""
+
+
+
+def get_date_incremental(date_incremental):
+
+    if date_incremental.strip() == 'None': # Borrar solo los no nulos bien, sin lios
+        date_incremental = None
+
+    if date_incremental:
+        return f" {date_incremental}"
+
+    else:
+        return ""
+
+
+
+
+def get_soft_delete_mode(info_tabla, table_name: str) -> str:
+    """
+    Soft delete mode of a table (MERGE, ANTI_JOIN or NONE).
+
+    Args:
+        info_tabla (InfoTabla): The info of the table in Info_Pks (see obtain_table_info).
+        table_name (str): The name of the table, for the error message.
+    """
+
+    if info_tabla.opciones.get(INFO_PKS_WATERMARK_COLUMN):
+        return "NONE"
+
+    mode = info_tabla.opciones.get(INFO_PKS_SOFT_DELETE, SP_SOFT_DELETE).upper()
+    if mode not in SP_SOFT_DELETE_OPTIONS:
+        raise ValueError(f"Unknown soft delete mode '{mode}' for the table {table_name}. Options: {SP_SOFT_DELETE_OPTIONS}")
+
+    return mode
+
+
+
+
+def soft_delete_window(info_tabla) -> str:
+    """
+    Predicate on ODS limiting the rows that can be marked as deleted by the anti-join: the 'INCREMENTAL STG ODS' of
+    Info_Pks (e.g. " AND ODS.FCH_CAR > GETDATE()-1"), or the last SP_SOFT_DELETE_WINDOW_DAYS days of FCH_CAR.
+    Empty: the whole table.
+    """
+
+    date_incremental = get_date_incremental(info_tabla.incremental_STG_a_ODS)
+    if date_incremental:
+        return date_incremental
+
+    if SP_SOFT_DELETE_WINDOW_DAYS:
+        return f" AND ODS.FCH_CAR >= DATEADD(DAY, -{SP_SOFT_DELETE_WINDOW_DAYS}, GETDATE())"
+
+    return ""
+
+
+
+
+def needs_fch_car_index(info_tabla, table_name: str) -> bool:
+    """
+    True if the anti-join of the table is limited to a window of FCH_CAR: its ODS table needs the index on FCH_CAR.
+    """
+
+    return get_soft_delete_mode(info_tabla, table_name) == "ANTI_JOIN" and bool(soft_delete_window(info_tabla))
+
+
+
+
+def needs_fch_car_refresh(info_tabla, table_name: str) -> bool:
+    """
+    True if the rows of the table marked as deleted are limited by a predicate on FCH_CAR (the 'INCREMENTAL STG ODS' of
+    the MERGE, or the window of the anti-join): the Stored Procedure has to refresh FCH_CAR of the rows that didn't change
+    (see fch_car_refresh_update).
+    """
+
+    mode = get_soft_delete_mode(info_tabla, table_name)
+    window = {"MERGE": get_date_incremental(info_tabla.incremental_STG_a_ODS), "ANTI_JOIN": soft_delete_window(info_tabla)}.get(mode, "")
+
+    return "FCH_CAR" in window.upper()
+
+
+
+
+def fch_car_refresh_update(ODS_table_name: str, STG_source: str, key_range: str = "") -> str:
+    """
+    UPDATE copying FCH_CAR of STG to the rows of ODS that the MERGE didn't update (same HSH_ROW), so FCH_CAR keeps meaning
+    "last load in which the row was in STG". Only FCH_CAR is written; the rows updated by the MERGE already have it.
+
+    Args:
+        ODS_table_name (str): The ODS table.
+        STG_source (str): The STG table.
+        key_range (str): Predicate on STG.HSH_PK0 (the range of a batch, for the batched Stored Procedures). Empty: the whole table.
+
+    Returns:
+        str: The UPDATE.
+    """
+
+    return f"""UPDATE ODS
+            SET FCH_CAR = STG.FCH_CAR
+            FROM {ODS_table_name} ODS
+            INNER JOIN {STG_source} STG ON STG.HSH_PK0 = ODS.HSH_PK0
+            WHERE (ODS.FCH_CAR < STG.FCH_CAR OR ODS.FCH_CAR IS NULL){key_range};"""
+
+
+
+
+def soft_delete_update(ODS_table_name: str, STG_source: str, window: str, top: str = None) -> str:
+    """
+    UPDATE marking as deleted the rows of ODS (in the window) missing from STG. The rows already marked are skipped.
+
+    Args:
+        ODS_table_name (str): The ODS table.
+        STG_source (str): The STG table.
+        window (str): Predicate on ODS (see soft_delete_window).
+        top (str): Rows per execution (e.g. "@BatchSize"), for the batched Stored Procedures. None: all of them.
+
+    Returns:
+        str: The UPDATE.
+    """
+
+    top_clause = f" TOP ({top})" if top else ""
+
+    return f"""UPDATE{top_clause} ODS
+            SET REG_ACT = 0
+            FROM {ODS_table_name} ODS
+            WHERE ISNULL(ODS.REG_ACT, '') <> '0'{window}
+            AND NOT EXISTS (SELECT 1 FROM {STG_source} STG WHERE STG.HSH_PK0 = ODS.HSH_PK0);"""
@@ -1,36 +1,203 @@
 import pandas as pd
 from Utils.params import *
-from Utils.Utils import load_table_info_df, get_ODS_table_name, get_STG_table_name, obtain_table_info
-from Generate_SQL_Code.Tables_Creation_ODS import clean_df_ODS, create_data_type
+from Utils.Utils import get_ODS_table_name, get_STG_table_name, obtain_table_info
+from Utils.class_TableInfoRegistry import get_table_info_registry
+from Utils.class_ResultCollector import ResultCollector
+from Utils.class_BuildManifest import BuildManifest, hash_table_groups, registry_info_by_table
+from Generate_SQL_Code.Tables_Creation_ODS import clean_df_ODS
+from Generate_SQL_Code.SQL_Server_Types import add_sql_type_column
+from Generate_SQL_Code.Soft_Delete import get_date_incremental, get_soft_delete_mode, soft_delete_window, soft_delete_update, needs_fch_car_refresh, fch_car_refresh_update
+from Generate_SQL_Code.Key_Strategies import key_sql_type
 
 
 """
 Python Script to generate SQL Server code to create the stored procedures that take the data from the STG database to the ODS database.
+
+The MERGE only updates the rows whose content hash (HSH_ROW, computed in the Oracle select) changed. When the soft delete
+of the table is limited to a window of FCH_CAR, FCH_CAR of the other matched rows is refreshed with a narrow UPDATE
+(see fch_car_refresh_update): otherwise a row that never changes would leave the window and never be marked as deleted.
+The rows missing from STG are marked as deleted in the MERGE or in a separate UPDATE (see Soft_Delete.py); the tables
+loaded by watermark (see Watermarks.py) don't mark them.
+
+The tables with a batch size ('LOTE MERGE' of Info_Pks, SP_MERGE_BATCH_SIZE in params) get a batched template instead
+(see batched_stored_procedure): one MERGE per range of HSH_PK0, each one in its own transaction.
 """
 
 
-def get_date_incremental(date_incremental):
+def get_matched_condition(group) -> str:
+    """
+    Condition of the WHEN MATCHED of the MERGE: only the rows that changed (HSH_ROW), or that were deleted and come back (REG_ACT).
+    The tables with fields out of the hash (LOBs, see ROW_HASH_EXCLUDED_TYPES) update all the matched rows.
+    """
+    
+    if group[STG_TIPO].isin(ROW_HASH_EXCLUDED_TYPES).any():
+        return ""
     
-    if date_incremental.strip() == 'None': # Borrar solo los no nulos bien, sin lios
-        date_incremental = None
+    return " AND (ODS.HSH_ROW <> STG.HSH_ROW OR ODS.HSH_ROW IS NULL OR STG.HSH_ROW IS NULL OR ISNULL(ODS.REG_ACT, '') <> ISNULL(STG.REG_ACT, ''))"
+
+
+
+
 
-    if date_incremental:
-        return f" {date_incremental}"
+def get_merge_batch_size(info_tabla) -> int:
+    """
+    Rows per batch of the MERGE of a table (0: one MERGE of the whole STG table).
+    """
     
-    else:
-        return ""
+    batch_size = info_tabla.opciones.get(INFO_PKS_MERGE_BATCH_SIZE)
+    return max(int(float(batch_size)), 0) if batch_size is not None else SP_MERGE_BATCH_SIZE
+
+
+
+
+
+def batched_stored_procedure(stored_procedure_name: str, ODS_table_name: str, STG_source: str, Merge_Code: str, Merged_table: str,
+                             matched_condition: str, update_set: str, insert_fields: str, insert_values: str,
+                             soft_delete_window: str, batch_size: int, key_type: str = "binary(16)", refresh_fch_car: bool = False) -> str:
+    """
+    Stored Procedure merging STG into ODS in batches of 'batch_size' rows, in order of HSH_PK0:
+        - Each batch is the next range of keys (upper bound: the key number 'batch_size' after the last one), merged and committed
+          in its own transaction, so the log can be reused and the locks of ODS don't escalate to the whole table
+        - The rows missing from STG are marked as deleted afterwards, with UPDATE TOP (batch_size) until none is left
+        - The rows of every batch and the totals are reported with RAISERROR ... WITH NOWAIT (messages of the SSIS task)
+
+    The ranges of keys are read with TOP ... ORDER BY HSH_PK0: the STG tables of these Stored Procedures always get the
+    clustered index on HSH_PK0 after the load (see get_stg_post_load in Tables_Creation_STG.py), otherwise each batch
+    would scan and sort the whole STG heap.
+
+    Args:
+        stored_procedure_name (str): Name of the Stored Procedure.
+        ODS_table_name (str): The ODS table.
+        STG_source (str): The STG table the keys are read from (the same one read by the MERGE).
+        Merge_Code (str): The CTE with the format changes (empty if the fields don't change).
+        Merged_table (str): The source of the MERGE (the CTE or the STG table).
+        matched_condition (str): Condition of the WHEN MATCHED (see get_matched_condition).
+        update_set (str): Fields of the UPDATE SET.
+        insert_fields (str): Fields of the INSERT.
+        insert_values (str): VALUES of the INSERT.
+        soft_delete_window (str): Predicate limiting the rows of ODS marked as deleted (see Soft_Delete.py). None: no soft delete.
+        batch_size (int): Rows per batch.
+        key_type (str): SQL Server type of HSH_PK0 (see Key_Strategies.py).
+        refresh_fch_car (bool): Refresh FCH_CAR of the rows of the batch not updated by the MERGE (see needs_fch_car_refresh).
+
+    Returns:
+        str: The CREATE PROCEDURE.
+    """
+    
+    fch_car_refresh_code = ""
+    if refresh_fch_car:
+        update = fch_car_refresh_update(ODS_table_name, STG_source, key_range = " AND (@LastKey IS NULL OR STG.HSH_PK0 > @LastKey) AND STG.HSH_PK0 <= @MaxKey").replace("\n", "\n    ")
+        fch_car_refresh_code = f"""
+                
+                -- FCH_CAR de los registros del lote sin cambios (ventana del borrado lógico)
+                {update}"""
+    
+    soft_delete_code = ""
+    if soft_delete_window is not None:
+        update = soft_delete_update(ODS_table_name, STG_source, soft_delete_window, top = "@BatchSize").replace("\n", "\n    ")
+        soft_delete_code = f"""
+            -- Actualización de registros no encontrados en STG, por lotes
+            WHILE 1 = 1
+            BEGIN
+                {update}
+                
+                SET @Rows = @@ROWCOUNT;
+                IF @Rows = 0 BREAK;
+                
+                SET @Deleted += @Rows;
+                RAISERROR('{stored_procedure_name}: %d rows marked as deleted (%d in total)', 0, 1, @Rows, @Deleted) WITH NOWAIT;
+            END
+"""
+    
+    return f"""
+        CREATE PROCEDURE {stored_procedure_name}
+        AS
+        BEGIN
+            SET NOCOUNT ON;
+            
+            DECLARE @BatchSize int = {batch_size};
+            DECLARE @LastKey {key_type} = NULL;
+            DECLARE @MaxKey {key_type};
+            DECLARE @Rows int, @Batch int = 0, @Merged int = 0, @Deleted int = 0;
+            
+            BEGIN TRY
+            
+            WHILE 1 = 1
+            BEGIN
+                -- Rango de claves del lote: hasta la clave número @BatchSize después de la última
+                SET @MaxKey = NULL;
+                SELECT @MaxKey = MAX(HSH_PK0)
+                FROM (
+                    SELECT TOP (@BatchSize) HSH_PK0
+                    FROM {STG_source}
+                    WHERE @LastKey IS NULL OR HSH_PK0 > @LastKey
+                    ORDER BY HSH_PK0
+                ) AS KEYS
+                OPTION (RECOMPILE);
+                
+                IF @MaxKey IS NULL BREAK;
+                
+                BEGIN TRANSACTION;
+                {Merge_Code}
+                
+                -- Instrucción MERGE del lote
+                MERGE {ODS_table_name} ODS
+                USING (
+                    SELECT * FROM {Merged_table}
+                    WHERE (@LastKey IS NULL OR HSH_PK0 > @LastKey) AND HSH_PK0 <= @MaxKey
+                ) STG
+                ON ODS.[HSH_PK0] = STG.[HSH_PK0]
+                
+                -- Actualización de registros cuando coinciden (solo si han cambiado)
+                WHEN MATCHED{matched_condition} THEN
+                UPDATE SET
+                    {update_set}
+                
+                -- Inserción de nuevos registros cuando no coinciden
+                WHEN NOT MATCHED BY TARGET THEN
+                INSERT (
+                    {insert_fields}
+                    )
+                    
+                VALUES (
+                    {insert_values}
+                    )
+                OPTION (RECOMPILE);
+                
+                SET @Rows = @@ROWCOUNT;{fch_car_refresh_code}
+                COMMIT TRANSACTION;
+                
+                SET @Batch += 1;
+                SET @Merged += @Rows;
+                SET @LastKey = @MaxKey;
+                RAISERROR('{stored_procedure_name}: batch %d, %d rows merged (%d in total)', 0, 1, @Batch, @Rows, @Merged) WITH NOWAIT;
+            END
+            {soft_delete_code}
+            END TRY
+            BEGIN CATCH
+                IF @@TRANCOUNT > 0 ROLLBACK TRANSACTION;
+                THROW;
+            END CATCH
+            
+            RAISERROR('{stored_procedure_name}: %d batches, %d rows merged, %d rows marked as deleted', 0, 1, @Batch, @Merged, @Deleted) WITH NOWAIT;
+
+            END
+            """
 
 
 
 
 
-def generate_stored_procedure(df, df_tipo_tabla):
+def generate_stored_procedure(df, table_registry):
+    
+    # Tipo de dato SQL Server de cada campo (se calcula de una vez para todo el diccionario)
+    df = add_sql_type_column(df, use_ods_overrides=True)
        
     # Agrupar por la tabla de ODS
     grouped = df.groupby(ODS_TABLAS)
 
-    # Inicializar DataFrame de resultados
-    result_df = pd.DataFrame(columns=["ORIGEN", "TABLA ORIGEN", "QUERY CREATE"])
+    # Inicializar el colector de resultados
+    result = ResultCollector()
 
     # Procesar cada grupo
     for table_name, group in grouped:
@@ -42,7 +209,7 @@ def generate_stored_procedure(df, df_tipo_tabla):
                 
         # Nombre de la tabla ODS
         STG_table_name = get_STG_table_name(table_name_stg, abreviatura_origen)
-        ODS_table_name = get_ODS_table_name(table_name_ods, table_name_stg, abreviatura_origen, df_tipo_tabla)
+        ODS_table_name = get_ODS_table_name(table_name_ods, table_name_stg, abreviatura_origen, table_registry)
         stored_procedure_name = ODS_table_name.replace("[ods].[", "[ods].[SP_")
 
         # Crear campos para el SELECT y el MERGE
@@ -55,7 +222,7 @@ def generate_stored_procedure(df, df_tipo_tabla):
         for _, row in group.iterrows():
             field_name_stg = row[STG_CAMPOS]
             field_name_ods = row[ODS_CAMPOS] if pd.notna(row[ODS_CAMPOS]) else field_name_stg
-            tipo_dato = create_data_type(row)
+            tipo_dato = row[SQL_TYPE]
             
             if pd.notna(row[ODS_TIPO]) or pd.notna(row[ODS_SIZE]) or pd.notna(row[ODS_PRECISION]) or pd.notna(row[ODS_SCALE]):  # Hay al menos un dato que difiere
                 count_datos_que_difieren_de_STG_a_ODS += 1
@@ -69,20 +236,34 @@ def generate_stored_procedure(df, df_tipo_tabla):
             
 
         # Campos adicionales
-        additional_fields = ["HSH_PK0", "FCH_CAR", "DES_ORG", "CON_ORG", "REG_ACT"]
+        additional_fields = ["HSH_PK0", "HSH_ROW", "FCH_CAR", "DES_ORG", "CON_ORG", "REG_ACT"]
         fields_cambio_formato += additional_fields
         fields_update_set += [f"ODS.{col} = STG.{col}" for col in additional_fields]
         fields_not_matched_INSERT += [f"{col}" for col in additional_fields]
         fields_not_matched_VALUES += [f"STG.{col}" for col in additional_fields]
         
         # Obtener Date Incremental
-        info_tabla = obtain_table_info(table_name_stg, df_tipo_tabla)
+        info_tabla = obtain_table_info(table_name_stg, table_registry)
         date_incremental = get_date_incremental(info_tabla.incremental_STG_a_ODS)
+        matched_condition = get_matched_condition(group)
+        refresh_fch_car = bool(matched_condition) and needs_fch_car_refresh(info_tabla, table_name_stg) # Sin condición: el MERGE ya actualiza FCH_CAR
+        
+        # Registros no encontrados en STG: en el MERGE, en un UPDATE aparte (anti-join en la ventana incremental) o nada (watermark)
+        soft_delete_mode = get_soft_delete_mode(info_tabla, table_name_stg)
+        if soft_delete_mode == "MERGE":
+            soft_delete = f"""
+            
+            -- Actualización de registros no encontrados en STG
+            WHEN NOT MATCHED BY SOURCE{date_incremental} THEN
+            Update set  REG_ACT = 0"""
+        else:
+            soft_delete = ""
         
         
         
         if count_datos_que_difieren_de_STG_a_ODS > 0: #Hay al menos un dato diferente
             Merged_table = "CAMBIO_FORMATO"
+            STG_source = f"[ACQ].{STG_table_name}"
             fields_joined = ',\n           '.join(fields_cambio_formato)
             Merge_Code = f"""
             -- Creación del bloque CTE con el formato adecuado
@@ -94,12 +275,45 @@ def generate_stored_procedure(df, df_tipo_tabla):
             
         else:
             Merged_table = STG_table_name
+            STG_source = STG_table_name
             Merge_Code = ""  
 
         fileds_update_set_joined = ',\n        '.join(fields_update_set)
         fields_not_matched_INSERT_joined = ',\n        '.join(fields_not_matched_INSERT)
         fields_not_matched_VALUES_joined = ',\n        '.join(fields_not_matched_VALUES)
 
+        # Tablas grandes: MERGE por lotes
+        batch_size = get_merge_batch_size(info_tabla)
+        if batch_size:
+            stored_procedure = batched_stored_procedure(
+                stored_procedure_name, ODS_table_name, STG_source, Merge_Code, Merged_table,
+                matched_condition, fileds_update_set_joined, fields_not_matched_INSERT_joined, fields_not_matched_VALUES_joined,
+                soft_delete_window = {"MERGE": date_incremental, "ANTI_JOIN": soft_delete_window(info_tabla)}.get(soft_delete_mode),
+                batch_size = batch_size,
+                key_type = key_sql_type(info_tabla, table_name_stg),
+                refresh_fch_car = refresh_fch_car
+            )
+            result.add(origen, stored_procedure_name, stored_procedure.strip(), key=table_name)
+            continue
+
+        # FCH_CAR de los registros sin cambios: la ventana del borrado lógico es sobre FCH_CAR
+        if refresh_fch_car:
+            fch_car_refresh = f"""
+
+            -- FCH_CAR de los registros sin cambios (ventana del borrado lógico)
+            {fch_car_refresh_update(ODS_table_name, STG_source)}"""
+        else:
+            fch_car_refresh = ""
+
+        # Anti-join: UPDATE después del MERGE, solo en la ventana incremental (índice de FCH_CAR en ODS)
+        if soft_delete_mode == "ANTI_JOIN":
+            anti_join_soft_delete = f"""
+
+            -- Actualización de registros no encontrados en STG (anti-join en la ventana incremental)
+            {soft_delete_update(ODS_table_name, STG_source, soft_delete_window(info_tabla))}"""
+        else:
+            anti_join_soft_delete = ""
+
             # Crear el cuerpo del procedimiento almacenado
         stored_procedure = f"""
         CREATE PROCEDURE {stored_procedure_name}
@@ -111,8 +325,8 @@ def generate_stored_procedure(df, df_tipo_tabla):
             USING {Merged_table} STG
             ON ODS.[HSH_PK0] = STG.[HSH_PK0]
             
-            -- Actualización de registros cuando coinciden
-            WHEN MATCHED THEN
+            -- Actualización de registros cuando coinciden (solo si han cambiado)
+            WHEN MATCHED{matched_condition} THEN
             UPDATE SET
                 {fileds_update_set_joined}
             
@@ -124,42 +338,41 @@ def generate_stored_procedure(df, df_tipo_tabla):
                 
             VALUES (
                 {fields_not_matched_VALUES_joined}
-                )
-            
-            -- Actualización de registros no encontrados en STG
-            WHEN NOT MATCHED BY SOURCE{date_incremental} THEN
-            Update set  REG_ACT = 0; 
+                ){soft_delete}; {fch_car_refresh}{anti_join_soft_delete}
 
             END
             """
-        # Añadir al DataFrame de resultados
-              
-        result_df = pd.concat([result_df, pd.DataFrame({
-            "ORIGEN": [origen],
-            "TABLA ORIGEN": [stored_procedure_name],
-            "QUERY CREATE": [stored_procedure.strip()]
-        })], ignore_index=True)
+        # Añadir a los resultados
+        result.add(origen, stored_procedure_name, stored_procedure.strip(), key=table_name)
             
  
-    return result_df
+    return result.to_dataframe()
 
 
 
 
-def Stored_Procedures_STG_to_ODS(data_dict_path: str, output_path: str) -> None:
+def Stored_Procedures_STG_to_ODS(data_dict_df: pd.DataFrame, output_path: str, manifest: BuildManifest = None) -> None:
     
-    # Cargar archivos Excel
-    df = pd.read_excel(data_dict_path)
+    # Diccionario ya cargado (ver Utils/data_loader.py)
+    df = data_dict_df.copy()
     
-    df_tipo_tabla = load_table_info_df()
+    table_registry = get_table_info_registry()
 
     # Limpiar el DataFrame
     cleaned_df = clean_df_ODS(df)
 
+    # Incremental: solo las tablas que han cambiado desde la última ejecución (ver Utils/class_BuildManifest.py)
+    if manifest is not None:
+        table_hashes = hash_table_groups(cleaned_df, ODS_TABLAS, registry_info_by_table(cleaned_df, ODS_TABLAS, STG_TABLAS, table_registry))
+        changed_tables, cached_records = manifest.split_changed(table_hashes)
+        cleaned_df = cleaned_df[cleaned_df[ODS_TABLAS].isin(changed_tables)]
+
     # Generar los procedimientos almacenados
-    result_sp_df = generate_stored_procedure(cleaned_df, df_tipo_tabla)
+    result_sp_df = generate_stored_procedure(cleaned_df, table_registry)
     
+    if manifest is not None:
+        result_sp_df = manifest.merge_results(result_sp_df, table_hashes, cached_records)
 
     # Guardar los procedimientos generados en un archivo Excel
     result_sp_df.to_excel(output_path, index=False)
-    print(f'Stored Procedures generados en: {output_path}')
\ No newline at end of file
+    print(f'Stored Procedures generados en: {output_path}')
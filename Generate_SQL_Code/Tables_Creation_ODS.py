@@ -1,9 +1,20 @@
 import pandas as pd
-from Utils.Utils import get_ODS_table_name, clean_columns, load_table_info_df
+from Utils.Utils import get_ODS_table_name, clean_columns, obtain_table_info
+from Utils.class_TableInfoRegistry import get_table_info_registry
+from Utils.class_ResultCollector import ResultCollector
+from Utils.class_BuildManifest import BuildManifest, hash_table_groups, registry_info_by_table
 from Utils.params import *
+from Generate_SQL_Code.SQL_Server_Types import add_sql_type_column, join_fields_by_table, FIELDS_COLUMN
+from Generate_SQL_Code.Soft_Delete import needs_fch_car_index
+from Generate_SQL_Code.Key_Strategies import key_sql_type
 
 """
 Python Script to generate SQL Server code to create tables in the ODS database.
+
+The indexes, compression and storage of every table come from a DDL profile (ODS_DDL_PROFILES in params), chosen by
+its type in Info_Pks: by default the FACT tables are clustered columnstores, and the DIM tables rowstores with page compression.
+
+The tables whose soft delete is an anti-join limited to a window of FCH_CAR (see Soft_Delete.py) get an index on FCH_CAR.
 """
 
 
@@ -27,148 +38,153 @@ def clean_df_ODS(df):
 
 
 
-def format_with_precision_and_scale(tipo, precision, scale, default_precision=2, default_scale=0):
-    # Validar y asignar valores por defecto si es necesario
-    if pd.notna(precision) and pd.notna(scale):
-        if int(precision) <= 0:
-            precision = default_precision  # Valor predeterminado
-        if int(scale) < 0:
-            scale = default_scale  # Valor predeterminado
-        
-        return f"{tipo}({int(precision)}, {int(scale)})"
-    else:
-        return tipo
+def get_ods_ddl_profile(info_tabla, table_name: str) -> dict:
+    """
+    Chooses the DDL profile of an ODS table.
 
+    Args:
+        info_tabla (InfoTabla): The info of the table in Info_Pks (see obtain_table_info).
+        table_name (str): The name of the table, for the error message.
 
+    Returns:
+        dict: The options of the profile (CLUSTERED_INDEX, DATA_COMPRESSION, FILLFACTOR).
+    """
 
+    default_profile = ODS_DDL_PROFILE_BY_TABLE_TYPE[info_tabla.tipo_tabla]
+    profile_name = info_tabla.opciones.get(INFO_PKS_ODS_DDL_PROFILE, default_profile).upper()
 
-# Function to create SQL data type string
-def create_data_type(row):
-    tipo = row[ODS_TIPO] if pd.notna(row[ODS_TIPO]) else row[STG_TIPO]
-    size = row[ODS_SIZE] if pd.notna(row[ODS_SIZE]) else row[STG_SIZE]
-    precision = row[ODS_PRECISION] if pd.notna(row[ODS_PRECISION]) else row[STG_PRECISION]
-    scale = row[ODS_SCALE] if pd.notna(row[ODS_SCALE]) else row[STG_SCALE]    
-    
-    def is_convertible_to_int(value):
-        try:
-            return int(float(value))  # Convierte primero a float y luego a int
-        except (ValueError, TypeError):
-            return None  # Si no es convertible, devuelve None
-        
-    
-    size = is_convertible_to_int(size)
-    precision = is_convertible_to_int(precision)
-    scale = is_convertible_to_int(scale)
-    
-    if tipo == 'DB_TYPE_INT':
-        return "int"
-    
-    elif tipo in ['DB_TYPE_DATE', 'DB_TYPE_TIMESTAMP', 'DB_TYPE_DATETIME']:
-        return "datetime"
-    
-    elif tipo == 'DB_TYPE_CLOB':
-        return "nvarchar(max)"
-    
+    if profile_name not in ODS_DDL_PROFILES:
+        raise ValueError(f"Unknown ODS DDL profile '{profile_name}' for the table {table_name}. Options: {list(ODS_DDL_PROFILES)}")
 
-    elif tipo in ['DB_TYPE_NVARCHAR', 'DB_TYPE_VARCHAR', 'DB_TYPE_CHAR']:
-        tipo = "nvarchar"
+    return ODS_DDL_PROFILES[profile_name]
 
-        if pd.notna(size):
-            return f"{tipo}({int(size)})"
-        else:
-            return tipo
-    
-    
-    elif tipo == 'DB_TYPE_NUMBER':
-        tipo = "numeric"
-        
-        if pd.notna(size):
-            if int(size) == 127: # Bug del 127
-                return "nvarchar(38)"
-    
-        return format_with_precision_and_scale(tipo, precision, scale)
-    
-    elif tipo == 'DB_TYPE_DECIMAL':
-        tipo = "decimal"
-        return format_with_precision_and_scale(tipo, precision, scale)
-    
 
 
-    
-    else:
-        return tipo
 
+def get_ods_indexes(ods_table_name: str, profile: dict, storage: str) -> list:
+    """
+    Returns the primary key and indexes of an ODS table, to be added after its fields in the CREATE TABLE.
+        - COLUMNSTORE: clustered columnstore + nonclustered primary key on HSH_PK0 (the key of the MERGE)
+        - PRIMARY_KEY: clustered primary key on HSH_PK0, with the compression and fill factor of the profile
 
+    In a partition scheme the primary key can't be aligned (HSH_PK0 doesn't contain the partitioning column): it is
+    nonclustered, in ODS_INDEX_FILEGROUP, and the rowstore tables get a clustered (not unique) index on HSH_PK0.
 
+    Args:
+        ods_table_name (str): The name of the table in SQL Server ([ods].[...]).
+        profile (dict): The DDL profile (see get_ods_ddl_profile).
+        storage (str): Filegroup or partition scheme of the table.
 
+    Returns:
+        list: The lines of the primary key and the indexes.
+    """
+
+    name = ods_table_name.split(".")[-1].strip("[]")
+    is_partitioned = "(" in storage
+
+    options = []
+    if profile["FILLFACTOR"] is not None:
+        options.append(f"FILLFACTOR = {profile['FILLFACTOR']}")
+    if profile["DATA_COMPRESSION"]:
+        options.append(f"DATA_COMPRESSION = {profile['DATA_COMPRESSION']}")
+    with_options = f" WITH ({', '.join(options)})" if options else ""
+
+    pk_storage = f" ON {ODS_INDEX_FILEGROUP}" if is_partitioned else ""
+
+    if profile["CLUSTERED_INDEX"] == "COLUMNSTORE":
+        return [f"CONSTRAINT [PK_{name}] PRIMARY KEY NONCLUSTERED (HSH_PK0){pk_storage}",
+                f"INDEX [CCI_{name}] CLUSTERED COLUMNSTORE{with_options}"]
+
+    if is_partitioned:
+        return [f"CONSTRAINT [PK_{name}] PRIMARY KEY NONCLUSTERED (HSH_PK0){with_options}{pk_storage}",
+                f"INDEX [CIX_{name}] CLUSTERED (HSH_PK0){with_options}"]
+
+    if with_options:
+        return [f"CONSTRAINT [PK_{name}] PRIMARY KEY CLUSTERED (HSH_PK0){with_options}"]
+
+    return ["PRIMARY KEY(HSH_PK0)"]
 
-    
-    
 
-def ODS_Tables_creation_Logic(df, df_tipo_tabla):
-    # Group by "TABLA ORIGEN"
-    grouped = df.groupby(ODS_TABLAS)
 
-    # Initialize the result DataFrame
-    result_df = pd.DataFrame(columns=["ORIGEN", "TABLA ORIGEN", "QUERY CREATE"])
 
-    # Process each group
-    for table_name, group in grouped:
+def ODS_Tables_creation_Logic(df, table_registry):
+    # SQL Server data type of every field (ODS values take precedence over STG), in one pass
+    df = add_sql_type_column(df, use_ods_overrides=True)
+    field_names = df[ODS_CAMPOS].where(df[ODS_CAMPOS].notna(), df[STG_CAMPOS])
+    fields = "[" + field_names.astype(str) + "] " + df[SQL_TYPE].astype(str) + " NULL"
+    
+    # Group by "TABLA ORIGEN": one row per table, with the fields already joined
+    tables_df = join_fields_by_table(df, ODS_TABLAS, fields)
+
+    # Initialize the result collector
+    result = ResultCollector()
+
+    # Process each table
+    for table_row in tables_df.to_dict('records'):
+        table_name = table_row[ODS_TABLAS]
+        
         # Extract the origin abbreviation
-        origen = str(group['ORIGEN'].iloc[0])
+        origen = str(table_row['ORIGEN'])
         abreviatura_origen = origen[:3] if origen else "UNK"  # Default to "UNK" if origin is empty
         
         # New table name
-        stg_name = str(group[STG_TABLAS].iloc[0])
-        nuevo_name_tabla = get_ODS_table_name(table_name, stg_name, abreviatura_origen, df_tipo_tabla)
-
-        # Create table fields
-        fields = []
-        for _, row in group.iterrows():
-            field_name = row[ODS_CAMPOS] if pd.notna(row[ODS_CAMPOS]) else row[STG_CAMPOS]
-            field = f"[{field_name}] {create_data_type(row)} NULL"
-            fields.append(field)
+        stg_name = str(table_row[STG_TABLAS])
+        nuevo_name_tabla = get_ODS_table_name(table_name, stg_name, abreviatura_origen, table_registry)
         
         len_origen = len(origen)
         len_table_name = len(table_name)
+        info_tabla = obtain_table_info(stg_name, table_registry)
         
         additional_fields = [
-            "[HSH_PK0] binary(16) NOT NULL",
+            f"[HSH_PK0] {key_sql_type(info_tabla, stg_name)} NOT NULL",
+            "[HSH_ROW] binary(16) NULL",
             "[FCH_CAR] datetime NULL",
             f"[DES_ORG] nvarchar({len_table_name}) NULL",
             f"[CON_ORG] nvarchar({len_origen}) NULL",
             "[REG_ACT] nvarchar(1) NULL"
         ]
         
+        # Indexes and storage of the DDL profile of the table (DIM / FACT)
+        storage = info_tabla.opciones.get(INFO_PKS_ODS_STORAGE, ODS_STORAGE)
+        indexes = get_ods_indexes(nuevo_name_tabla, get_ods_ddl_profile(info_tabla, stg_name), storage)
+        if needs_fch_car_index(info_tabla, stg_name):
+            indexes.append(f"INDEX [IX_{nuevo_name_tabla.split('.')[-1].strip('[]')}_FCH_CAR] NONCLUSTERED (FCH_CAR) INCLUDE (HSH_PK0, REG_ACT)")
+        
         # Combine all fields
-        all_fields = fields + additional_fields
+        all_fields = [table_row[FIELDS_COLUMN]] + additional_fields + indexes
         
         # Create the full CREATE TABLE query
-        query_create = f"CREATE TABLE {nuevo_name_tabla} (\n" + ",\n".join(all_fields) + ",\nPRIMARY KEY(HSH_PK0)\n) ON [PRIMARY]"
+        query_create = f"CREATE TABLE {nuevo_name_tabla} (\n" + ",\n".join(all_fields) + f"\n) ON {storage}"
         
-        # Append to the result DataFrame
-        result_df = pd.concat([result_df, pd.DataFrame({
-            "ORIGEN": [origen],
-            "TABLA ORIGEN": [table_name],
-            "QUERY CREATE": [query_create]
-        })], ignore_index=True)
+        # Append to the result
+        result.add(origen, table_name, query_create, key=table_name)
         
     
-    return result_df
+    return result.to_dataframe()
 
 
 
 
 
-def ODS_tables_creation(data_dict_path: str, output_path: str) -> None:
+def ODS_tables_creation(data_dict_df: pd.DataFrame, output_path: str, manifest: BuildManifest = None) -> None:
 
-    df = pd.read_excel(data_dict_path)
+    df = data_dict_df.copy()
     
-    df_tipo_tabla = load_table_info_df()
+    table_registry = get_table_info_registry()
     
     cleaned_df = clean_df_ODS(df)
-    result_df = ODS_Tables_creation_Logic(cleaned_df, df_tipo_tabla)
+    
+    # Incremental: only the tables that changed since the last run (see Utils/class_BuildManifest.py)
+    if manifest is not None:
+        table_hashes = hash_table_groups(cleaned_df, ODS_TABLAS, registry_info_by_table(cleaned_df, ODS_TABLAS, STG_TABLAS, table_registry))
+        changed_tables, cached_records = manifest.split_changed(table_hashes)
+        cleaned_df = cleaned_df[cleaned_df[ODS_TABLAS].isin(changed_tables)]
+    
+    result_df = ODS_Tables_creation_Logic(cleaned_df, table_registry)
+    
+    if manifest is not None:
+        result_df = manifest.merge_results(result_df, table_hashes, cached_records)
 
     # Save the result to a new Excel file
     result_df.to_excel(output_path, index=False)
-    print(f'Archivo generado en: {output_path}')
\ No newline at end of file
+    print(f'Archivo generado en: {output_path}')
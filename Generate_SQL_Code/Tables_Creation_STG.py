@@ -1,117 +1,170 @@
 import pandas as pd
 
-from Utils.Utils import get_STG_table_name
+from Utils.params import *
+from Utils.Utils import get_STG_table_name, obtain_table_info
+from Utils.class_ResultCollector import ResultCollector
+from Utils.class_TableInfoRegistry import get_table_info_registry
+from Utils.class_BuildManifest import BuildManifest, hash_table_groups, registry_info_by_table
+from Generate_SQL_Code.SQL_Server_Types import add_sql_type_column, join_fields_by_table, FIELDS_COLUMN
+from Generate_SQL_Code.Watermarks import watermark_table_ddl
+from Generate_SQL_Code.Key_Strategies import key_sql_type
+from Generate_SQL_Code.Stored_Procedures_STG_to_ODS import get_merge_batch_size
 
 
 """
 Python Script to generate SQL Server code to create tables in the STG database.
 
+The tables are heaps, so the DFTs with a fast load profile bulk load them with minimal logging. Optionally, the SSIS package indexes them after the load
+(see stg_post_load_sql, STG_POST_LOAD in params), so the MERGE of the Stored Procedure doesn't scan and hash the whole table.
+The tables with a batched MERGE ('LOTE MERGE' > 0) are always indexed (see get_stg_post_load).
+
+If any table is loaded by watermark (column 'COLUMNA WATERMARK' of Info_Pks), the control table of the watermarks is created too.
+
 !! Warning: poor written code, but don't have time to improve it.
 """
 
 
 
-def STG_tables_creation(data_dict_path: str, output_path: str) -> None:
+def stg_index_name(stg_table: str) -> str:
+    """
+    Name of the post-load index of a STG table ([stg].[ORI_TABLE] --> CIX_ORI_TABLE_HSH_PK0).
     """
-    Function to generate SQL Server code to create tables in the STG database.
     
-    !! Warning: poor written code, but don't have time to improve it.
+    return f"CIX_{stg_table.split('.')[-1].strip('[]')}_HSH_PK0"
+
+
+
+
+def get_stg_post_load(info_tabla, table_name: str) -> str:
+    """
+    Post-load step of a STG table (INDEX, STATISTICS or NONE): the column 'POST CARGA STG' of Info_Pks, or STG_POST_LOAD.
+
+    The tables with a batched MERGE ('LOTE MERGE' > 0, see batched_stored_procedure) always get the clustered index on HSH_PK0:
+    every batch reads the next range of keys of STG, which on a heap is a scan and a sort of the whole table per batch.
+
+    Args:
+        info_tabla (InfoTabla): The info of the table in Info_Pks (see obtain_table_info).
+        table_name (str): The name of the table, for the error message.
+    """
+
+    post_load = info_tabla.opciones.get(INFO_PKS_STG_POST_LOAD, STG_POST_LOAD).upper()
+    if post_load not in STG_POST_LOAD_OPTIONS:
+        raise ValueError(f"Unknown STG post load '{post_load}' for the table {table_name}. Options: {STG_POST_LOAD_OPTIONS}")
+
+    if get_merge_batch_size(info_tabla):
+        return "INDEX"
+
+    return post_load
+
+
+
+
+def stg_post_load_sql(stg_table: str, post_load: str) -> str:
+    """
+    Statement run by the SSIS package after loading a STG table, before the Stored Procedure.
+
+    Args:
+        stg_table (str): The name of the STG table ([stg].[...]).
+        post_load (str): INDEX or STATISTICS (see STG_POST_LOAD in params).
+
+    Returns:
+        str: The statement.
+    """
+    
+    if post_load == "STATISTICS":
+        return f"UPDATE STATISTICS {stg_table}"
+    
+    return f"CREATE CLUSTERED INDEX [{stg_index_name(stg_table)}] ON {stg_table} ([HSH_PK0]) WITH (DATA_COMPRESSION = {STG_INDEX_DATA_COMPRESSION}, SORT_IN_TEMPDB = ON)"
+
+
+
+
+def stg_truncate_sql(stg_table: str, post_load: str) -> str:
+    """
+    Statement emptying a STG table before the load. The post-load index is dropped first: the DFT loads a heap.
+    """
+    
+    if post_load == "INDEX":
+        return f"DROP INDEX IF EXISTS [{stg_index_name(stg_table)}] ON {stg_table};\nTruncate Table {stg_table}"
+    
+    return f"Truncate Table {stg_table}"
+
+
+
+
+def uses_watermarks(data_dict_df: pd.DataFrame) -> bool:
     """
+    True if any table of the data dictionary is loaded by watermark.
+    """
+    
+    table_registry = get_table_info_registry()
+    tables = data_dict_df[STG_TABLAS].dropna().astype(str).str.strip().unique()
     
-    df = pd.read_excel(data_dict_path)
+    return any(table_registry.get_option(table, INFO_PKS_WATERMARK_COLUMN) for table in tables)
 
 
-    # Column Names
-    STG_CAMPOS = 'STG CAMPO ORIGEN'
-    STG_TABLAS = 'STG TABLA ORIGEN'
-    STG_TIPO = 'STG TIPO'
-    STG_SIZE = 'STG SIZE'
-    STG_PRECISION = 'STG PRECISION'
-    STG_SCALE = 'STG SCALE'
 
 
+def STG_tables_creation(data_dict_df: pd.DataFrame, output_path: str, manifest: BuildManifest = None) -> None:
+    """
+    Function to generate SQL Server code to create tables in the STG database.
+    
+    !! Warning: poor written code, but don't have time to improve it.
+    
+    Args:
+        data_dict_df (pd.DataFrame): Data dictionary, already loaded (see Utils/data_loader.py).
+        output_path (str): Path of the output Excel file.
+        manifest (BuildManifest): If given, only the tables that changed since the last run are generated (see Utils/class_BuildManifest.py).
+    """
+    
+    df = data_dict_df.copy()
+
 
     # Clean 'CAMPO ORIGEN' and 'TABLA ORIGEN'
     df[STG_CAMPOS] = df[STG_CAMPOS].str.strip().str.replace(",", "")
     df[STG_TABLAS] = df[STG_TABLAS].str.strip()
     df = df.drop_duplicates(subset=[STG_CAMPOS, STG_TABLAS])
 
+    table_registry = get_table_info_registry()
 
+    # Incremental: the tables whose rows didn't change reuse the query of the last run
+    if manifest is not None:
+        table_hashes = hash_table_groups(df, STG_TABLAS, registry_info_by_table(df, STG_TABLAS, STG_TABLAS, table_registry))
+        changed_tables, cached_records = manifest.split_changed(table_hashes)
+        df = df[df[STG_TABLAS].isin(changed_tables)]
 
-    # Function to create SQL data type string
-    def create_data_type(row):
-        
-        if row[STG_TIPO] in ['DB_TYPE_NVARCHAR', 'DB_TYPE_VARCHAR', 'DB_TYPE_CHAR']:    
-            
-            tipo = "nvarchar"
-            if pd.notna(row[STG_SIZE]):
-                size = int(row[STG_SIZE])  # Default size to 255 if NaN
-                return f"{tipo}({size})"
-                
-            else:
-                return tipo
-            
-        
-        elif row[STG_TIPO] == 'DB_TYPE_NUMBER':
-            tipo = "numeric"
-            
-            if int(row[STG_SIZE]) == 127: # Bug del 127
-                return "nvarchar(38)"
-            
-            if pd.notna(row[STG_PRECISION]) and pd.notna(row[STG_SCALE]):
-                precision = int(row[STG_PRECISION])
-                scale = int(row[STG_SCALE])
-                
-                if precision <= 0:
-                    precision = 2
-                if scale <= 0:
-                    scale = 0
-                return f"{tipo}({precision}, {scale})"
-            else:
-                return f"{tipo}"
-        
-        elif row[STG_TIPO] in ['DB_TYPE_DATE', 'DB_TYPE_TIMESTAMP']:
-            return "datetime"
-        
-            
-        elif row[STG_TIPO] in ['DB_TYPE_CLOB']:
-            return "nvarchar(max)"
-        
-        
-        else:
-            return row[STG_TIPO]
-        
-        
 
+    # SQL Server data type of every field, in one pass
+    df = add_sql_type_column(df)
+    fields = df[STG_CAMPOS].astype(str) + " " + df[SQL_TYPE].astype(str)
+    
+    # One row per "TABLA ORIGEN", with the fields already joined
+    tables_df = join_fields_by_table(df, STG_TABLAS, fields)
 
-    # Group by "TABLA ORIGEN"
-    grouped = df.groupby(STG_TABLAS)
-
-    # Initialize the result DataFrame
-    result_df = pd.DataFrame(columns=["ORIGEN", "TABLA ORIGEN", "QUERY CREATE"])
+    # Initialize the result collector
+    result = ResultCollector()
 
 
-    # Process each group
-    for table_name, group in grouped:
+    # Process each table
+    for table_row in tables_df.to_dict('records'):
+        table_name = table_row[STG_TABLAS]
+        
         # Extract the origin abbreviation
-        origen = str(group['ORIGEN'].iloc[0])
+        origen = str(table_row['ORIGEN'])
         abreviatura_origen = origen[:3] if origen else "UNK"  # Default to "UNK" if origin is empty
         
         # New table name
         nuevo_name_tabla = get_STG_table_name(table_name, abreviatura_origen)
         
-        # Create table fields
-        fields = []
-        for _, row in group.iterrows():
-            field = f"{row[STG_CAMPOS]} {create_data_type(row)}"
-            fields.append(field)
-        
-        
         len_origen = len(origen)
         len_table_name = len(table_name)
         
+        # Type of the row key of the table (see Key_Strategies.py)
+        info_tabla = obtain_table_info(table_name, table_registry)
+        
         additional_fields = [
-            "[HSH_PK0] binary(16)",
+            f"[HSH_PK0] {key_sql_type(info_tabla, table_name)}",
+            "[HSH_ROW] binary(16)",
             "[FCH_CAR] datetime DEFAULT getdate()",
             f"[DES_ORG] nvarchar({len_table_name}) DEFAULT '{table_name}'",
             f"[CON_ORG] nvarchar({len_origen}) DEFAULT '{origen}'",
@@ -119,20 +172,23 @@ def STG_tables_creation(data_dict_path: str, output_path: str) -> None:
         ]
         
         # Combine all fields
-        all_fields = fields + additional_fields
+        all_fields = [table_row[FIELDS_COLUMN]] + additional_fields
         
         # Create the full CREATE TABLE query
         query_create = f"CREATE TABLE {nuevo_name_tabla} (\n" + ",\n".join(all_fields) + "\n);"
         
-        # Append to the result DataFrame
-        result_df = pd.concat([result_df, pd.DataFrame({
-            "ORIGEN": [origen],
-            "TABLA ORIGEN": [table_name],
-            "QUERY CREATE": [query_create]
-        })], ignore_index=True)
-
-    # Save the result to a new Excel file
+        # Append to the result
+        result.add(origen, table_name, query_create, key=table_name)
 
+    result_df = result.to_dataframe()
+    if manifest is not None:
+        result_df = manifest.merge_results(result_df, table_hashes, cached_records)
+    
+    # Control table of the watermarks (not in the manifest: it is always generated)
+    if uses_watermarks(data_dict_df):
+        watermark_df = pd.DataFrame([["", WATERMARK_TABLE, watermark_table_ddl()]], columns=result_df.columns)
+        result_df = pd.concat([result_df, watermark_df], ignore_index=True)
 
+    # Save the result to a new Excel file
     result_df.to_excel(output_path, index=False)
     print(f'Archivo generado en: {output_path}')
\ No newline at end of file
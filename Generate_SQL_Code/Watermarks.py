@@ -0,0 +1,146 @@
+import pandas as pd
+from Utils.params import *
+
+
+"""
+Python Script with the SQL of the incremental extraction by watermark (column 'COLUMNA WATERMARK' of Info_Pks).
+
+The last value loaded of the watermark column of every table is kept in a control table of SQL Server (WATERMARK_TABLE):
+    - The Oracle select filters the column with a literal (the initial value, so the query is valid when the package is designed)
+    - The SSIS package reads the watermark of the table before the load, and replaces the literal with it (SqlCommandVariable)
+    - After the Stored Procedure, the watermark is advanced to the maximum value loaded in STG
+
+STG is still truncated before the load, so it only holds the delta: the Stored Procedure of these tables doesn't mark
+as deleted (REG_ACT = 0) the rows missing from STG.
+
+The filter is '>=': the rows of the last instant are read again (the MERGE doesn't duplicate them), instead of losing
+the rows that arrived in the same second as the last load.
+
+The watermark is kept as text in a format that doesn't depend on the language of the sessions: dates as 'YYYY-MM-DD HH24:MI:SS'
+and numbers with '.' as decimal separator, as decimal(38, 10). Oracle reads the numbers with an explicit format and
+NLS_NUMERIC_CHARACTERS, since a plain TO_NUMBER fails (ORA-01722) in the sessions with ',' as decimal separator.
+"""
+
+
+# Tipos Oracle de la columna watermark: función de conversión y formato del valor guardado en SQL Server
+WATERMARK_DATE_TYPES = {'DB_TYPE_DATE': "TO_DATE", 'DB_TYPE_TIMESTAMP': "TO_TIMESTAMP"}
+WATERMARK_DATE_FORMAT = "YYYY-MM-DD HH24:MI:SS" # = CONVERT(nvarchar(19), fecha, 120) en SQL Server
+WATERMARK_NUMBER_FORMAT = "9" * 28 + "D" + "9" * 10 # = CONVERT(nvarchar(64), CONVERT(decimal(38, 10), numero)) en SQL Server
+WATERMARK_NUMBER_NLS = "NLS_NUMERIC_CHARACTERS=''.,''" # Separador decimal del valor guardado, sea cual sea el de la sesión
+
+
+
+def watermark_initial_value(oracle_type: str) -> str:
+    """
+    Value of the watermark before the first load of a table (everything is loaded).
+    """
+
+    return WATERMARK_INITIAL_DATE if oracle_type in WATERMARK_DATE_TYPES else WATERMARK_INITIAL_NUMBER
+
+
+
+
+def watermark_filter(column: str, oracle_type: str) -> str:
+    """
+    WHERE clause of the Oracle select of a table with watermark, with the initial value as literal.
+
+    Args:
+        column (str): The watermark column.
+        oracle_type (str): Its Oracle type (DB_TYPE_...), a date or a number.
+
+    Returns:
+        str: The WHERE clause.
+    """
+
+    value = watermark_initial_value(oracle_type)
+
+    if oracle_type in WATERMARK_DATE_TYPES:
+        literal = f"{WATERMARK_DATE_TYPES[oracle_type]}('{value}', '{WATERMARK_DATE_FORMAT}')"
+    else:
+        literal = f"TO_NUMBER('{value}', '{WATERMARK_NUMBER_FORMAT}', '{WATERMARK_NUMBER_NLS}')"
+
+    return f"WHERE {column} >= {literal}"
+
+
+
+
+def find_watermark_type(column: str, fields: pd.Series, types: pd.Series, table_name: str) -> str:
+    """
+    Returns the Oracle type of the watermark column, looked up in the fields of the table.
+    The column must be loaded to STG, because the new watermark is computed there.
+    """
+
+    matches = types[fields.str.strip().str.upper() == column.strip().upper()]
+    if matches.empty:
+        raise ValueError(f"The watermark column '{column}' of {table_name} is not a field of the table in the data dictionary")
+
+    return str(matches.iloc[0])
+
+
+
+
+def watermark_query_expression(query: str) -> tuple:
+    """
+    SSIS expression of the Oracle select of a table with watermark: the literal of the filter is replaced with the
+    variable User::WATERMARK_VALUE (read from the control table before the load).
+
+    Args:
+        query (str): The select of the table (see watermark_filter), or of one of its partitions.
+
+    Returns:
+        tuple: The initial value of the watermark and the expression.
+    """
+
+    for initial_value in (WATERMARK_INITIAL_DATE, WATERMARK_INITIAL_NUMBER):
+        literal = f"'{initial_value}'"
+        if literal in query:
+            escaped_query = query.replace("\\", "\\\\").replace('"', '\\"').replace("\t", "\\t").replace("\n", "\\n")
+            expression = escaped_query.replace(literal, "'\" + @[User::WATERMARK_VALUE] + \"'")
+            return initial_value, f'"{expression}"'
+
+    raise ValueError(f"The query has no watermark filter:\n{query}")
+
+
+
+
+def watermark_table_ddl() -> str:
+    """
+    CREATE TABLE of the control table of the watermarks.
+    """
+
+    return f"""CREATE TABLE {WATERMARK_TABLE} (
+[TABLA] nvarchar(256) NOT NULL,
+[COLUMNA] nvarchar(128) NOT NULL,
+[VALOR] nvarchar(64) NULL,
+[FCH_ACT] datetime DEFAULT getdate(),
+PRIMARY KEY(TABLA)
+);"""
+
+
+
+
+def read_watermark_sql(stg_table: str, initial_value: str) -> str:
+    """
+    Query returning the watermark of a table (the initial value if the table was never loaded).
+    """
+
+    return f"SELECT ISNULL((SELECT VALOR FROM {WATERMARK_TABLE} WHERE TABLA = '{stg_table}'), '{initial_value}') AS VALOR"
+
+
+
+
+def advance_watermark_sql(stg_table: str, column: str, is_date: bool) -> str:
+    """
+    Statement advancing the watermark of a table to the maximum value loaded in STG (nothing changes if STG is empty).
+    The numbers are saved as decimal(38, 10), truncated (never above the maximum loaded), in the format read by watermark_filter.
+    """
+
+    max_value = f"CONVERT(nvarchar(19), MAX({column}), 120)" if is_date else f"CONVERT(nvarchar(64), CONVERT(decimal(38, 10), ROUND(MAX({column}), 10, 1)))"
+
+    return f"""DECLARE @VALOR nvarchar(64) = (SELECT {max_value} FROM {stg_table});
+IF @VALOR IS NOT NULL
+BEGIN
+    UPDATE {WATERMARK_TABLE} SET VALOR = @VALOR, FCH_ACT = getdate() WHERE TABLA = '{stg_table}';
+    IF @@ROWCOUNT = 0
+        INSERT INTO {WATERMARK_TABLE} (TABLA, COLUMNA, VALOR) VALUES ('{stg_table}', '{column}', @VALOR);
+END"""
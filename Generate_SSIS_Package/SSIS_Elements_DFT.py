@@ -2,8 +2,10 @@ import xml.etree.ElementTree as ET
 import pandas as pd
 
 from Utils.params import *
+from Utils.Utils import add_length_or_precision
 from Utils.class_Table import Table
 from Utils.class_SSIS_Object import SSIS_Object
+from Generate_SQL_Code.Key_Strategies import key_ssis_column
 
 from Generate_SSIS_Package.SSIS_Elements_DFT_SOURCE import add_source_to_data_flow_task
 from Generate_SSIS_Package.SSIS_Elements_DFT_DESTINATION import add_destination_to_data_flow_task
@@ -13,9 +15,81 @@ from Generate_SSIS_Package.SSIS_Elements_DFT_DESTINATION import add_destination_
 Script to manage the creation of the Data Flow Task, including:
     - Creation of the "Source DFT" to receive data
     - Creation of the "Destination DFT" to send data
+    - Sizing of the buffers of the DFT, from the estimated row width of the table
 """
 
 
+# Bytes of a value of each SSIS data type in the buffers (strings: per character, LOBs: only a reference is kept in the buffer)
+SSIS_TYPE_BYTES = {
+    'wstr': 2, 'str': 1, 'bytes': 1,
+    'numeric': 19, 'dbTimeStamp': 16, 'dbTimeStamp2': 16, 'dbDate': 4, 'date': 8,
+    'r8': 8, 'float': 8, 'r4': 4, 'i8': 8, 'i4': 4, 'i2': 2, 'ui1': 1, 'bool': 2, 'guid': 16,
+    'nText': 24, 'text': 24, 'image': 24, 'binary': 24, 'long': 24, 'xml': 24, 'file': 24,
+}
+VARIABLE_LENGTH_TYPES = ['wstr', 'str', 'bytes']
+DEFAULT_TYPE_BYTES = 16
+
+
+
+def estimate_row_width(reference_df_fields: pd.DataFrame) -> int:
+    """
+    Estimates the bytes of a row of the table in the buffers of the Data Flow Task.
+    The types and lengths are taken as they are written in the package (see add_length_or_precision).
+
+    Args:
+        reference_df_fields (pd.DataFrame): DataFrame containing the table fields information.
+
+    Returns:
+        int: The estimated row width, in bytes.
+    """
+
+    row_width = 0
+    for row in reference_df_fields.to_dict('records'):
+        attributes = add_length_or_precision({'dataType': row[COLUMNA_TIPO]}, row[COLUMNA_TIPO], row[COLUMNA_LONGITUD], row.get(COLUMNA_PRECISION), row.get(COLUMNA_ESCALA))
+        data_type = attributes['dataType']
+        type_bytes = SSIS_TYPE_BYTES.get(data_type, DEFAULT_TYPE_BYTES)
+
+        if data_type in VARIABLE_LENGTH_TYPES:
+            type_bytes *= int(float(attributes.get('length', 1)))
+        row_width += type_bytes
+
+    return max(row_width, 1)
+
+
+
+def get_buffer_properties(table_info: Table, reference_df_fields: pd.DataFrame) -> dict:
+    """
+    Computes the buffer properties of the Data Flow Task of a table: the buffer of DFT_BUFFER_SIZE bytes holds as many rows
+    as fit (between DFT_BUFFER_MIN_ROWS and DFT_BUFFER_MAX_ROWS). The columns 'BUFFER MAX ROWS' / 'BUFFER SIZE' of Info_Pks override them.
+
+    Args:
+        table_info (Table): An instance of the Table class containing table-specific information.
+        reference_df_fields (pd.DataFrame): DataFrame containing the table fields information (with the metadata columns).
+
+    Returns:
+        dict: The attributes of the pipeline element (defaultBufferMaxRows, defaultBufferSize, autoAdjustBufferSize).
+    """
+
+    row_width = estimate_row_width(reference_df_fields)
+
+    buffer_max_rows = min(max(DFT_BUFFER_SIZE // row_width, DFT_BUFFER_MIN_ROWS), DFT_BUFFER_MAX_ROWS)
+    buffer_size = min(max(DFT_BUFFER_SIZE, buffer_max_rows * row_width), DFT_BUFFER_MAX_SIZE)
+    buffer_max_rows = min(buffer_max_rows, max(buffer_size // row_width, 1)) # Filas muy anchas: las que quepan en el buffer máximo
+
+    # Per table values from Info_Pks
+    options = table_info.info_tabla.opciones
+    if INFO_PKS_BUFFER_MAX_ROWS in options:
+        buffer_max_rows = int(float(options[INFO_PKS_BUFFER_MAX_ROWS]))
+    if INFO_PKS_BUFFER_SIZE in options:
+        buffer_size = int(float(options[INFO_PKS_BUFFER_SIZE]))
+
+    return {
+        "defaultBufferMaxRows": str(buffer_max_rows),
+        "defaultBufferSize": str(buffer_size),
+        "autoAdjustBufferSize": str(DFT_AUTO_ADJUST_BUFFER_SIZE).lower(),
+    }
+
+
 
 def create_data_flow_task(parent_executables: ET.Element, table_info: Table, reference_df_fields: pd.DataFrame) -> None:
     """
@@ -41,22 +115,23 @@ def create_data_flow_task(parent_executables: ET.Element, table_info: Table, ref
     })
     
     
-    ET.SubElement(dft_task, "DTS:Variables")
-    Object_subelemnt = ET.SubElement(dft_task, "DTS:ObjectData")
-    pipeline = ET.SubElement(Object_subelemnt, "pipeline", {"version": "1"})
-    components = ET.SubElement(pipeline, "components")
-    
-    
-    
     # Add metadata columns to the queries that need it      
-    if "standard_hash(TO_CHAR" in table_info.query:
+    if " as HSH_PK0" in table_info.query:
         first_row = reference_df_fields.iloc[0]
         metadata_columns = [
-            {COLUMNA_ORIGEN: first_row[COLUMNA_ORIGEN], COLUMNA_TABLA: first_row[COLUMNA_TABLA], COLUMNA_CAMPO: 'HSH_PK0', COLUMNA_TIPO: 'bytes', COLUMNA_LONGITUD: 16, COLUMNA_PRECISION: None},
+            {COLUMNA_ORIGEN: first_row[COLUMNA_ORIGEN], COLUMNA_TABLA: first_row[COLUMNA_TABLA], **key_ssis_column(table_info.info_tabla, table_info.table_name)},
         ]
+        if "as HSH_ROW" in table_info.query:
+            metadata_columns.append({COLUMNA_ORIGEN: first_row[COLUMNA_ORIGEN], COLUMNA_TABLA: first_row[COLUMNA_TABLA], COLUMNA_CAMPO: 'HSH_ROW', COLUMNA_TIPO: 'bytes', COLUMNA_LONGITUD: 16, COLUMNA_PRECISION: None})
         metadata_df = pd.DataFrame(metadata_columns)
         reference_df_fields = pd.concat([reference_df_fields, metadata_df], ignore_index=True)
-        
+    
+    
+    ET.SubElement(dft_task, "DTS:Variables")
+    Object_subelemnt = ET.SubElement(dft_task, "DTS:ObjectData")
+    pipeline = ET.SubElement(Object_subelemnt, "pipeline", {"version": "1", **get_buffer_properties(table_info, reference_df_fields)})
+    components = ET.SubElement(pipeline, "components")
+    
             
     add_destination_to_data_flow_task(
         parent_executable = components, 
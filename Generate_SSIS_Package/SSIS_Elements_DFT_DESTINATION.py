@@ -8,10 +8,34 @@ from Utils.class_Table import Table
 
 """
 Script to Manage Destination Data Sending with SSIS
+
+The properties of the OLE DB Destination (access mode, fast load options, commit size) come from a destination profile
+(DESTINATION_PROFILES in params), chosen per table: by its type (DIM / FACT) or by the column 'PERFIL DESTINO' of Info_Pks.
 """
 
 
 
+def get_destination_profile(table_info: Table) -> dict:
+    """
+    Chooses the destination profile of a table.
+
+    Args:
+        table_info (Table): An instance of the Table class containing table-specific information.
+
+    Returns:
+        dict: The properties of the profile (AccessMode, FastLoadOptions, FastLoadMaxInsertCommitSize).
+    """
+
+    default_profile = DESTINATION_PROFILE_BY_TABLE_TYPE[table_info.info_tabla.tipo_tabla]
+    profile_name = table_info.info_tabla.opciones.get(INFO_PKS_DESTINATION_PROFILE, default_profile).upper()
+
+    if profile_name not in DESTINATION_PROFILES:
+        raise ValueError(f"Unknown destination profile '{profile_name}' for the table {table_info.table_name}. Options: {list(DESTINATION_PROFILES)}")
+
+    return DESTINATION_PROFILES[profile_name]
+
+
+
 def generate_input_columns(parent_executable: ET.Element, df: pd.DataFrame, table_info: Table) -> None:
     """
     Generates input columns for the destination component in the data flow task in SSIS.
@@ -86,6 +110,8 @@ def add_destination_to_data_flow_task(parent_executable: ET.Element, reference_d
     """
     
         
+    destination_profile = get_destination_profile(table_info)
+
     # Create the destination component
     component_id = table_info.generate_unique_id()
     component = ET.SubElement(parent_executable, "component", {
@@ -144,7 +170,7 @@ def add_destination_to_data_flow_task(parent_executable: ET.Element, reference_d
         "description": "Specifies the mode used to access the database.",
         "name": "AccessMode",
         "typeConverter": "AccessMode"
-    }).text = "0"
+    }).text = str(destination_profile["AccessMode"])
 
     ET.SubElement(properties, "property", {
         "dataType": "System.Boolean",
@@ -162,13 +188,13 @@ def add_destination_to_data_flow_task(parent_executable: ET.Element, reference_d
         "dataType": "System.String",
         "description": "Specifies options to be used with fast load.  Applies only if fast load is turned on.",
         "name": "FastLoadOptions"
-    }).text = ""
+    }).text = destination_profile["FastLoadOptions"]
 
     ET.SubElement(properties, "property", {
         "dataType": "System.Int32",
         "description": "Specifies when commits are issued during data insertion.  A value of 0 specifies that one commit will be issued at the end of data insertion.  Applies only if fast load is turned on.",
         "name": "FastLoadMaxInsertCommitSize"
-    }).text = "2147483647"
+    }).text = str(destination_profile["FastLoadMaxInsertCommitSize"])
 
 
     # Add connection
@@ -187,7 +187,7 @@ def add_source_to_data_flow_task(parent_executable: ET.Element, reference_df_fie
     "dataType": "System.String",
     "description": "The variable that contains the SQL command to be executed.",
     "name": "SqlCommandVariable"
-    }).text=""
+    }).text = f"User::{table_info.source_query_variable}" if table_info.watermark_column else ""
 
     ET.SubElement(properties, "property", {
         "dataType": "System.Int32",
@@ -206,7 +206,7 @@ def add_source_to_data_flow_task(parent_executable: ET.Element, reference_df_fie
         "description": "Specifies the mode used to access the database.",
         "name": "AccessMode",
         "typeConverter": "AccessMode"
-    }).text = "2"
+    }).text = "3" if table_info.watermark_column else "2" # 3: SQL command from variable (watermark)
 
     ET.SubElement(properties, "property", {
         "dataType": "System.String",
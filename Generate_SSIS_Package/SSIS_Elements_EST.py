@@ -4,6 +4,8 @@ import pandas as pd
 
 from Utils.params import *
 from Utils.class_Table import Table
+from Generate_SQL_Code.Watermarks import read_watermark_sql, advance_watermark_sql
+from Generate_SQL_Code.Tables_Creation_STG import stg_post_load_sql, stg_truncate_sql
 
 
 """
@@ -36,7 +38,42 @@ def create_execute_sql_task_TRUNCATE(parent_executables: ET.Element, table_info:
     Object_subelemnt = ET.SubElement(est_task, "DTS:ObjectData")
     ET.SubElement(Object_subelemnt, "SQLTask:SqlTaskData", {
         "SQLTask:Connection": table_info.destination_connection_unique_id,
-        "SQLTask:SqlStatementSource" : f"Truncate Table {table_info.SqlServer_Table_Name}",
+        "SQLTask:SqlStatementSource" : stg_truncate_sql(table_info.SqlServer_Table_Name, table_info.stg_post_load),
+        "xmlns:SQLTask": "www.microsoft.com/sqlserver/dts/tasks/sqltask"
+    })
+    
+
+
+
+
+def create_execute_sql_task_POST_LOAD(parent_executables: ET.Element, table_info: Table) -> None:
+    """
+    Creates an Execute SQL Task in SSIS that indexes the STG table (or updates its statistics) after the load,
+    so the MERGE of the Stored Procedure can seek / merge join on HSH_PK0.
+
+    Args:
+        parent_executables (ET.Element): The parent XML element where the task will be added.
+        table_info (Table): An instance of the Table class containing table-specific information.
+    """
+    
+    est_id = table_info.generate_unique_id()
+    
+    est_task = ET.SubElement(parent_executables, "DTS:Executable", {
+        "DTS:refId": table_info.SQL_task_POST_LOAD_reference_path,
+        "DTS:CreationName": "Microsoft.ExecuteSQLTask",
+        "DTS:Description": "Execute SQL Task",
+        "DTS:DTSID": est_id,
+        "DTS:ExecutableType": "Microsoft.ExecuteSQLTask",
+        "DTS:LocaleID": "-1",
+        "DTS:ObjectName": table_info.SQL_task_POST_LOAD_name,
+        "DTS:TaskContact" : "Execute SQL Task; Microsoft Corporation; SQL Server 2019; © 2019 Microsoft Corporation; All Rights Reserved;http://www.microsoft.com/sql/support/default.asp;1"
+    })
+    
+    ET.SubElement(est_task, "DTS:Variables")
+    Object_subelemnt = ET.SubElement(est_task, "DTS:ObjectData")
+    ET.SubElement(Object_subelemnt, "SQLTask:SqlTaskData", {
+        "SQLTask:Connection": table_info.destination_connection_unique_id,
+        "SQLTask:SqlStatementSource" : stg_post_load_sql(table_info.SqlServer_Table_Name, table_info.stg_post_load),
         "xmlns:SQLTask": "www.microsoft.com/sqlserver/dts/tasks/sqltask"
     })
     
@@ -73,4 +110,78 @@ def create_execute_sql_task_EXECUTE_SP(parent_executables: ET.Element, table_inf
         "SQLTask:SqlStatementSource" : f"EXEC {table_info.Stored_Procedure_name}",
         "xmlns:SQLTask": "www.microsoft.com/sqlserver/dts/tasks/sqltask"
     })
-    
\ No newline at end of file
+    
+
+
+
+
+def create_execute_sql_task_WATERMARK_READ(parent_executables: ET.Element, table_info: Table) -> None:
+    """
+    Creates an Execute SQL Task in SSIS that reads the watermark of the table from the control table
+    into the variable of the SEQ container (single row result).
+
+    Args:
+        parent_executables (ET.Element): The parent XML element where the task will be added.
+        table_info (Table): An instance of the Table class containing table-specific information.
+    """
+    
+    est_id = table_info.generate_unique_id()
+    
+    est_task = ET.SubElement(parent_executables, "DTS:Executable", {
+        "DTS:refId": table_info.SQL_task_0_WATERMARK_READ_reference_path,
+        "DTS:CreationName": "Microsoft.ExecuteSQLTask",
+        "DTS:Description": "Execute SQL Task",
+        "DTS:DTSID": est_id,
+        "DTS:ExecutableType": "Microsoft.ExecuteSQLTask",
+        "DTS:LocaleID": "-1",
+        "DTS:ObjectName": table_info.SQL_task_0_WATERMARK_READ_name,
+        "DTS:TaskContact" : "Execute SQL Task; Microsoft Corporation; SQL Server 2019; © 2019 Microsoft Corporation; All Rights Reserved;http://www.microsoft.com/sql/support/default.asp;1"
+    })
+    
+    ET.SubElement(est_task, "DTS:Variables")
+    Object_subelemnt = ET.SubElement(est_task, "DTS:ObjectData")
+    sql_task_data = ET.SubElement(Object_subelemnt, "SQLTask:SqlTaskData", {
+        "SQLTask:Connection": table_info.destination_connection_unique_id,
+        "SQLTask:SqlStatementSource" : read_watermark_sql(table_info.SqlServer_Table_Name, table_info.watermark_initial_value),
+        "SQLTask:ResultType": "ResultSetType_SingleRow",
+        "xmlns:SQLTask": "www.microsoft.com/sqlserver/dts/tasks/sqltask"
+    })
+    ET.SubElement(sql_task_data, "SQLTask:ResultBinding", {
+        "SQLTask:ResultName": "0",
+        "SQLTask:DtsVariableName": f"User::{table_info.watermark_variable}"
+    })
+    
+
+
+
+
+def create_execute_sql_task_WATERMARK_ADVANCE(parent_executables: ET.Element, table_info: Table) -> None:
+    """
+    Creates an Execute SQL Task in SSIS that advances the watermark of the table to the maximum value loaded in STG.
+
+    Args:
+        parent_executables (ET.Element): The parent XML element where the task will be added.
+        table_info (Table): An instance of the Table class containing table-specific information.
+    """
+    
+    est_id = table_info.generate_unique_id()
+    is_date = table_info.watermark_initial_value == WATERMARK_INITIAL_DATE
+    
+    est_task = ET.SubElement(parent_executables, "DTS:Executable", {
+        "DTS:refId": table_info.SQL_task_3_WATERMARK_ADVANCE_reference_path,
+        "DTS:CreationName": "Microsoft.ExecuteSQLTask",
+        "DTS:Description": "Execute SQL Task",
+        "DTS:DTSID": est_id,
+        "DTS:ExecutableType": "Microsoft.ExecuteSQLTask",
+        "DTS:LocaleID": "-1",
+        "DTS:ObjectName": table_info.SQL_task_3_WATERMARK_ADVANCE_name,
+        "DTS:TaskContact" : "Execute SQL Task; Microsoft Corporation; SQL Server 2019; © 2019 Microsoft Corporation; All Rights Reserved;http://www.microsoft.com/sql/support/default.asp;1"
+    })
+    
+    ET.SubElement(est_task, "DTS:Variables")
+    Object_subelemnt = ET.SubElement(est_task, "DTS:ObjectData")
+    ET.SubElement(Object_subelemnt, "SQLTask:SqlTaskData", {
+        "SQLTask:Connection": table_info.destination_connection_unique_id,
+        "SQLTask:SqlStatementSource" : advance_watermark_sql(table_info.SqlServer_Table_Name, table_info.watermark_column, is_date),
+        "xmlns:SQLTask": "www.microsoft.com/sqlserver/dts/tasks/sqltask"
+    })
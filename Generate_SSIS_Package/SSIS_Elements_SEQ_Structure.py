@@ -1,5 +1,6 @@
 import xml.etree.ElementTree as ET
 import pandas as pd
+import itertools
 
 from Utils.params import *
 from Utils.class_Table import Table
@@ -7,6 +8,9 @@ from Utils.class_SSIS_Object import SSIS_Object
 
 from Generate_SSIS_Package.SSIS_Elements_DFT import create_data_flow_task
 from Generate_SSIS_Package.SSIS_Elements_EST import create_execute_sql_task_TRUNCATE, create_execute_sql_task_EXECUTE_SP
+from Generate_SSIS_Package.SSIS_Elements_EST import create_execute_sql_task_WATERMARK_READ, create_execute_sql_task_WATERMARK_ADVANCE
+from Generate_SSIS_Package.SSIS_Elements_EST import create_execute_sql_task_POST_LOAD
+from Generate_SQL_Code.Selects_from_Oracle import partition_query
 
 
 """
@@ -14,10 +18,18 @@ Script to structure a SEQ (Sequence Container in SSIS):
     - Define precedence constraints
     - Order the Data Flow Task (DFT)
     - Order the Execute SQL Task (EST)
+    - Split the extraction of a table in parallel DFTs, one per ORA_HASH bucket (column 'PARTICIONES' of Info_Pks)
+    - Read and advance the watermark of the incremental tables (column 'COLUMNA WATERMARK' of Info_Pks)
+    - Index the STG table (or update its statistics) between the load and the Stored Procedure (STG_POST_LOAD)
 """
 
 
-def create_precedence_constraint(precedence_constraints: ET.Element, precedence_name: str, from_task: str, to_task: str) -> None:
+# DTS:Value of a precedence constraint (without it: Success)
+PRECEDENCE_COMPLETION = "2"
+
+
+
+def create_precedence_constraint(precedence_constraints: ET.Element, precedence_name: str, from_task: str, to_task: str, value: str = None) -> None:
     """
     Creates a precedence constraint between two tasks in SSIS.
 
@@ -26,11 +38,12 @@ def create_precedence_constraint(precedence_constraints: ET.Element, precedence_
         precedence_name (str): The name of the precedence constraint.
         from_task (str): The path of the originating task.
         to_task (str): The path of the destination task.
+        value (str): Result of the originating task needed to run the destination task (None: Success, PRECEDENCE_COMPLETION: any result).
     """
     
     pc_id = SSIS_Object.generate_unique_id()
     
-    ET.SubElement(precedence_constraints, "DTS:PrecedenceConstraint", {
+    attributes = {
         "DTS:refId": f"{from_task}.PrecedenceConstraints[{precedence_name}]",
         "DTS:CreationName": "",
         "DTS:DTSID": f"{{{pc_id}}}",
@@ -38,7 +51,46 @@ def create_precedence_constraint(precedence_constraints: ET.Element, precedence_
         "DTS:LogicalAnd": "True",
         "DTS:ObjectName": precedence_name,
         "DTS:To": f"{to_task}"
+    }
+    if value is not None:
+        attributes["DTS:Value"] = value
+    
+    ET.SubElement(precedence_constraints, "DTS:PrecedenceConstraint", attributes)
+       
+
+
+
+
+def create_variable(seq_container: ET.Element, container_path: str, variable_name: str, value: str, expression: str = None) -> None:
+    """
+    Creates a String variable (namespace User) in a container in SSIS.
+
+    Args:
+        seq_container (ET.Element): The container holding the variable.
+        container_path (str): Reference path of the container.
+        variable_name (str): The name of the variable.
+        value (str): Its value (when it is an expression: the value at design time).
+        expression (str): SSIS expression evaluated at run time (None: a plain value).
+    """
+    
+    seq_variables = next(child for child in seq_container if child.tag == "DTS:Variables")
+    
+    attributes = {
+        "DTS:refId": f"{container_path}.Variables[User::{variable_name}]",
+        "DTS:CreationName": "",
+        "DTS:DTSID": f"{{{SSIS_Object.generate_unique_id()}}}",
+    }
+    if expression is not None:
+        attributes["DTS:EvaluateAsExpression"] = "True"
+        attributes["DTS:Expression"] = expression
+    attributes.update({
+        "DTS:IncludeInDebugDump": "2345",
+        "DTS:Namespace": "User",
+        "DTS:ObjectName": variable_name
     })
+    
+    variable = ET.SubElement(seq_variables, "DTS:Variable", attributes)
+    ET.SubElement(variable, "DTS:VariableValue", {"DTS:DataType": "8"}).text = value
        
 
 
@@ -59,12 +111,19 @@ def add_table_block_to_container(table_info: Table) -> None:
     # Create the cointaner of the element 
     seq_container, seq_executables = table_info.create_lower_level_container()
     
-    # Add Data Flow Task
-    create_data_flow_task(
-        parent_executables = seq_executables,  
-        table_info = table_info,
-        reference_df_fields = table_info.reference_df   # Solución temporal: Al limpiar código buscar donde se llamar eso y llamarlo según la clase
-    )   
+    # Add Data Flow Task (one per partition, all loading the same STG table)
+    partitions = table_info.get_partitions()
+    if partitions > 1:
+        dft_tables = [table_info.for_partition(partition, partitions, partition_query(table_info.query, partition, partitions)) for partition in range(partitions)]
+    else:
+        dft_tables = [table_info]
+    
+    for dft_table in dft_tables:
+        create_data_flow_task(
+            parent_executables = seq_executables,  
+            table_info = dft_table,
+            reference_df_fields = table_info.reference_df   # Solución temporal: Al limpiar código buscar donde se llamar eso y llamarlo según la clase
+        )   
     
     # Add Execute SQL Task # 1 --> Truncate
     create_execute_sql_task_TRUNCATE(
@@ -72,6 +131,16 @@ def add_table_block_to_container(table_info: Table) -> None:
         table_info = table_info
     )
     
+    # Add Execute SQL Task Post Load --> Index / statistics of STG
+    if table_info.stg_post_load != "NONE":
+        create_execute_sql_task_POST_LOAD(
+            parent_executables = seq_executables, 
+            table_info = table_info
+        )
+        after_load_task = table_info.SQL_task_POST_LOAD_reference_path
+    else:
+        after_load_task = table_info.SQL_task_2_EXEC_SP_reference_path
+    
     # Add Execute SQL Task # 2 --> No Definida aún
     create_execute_sql_task_EXECUTE_SP(
         parent_executables = seq_executables, 
@@ -79,21 +148,64 @@ def add_table_block_to_container(table_info: Table) -> None:
     )   
 
     
+    # Incremental by watermark: the select of each DFT is a variable built with the watermark, read before the load and advanced after the SP
+    if table_info.watermark_column:
+        create_variable(seq_container, table_info.SEQ_container_reference_path, table_info.watermark_variable, table_info.watermark_initial_value)
+        for dft_table in dft_tables:
+            create_variable(seq_container, table_info.SEQ_container_reference_path, dft_table.source_query_variable, dft_table.query, dft_table.source_query_expression)
+        
+        create_execute_sql_task_WATERMARK_READ(
+            parent_executables = seq_executables, 
+            table_info = table_info
+        )
+        create_execute_sql_task_WATERMARK_ADVANCE(
+            parent_executables = seq_executables, 
+            table_info = table_info
+        )
+
+    
     # Add Precedence Constraints
     precedence_constraints = ET.SubElement(seq_container, "DTS:PrecedenceConstraints")
+    precedence_names = (f"Constraint {number}" if number else "Constraint" for number in itertools.count())
+    
+    # EST 1 -> DFT 1 (..N)
+    for dft_table in dft_tables:
+        create_precedence_constraint(
+            precedence_constraints,  
+            precedence_name = next(precedence_names),
+            from_task = table_info.SQL_task_1_TRUNCATE_reference_path, 
+            to_task = dft_table.DFT_task_reference_path 
+        ) 
+    
+    # DFT 1 (..N) -> EST Post Load / EST 2 (LogicalAnd: after all the partitions)
+    for dft_table in dft_tables:
+        create_precedence_constraint(
+            precedence_constraints,  
+            precedence_name = next(precedence_names),
+            from_task = dft_table.DFT_task_reference_path, 
+            to_task = after_load_task 
+        )
+    
+    # EST Post Load -> EST 2
+    if table_info.stg_post_load != "NONE":
+        create_precedence_constraint(
+            precedence_constraints,  
+            precedence_name = next(precedence_names),
+            from_task = table_info.SQL_task_POST_LOAD_reference_path, 
+            to_task = table_info.SQL_task_2_EXEC_SP_reference_path 
+        )
     
-    # EST 1 -> DFT 1
-    create_precedence_constraint(
-        precedence_constraints,  
-        precedence_name = "Constraint",
-        from_task = table_info.SQL_task_1_TRUNCATE_reference_path, 
-        to_task = table_info.DFT_task_reference_path 
-    ) 
-    
-    # DFT 1 -> EST 2
-    create_precedence_constraint(
-        precedence_constraints,  
-        precedence_name = "Constraint 1",
-        from_task = table_info.DFT_task_reference_path, 
-        to_task = table_info.SQL_task_2_EXEC_SP_reference_path 
-    ) 
\ No newline at end of file
+    # EST WATERMARK READ -> EST 1 ... EST 2 -> EST WATERMARK ADVANCE
+    if table_info.watermark_column:
+        create_precedence_constraint(
+            precedence_constraints,  
+            precedence_name = next(precedence_names),
+            from_task = table_info.SQL_task_0_WATERMARK_READ_reference_path, 
+            to_task = table_info.SQL_task_1_TRUNCATE_reference_path 
+        ) 
+        create_precedence_constraint(
+            precedence_constraints,  
+            precedence_name = next(precedence_names),
+            from_task = table_info.SQL_task_2_EXEC_SP_reference_path, 
+            to_task = table_info.SQL_task_3_WATERMARK_ADVANCE_reference_path 
+        ) 
@@ -1,13 +1,17 @@
 import xml.etree.ElementTree as ET
 import pandas as pd
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 from Utils.class_Table import Table
 from Utils.class_SSIS_Object import SSIS_Object
 from Utils.params import *
-from Utils.Utils import load_table_info_df
+from Utils.class_TableInfoRegistry import get_table_info_registry
+from Utils.class_BuildManifest import BuildManifest, hash_object
 from Generate_SSIS_Package.SSIS_Elements_SEQ_Structure import add_table_block_to_container
 from Generate_SSIS_Package.SSIS_Structure_Functions import register_SSIS_package
+from Generate_SSIS_Package.SSIS_Streaming_Writer import DTSX_Stream_Writer, add_tables_placeholder, serialize_element
+from Generate_SSIS_Package.SSIS_Lanes_Scheduling import schedule_lanes, add_lane_containers
 
 
 
@@ -19,13 +23,125 @@ It handles reading and processing a reference Excel file, removing duplicates, a
 
 
 
-def create_dtsx(data_dictionary: dict, output_file_path: str) -> None:
+def build_table_block(origin_DB: str, table: str, all_info_rows: list, origin_seq_path: str, table_registry) -> tuple:
+    """
+    Builds the SEQ block of one table, detached from the package (its parent is a provisional Executables element).
+    The IDs of the block are derived from its reference path, so the same table always gets the same block.
+
+    Args:
+        origin_DB (str): The origin database name.
+        table (str): The name of the table.
+        all_info_rows (list): The info of all the rows associated with the table.
+        origin_seq_path (str): Reference path of the container of the block (origin, or lane of the origin: see SSIS_Lanes_Scheduling.py).
+        table_registry (TableInfoRegistry): The info concerning DIM / Facts.
+
+    Returns:
+        tuple: The SEQ container of the table and the set of IDs generated for it.
+    """
+    
+    table_executables = ET.Element("DTS:Executables")
+    
+    with SSIS_Object.deterministic_ids(f"{origin_seq_path}\\{table}") as block_ids:
+        table_info = Table([table_executables, origin_seq_path], origin_DB, table, all_info_rows, table_registry)
+        table_info.set_connections()
+        
+        add_table_block_to_container(                
+            table_info = table_info
+            )
+    
+    return table_executables[0], block_ids
+
+
+
+
+def table_block_hash(task: tuple, table_registry) -> str:
+    """
+    Hash of everything the XML of a table block depends on: the task (rows of the table, connections, indentation)
+    and the Info_Pks information of its STG / ODS names.
+    """
+    
+    first_row = task[2][0]
+    registry_info = [table_registry.get(str(first_row.get(column))) for column in (STG_TABLAS, ODS_TABLAS)]
+    
+    return hash_object(task, registry_info)
+
+
+
+
+# Tables sent together to a worker process (less inter-process overhead than one by one)
+TABLES_PER_WORKER_TASK = 8
+
+# Registry of each worker process (see init_table_worker)
+_worker_table_registry = None
+
+
+def init_table_worker(table_registry) -> None:
+    """
+    Initializer of the worker processes: the registry is sent only once per worker.
+    """
+    global _worker_table_registry
+    _worker_table_registry = table_registry
+
+
+
+def build_table_fragment(task: tuple) -> tuple:
+    """
+    Builds and serializes the SEQ block of one table in a worker process.
+
+    Args:
+        task (tuple): (origin_DB, table, all_info_rows, origin_seq_path, connection_lists, level, pretty_print)
+
+    Returns:
+        tuple: The XML of the block and the set of IDs generated for it (checked against the package in the main process).
+    """
+    
+    origin_DB, table, all_info_rows, origin_seq_path, connection_lists, level, pretty_print = task
+    
+    SSIS_Object.connection_info_Origin_1, SSIS_Object.connection_info_Origin_2, SSIS_Object.connection_info_SqlServer = connection_lists
+    SSIS_Object.existing_ids = set() # Solo los IDs de este bloque
+    
+    table_block, block_ids = build_table_block(origin_DB, table, all_info_rows, origin_seq_path, _worker_table_registry)
+    fragment = serialize_element(table_block, level, pretty_print)
+    
+    return fragment, block_ids
+
+
+
+
+def build_table_fragment_here(task: tuple, table_registry) -> tuple:
+    """
+    Builds and serializes the SEQ block of one table in the main process (IDs checked against the whole package).
+    """
+    
+    origin_DB, table, all_info_rows, origin_seq_path, connection_lists, level, pretty_print = task
+    
+    table_block, block_ids = build_table_block(origin_DB, table, all_info_rows, origin_seq_path, table_registry)
+    return serialize_element(table_block, level, pretty_print), block_ids
+
+
+
+
+def create_table_executor(jobs: int) -> ProcessPoolExecutor:
+    """
+    Creates the pool of processes used to build the table blocks in parallel.
+    The same pool can be shared by several packages (one per origin).
+    """
+    return ProcessPoolExecutor(max_workers = jobs, initializer = init_table_worker, initargs = (get_table_info_registry(),))
+
+
+
+
+def create_dtsx(data_dictionary: dict, output_file_path: str, pretty_print: bool = True, executor: ProcessPoolExecutor = None, manifest: BuildManifest = None) -> None:
     """
     Creates a DTSX package file based on the provided data dictionary and saves it to the specified output file path.
+    The SEQ block of each table is written to the file as soon as it is built (see SSIS_Streaming_Writer.py).
 
     Args:
         data_dictionary (dict): A dictionary where keys are origin database names and values are lists of tables and queries.
         output_file_path (str): The file path where the DTSX package will be saved.
+        pretty_print (bool): Indent the XML of the package.
+        executor (ProcessPoolExecutor): If given (see create_table_executor), the table blocks are built in parallel in its worker processes.
+        manifest (BuildManifest): If given, the blocks of the tables that didn't change since the last run are reused (see Utils/class_BuildManifest.py). It is saved by the caller.
     """
     
     # Register SSIS package and connections
@@ -34,46 +150,71 @@ def create_dtsx(data_dictionary: dict, output_file_path: str) -> None:
     SSIS_Object.connection_info_Origin_1 = Origin_1_connection_LIST
     SSIS_Object.connection_info_Origin_2 = Origin_2_connection_LIST
     SSIS_Object.connection_info_SqlServer = SqlServer_connection_LIST
+    connection_lists = (Origin_1_connection_LIST, Origin_2_connection_LIST, SqlServer_connection_LIST)
     
     # Create the main sequence container
     main_container = SSIS_Object(parent_object = [root_executables, None])
     main_seq_executables, _ = main_container.create_upper_level_container(level = 1)
     
-    # Df with DIM / FACT info
-    df_dim_facts = load_table_info_df()
+    # Registry with DIM / FACT info
+    table_registry = get_table_info_registry()
     
     
+    # Skeleton: container for each origin database (and its lanes), with a placeholder where its tables will be written
+    origin_sections = []
     for origin_DB, table_list in data_dictionary.items():
-                        
-        # Create container for each origin database
+        
         origin_container = SSIS_Object(parent_object = [main_seq_executables, None])
         origin_seq_executables, origin_seq_path = origin_container.create_upper_level_container(level = 2, origin_DB = origin_DB)       
-        parent_object = [origin_seq_executables, origin_seq_path]  
+        
+        if not table_list:
+            continue
+        
+        if SSIS_PARALLEL_LANES > 0: # Tablas repartidas en carriles paralelos (ver SSIS_Lanes_Scheduling.py)
+            lanes = schedule_lanes(table_list, table_registry, SSIS_PARALLEL_LANES)
+            for lane_tables, lane_path in add_lane_containers(origin_seq_executables, origin_seq_path, origin_DB, lanes):
+                origin_sections.append((origin_DB, lane_tables, lane_path))
+        else:
+            add_tables_placeholder(origin_seq_executables)
+            origin_sections.append((origin_DB, table_list, origin_seq_path))
+
+
+    # Write the skeleton and the tables, one by one
+    with DTSX_Stream_Writer(output_file_path, root, pretty_print = pretty_print) as writer:
+        
+        for origin_DB, table_list, origin_seq_path in origin_sections:
+            level = writer.next_section()
+            tasks = [(origin_DB, table, all_info_rows, origin_seq_path, connection_lists, level, pretty_print) for table, all_info_rows in table_list.items()]
             
+            # Blocks of the previous run (incremental generation)
+            cached_blocks = {}
+            block_hashes = {}
+            if manifest is not None:
+                for task in tasks:
+                    block_key = f"{origin_seq_path}\\{task[1]}"
+                    block_hashes[block_key] = table_block_hash(task, table_registry)
+                    cached_block = manifest.get(block_key, block_hashes[block_key])
+                    if cached_block is not None and SSIS_Object.register_ids(cached_block["ids"]):
+                        cached_blocks[block_key] = cached_block["fragment"]
             
-        for table, all_info_rows in table_list.items():
-                       
-            table_info = Table(parent_object, origin_DB, table, all_info_rows, df_dim_facts)
-            table_info.set_connections()
+            pending_tasks = [task for task in tasks if f"{origin_seq_path}\\{task[1]}" not in cached_blocks]
             
-            add_table_block_to_container(                
-                table_info = table_info
-                )
-
-
-    # Create the tree and write to the file
-    tree = ET.ElementTree(root)
-    ET.indent(tree, space="  ")  # Pretty print the XML
-    tree.write(output_file_path, encoding='utf-8', xml_declaration=True)
-
-
-
-
-
-
-
-
-
-
-
-
+            if executor is None:
+                built_blocks = (build_table_fragment_here(task, table_registry) for task in pending_tasks)
+            else: # Parallel: the workers return the blocks already serialized, in the same order as the tables
+                built_blocks = iter(executor.map(build_table_fragment, pending_tasks, chunksize = TABLES_PER_WORKER_TASK))
+            
+            for task in tasks:
+                block_key = f"{origin_seq_path}\\{task[1]}"
+                
+                if block_key in cached_blocks:
+                    writer.write_fragment(cached_blocks[block_key])
+                    continue
+                
+                fragment, block_ids = next(built_blocks)
+                if executor is not None and not SSIS_Object.register_ids(block_ids): # GUID repetido en otro proceso --> se rehace el bloque aquí
+                    fragment, block_ids = build_table_fragment_here(task, table_registry)
+                
+                if manifest is not None:
+                    manifest.put(block_key, block_hashes[block_key], {"fragment": fragment, "ids": sorted(block_ids)})
+                writer.write_fragment(fragment)
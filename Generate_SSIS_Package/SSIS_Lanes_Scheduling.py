@@ -0,0 +1,116 @@
+import xml.etree.ElementTree as ET
+
+from Utils.params import *
+from Utils.Utils import process_table_name_short
+from Utils.class_SSIS_Object import SSIS_Object
+from Generate_SSIS_Package.SSIS_Elements_SEQ_Structure import create_precedence_constraint, PRECEDENCE_COMPLETION
+from Generate_SSIS_Package.SSIS_Streaming_Writer import add_tables_placeholder
+
+
+
+"""
+Script to schedule the tables of an origin in parallel lanes (SSIS_PARALLEL_LANES in params).
+
+Without lanes every table SEQ hangs from the origin container without precedence constraints, so the order of the
+tables is whatever SSIS decides, and the biggest FACT tables can start the last ones. With lanes:
+    - The tables are split in N lanes balanced by their load weight (column 'PESO CARGA' of Info_Pks: estimated rows
+      or duration of the last loads), with LPT scheduling: heaviest table first, always to the least loaded lane
+    - Each lane is a SEQ container whose tables are chained by precedence constraints, heaviest first
+    - The lanes run in parallel, up to MaxConcurrentExecutables of the package (SSIS default unless
+      SSIS_MAX_CONCURRENT_EXECUTABLES is set, see SSIS_Structure_Functions.py)
+"""
+
+
+
+def table_load_weight(all_info_rows: list, table_registry) -> float:
+    """
+    Returns the load weight of a table from Info_Pks (None if it is not informed).
+
+    Args:
+        all_info_rows (list): The info of all the rows associated with the table.
+        table_registry (TableInfoRegistry): The info of Info_Pks.
+    """
+
+    weight = table_registry.get_option(str(all_info_rows[0][STG_TABLAS]), INFO_PKS_LOAD_WEIGHT)
+    return float(weight) if weight is not None else None
+
+
+
+
+def schedule_lanes(table_list: dict, table_registry, n_lanes: int) -> list:
+    """
+    Splits the tables of an origin in lanes with LPT (Longest Processing Time first) scheduling.
+    Tables without weight get the average weight of the rest (1 if no table has one); FACT tables go before DIM tables with the same weight.
+
+    Args:
+        table_list (dict): {table: all_info_rows} of the origin.
+        table_registry (TableInfoRegistry): The info of Info_Pks.
+        n_lanes (int): Number of lanes.
+
+    Returns:
+        list: One dict {table: all_info_rows} per lane (without the empty lanes), each one in execution order.
+    """
+
+    weights = {table: table_load_weight(all_info_rows, table_registry) for table, all_info_rows in table_list.items()}
+    known_weights = [weight for weight in weights.values() if weight is not None]
+    default_weight = sum(known_weights) / len(known_weights) if known_weights else 1
+    weights = {table: weight if weight is not None else default_weight for table, weight in weights.items()}
+
+    def is_fact(table) -> bool:
+        return table_registry.get(str(table_list[table][0][STG_TABLAS])).tipo_tabla == "FACT"
+
+    lanes = [{} for _ in range(n_lanes)]
+    lane_loads = [0] * n_lanes
+
+    for table in sorted(table_list, key = lambda table: (-weights[table], not is_fact(table), str(table))):
+        lane = lane_loads.index(min(lane_loads)) # El carril menos cargado (el primero si empatan)
+        lanes[lane][table] = table_list[table]
+        lane_loads[lane] += weights[table]
+
+    return [lane for lane in lanes if lane]
+
+
+
+
+def add_lane_containers(origin_seq_executables: ET.Element, origin_seq_path: str, origin_DB: str, lanes: list) -> list:
+    """
+    Adds the lane containers to the origin container: each one with a placeholder where its tables will be written,
+    and the precedence constraints chaining its tables (they are known before building the table blocks).
+
+    Args:
+        origin_seq_executables (ET.Element): The Executables element of the origin container.
+        origin_seq_path (str): Reference path of the origin container.
+        origin_DB (str): The origin database name.
+        lanes (list): Tables of each lane (see schedule_lanes).
+
+    Returns:
+        list: (tables of the lane, reference path of the lane container) for each lane, in the order of the placeholders.
+    """
+
+    lane_sections = []
+
+    for lane_number, lane_tables in enumerate(lanes, start = 1):
+        lane_name = f"SEQ | {origin_DB} | LANE {lane_number}"
+        lane_path = f"{origin_seq_path}\\{lane_name}"
+
+        lane_object = SSIS_Object(parent_object = [origin_seq_executables, origin_seq_path])
+        lane_container, lane_executables = lane_object.create_container(lane_name, lane_path)
+        add_tables_placeholder(lane_executables)
+
+        # Path of the SEQ of each table (same naming as Table.set_table_object_info)
+        table_paths = [f"{lane_path}\\SEQ | {process_table_name_short(table)}" for table in lane_tables]
+
+        if len(table_paths) > 1:
+            precedence_constraints = ET.SubElement(lane_container, "DTS:PrecedenceConstraints")
+            for constraint_number, (from_task, to_task) in enumerate(zip(table_paths, table_paths[1:])):
+                create_precedence_constraint(
+                    precedence_constraints,
+                    precedence_name = f"Constraint {constraint_number}" if constraint_number else "Constraint",
+                    from_task = from_task,
+                    to_task = to_task,
+                    value = PRECEDENCE_COMPLETION # Si falla una tabla, el resto del carril se carga igualmente
+                )
+
+        lane_sections.append((lane_tables, lane_path))
+
+    return lane_sections
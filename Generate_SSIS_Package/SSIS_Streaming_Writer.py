@@ -0,0 +1,177 @@
+import os
+import xml.etree.ElementTree as ET
+
+
+
+"""
+Script to write the DTSX file incrementally, table by table.
+
+The package "skeleton" (root, connections, SEQ | BIG and one SEQ per origin) is small, so it is built in memory as before.
+Inside the Executables of each origin a placeholder is added: the skeleton is serialized and cut at the placeholders.
+Then the SEQ block of each table is built alone, written to disk right after and freed, so the memory used doesn't grow with the number of tables.
+
+The result is the same file that ET.indent + tree.write would produce for the full tree.
+
+The package is written to '<path>.tmp' and renamed to its final path only when it is complete (os.replace): if the
+generation fails, the previous package (or none) stays in place instead of a truncated DTSX.
+"""
+
+
+PLACEHOLDER_TAG = "SEQ_TABLES_PLACEHOLDER"
+
+
+
+
+def add_tables_placeholder(parent_executables: ET.Element) -> ET.Element:
+    """
+    Marks the place where the SEQ blocks of the tables will be written.
+
+    Args:
+        parent_executables (ET.Element): The Executables element of the origin container.
+
+    Returns:
+        ET.Element: The placeholder element.
+    """
+    return ET.SubElement(parent_executables, PLACEHOLDER_TAG)
+
+
+
+
+def serialize_element(element: ET.Element, level: int, pretty_print: bool = True, space: str = "  ") -> str:
+    """
+    Serializes an element (without its tail), indented as if it was at 'level' in the full tree.
+
+    Args:
+        element (ET.Element): The element to serialize.
+        level (int): Depth of the element in the full tree (root = 0).
+        pretty_print (bool): If False, the element is serialized without indentation.
+        space (str): Indentation of one level.
+
+    Returns:
+        str: The XML of the element.
+    """
+
+    if pretty_print:
+        ET.indent(element, space=space, level=level)
+    element.tail = None
+    return ET.tostring(element, encoding="unicode")
+
+
+
+
+class DTSX_Stream_Writer:
+    """
+    Class writing a DTSX package section by section: one section per tables placeholder of the skeleton.
+    """
+
+
+    def __init__(self, output_file_path: str, root: ET.Element, pretty_print: bool = True, space: str = "  ") -> None:
+        """
+        Serializes the skeleton of the package and opens the temporary output file ('<output_file_path>.tmp').
+
+        Args:
+            output_file_path (str): The file path where the DTSX package will be saved.
+            root (ET.Element): Root of the package, with a placeholder (add_tables_placeholder) in every origin container.
+            pretty_print (bool): Indent the XML, as ET.indent would do.
+            space (str): Indentation of one level.
+        """
+
+        self.pretty_print = pretty_print
+        self.space = space
+
+        if pretty_print:
+            ET.indent(root, space=space)
+        skeleton = ET.tostring(root, encoding="unicode")
+
+        self.chunks = skeleton.split(f"<{PLACEHOLDER_TAG} />")
+        self.next_chunk = 0
+        self.level = 0
+        self.elements_in_section = 0
+
+        self.output_file_path = output_file_path
+        self.temp_file_path = f"{output_file_path}.tmp"
+        self.file = open(self.temp_file_path, "w", encoding="utf-8")
+        self.file.write("<?xml version='1.0' encoding='utf-8'?>\n")
+
+
+
+    def next_section(self) -> int:
+        """
+        Writes the skeleton up to the next placeholder.
+
+        Returns:
+            int: Depth of the elements of the section (level of the table SEQ blocks).
+        """
+
+        if self.next_chunk >= len(self.chunks) - 1:
+            raise ValueError("There are no more placeholders in the package skeleton")
+
+        chunk = self.chunks[self.next_chunk]
+        self.file.write(chunk)
+        self.next_chunk += 1
+        self.elements_in_section = 0
+
+        if self.pretty_print: # La indentación del placeholder es la última línea del trozo
+            self.level = len(chunk.rsplit("\n", 1)[-1]) // len(self.space)
+        return self.level
+
+
+
+    def write_fragment(self, fragment: str) -> None:
+        """
+        Writes an already serialized element in the current section (see serialize_element).
+        """
+
+        if self.elements_in_section and self.pretty_print:
+            self.file.write("\n" + self.space * self.level)
+        self.file.write(fragment)
+        self.elements_in_section += 1
+
+
+
+    def write_element(self, element: ET.Element) -> None:
+        """
+        Writes an element in the current section. The element can be freed afterwards.
+        """
+
+        self.write_fragment(serialize_element(element, self.level, self.pretty_print, self.space))
+
+
+
+    def close(self) -> None:
+        """
+        Writes the rest of the skeleton, closes the file and moves it to its final path.
+        """
+
+        for chunk in self.chunks[self.next_chunk:]:
+            self.file.write(chunk)
+        self.next_chunk = len(self.chunks)
+        self.file.close()
+        os.replace(self.temp_file_path, self.output_file_path)
+
+
+
+    def discard(self) -> None:
+        """
+        Closes and deletes the temporary file, leaving the final path untouched.
+        """
+
+        self.file.close()
+        if os.path.exists(self.temp_file_path):
+            os.remove(self.temp_file_path)
+
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            try:
+                self.close()
+            except BaseException:
+                self.discard()
+                raise
+        else:
+            self.discard()
@@ -36,6 +36,7 @@ def register_SSIS_package() -> tuple:
         "DTS:ExecutableType": "Microsoft.Package",  
         "DTS:LastModifiedProductVersion": "15.0.2000.180",
         "DTS:LocaleID": "3082",    # España
+        **({"DTS:MaxConcurrentExecutables": str(SSIS_MAX_CONCURRENT_EXECUTABLES)} if SSIS_MAX_CONCURRENT_EXECUTABLES != -1 else {}),   # -1: valor por defecto de SSIS
         "DTS:ObjectName": "New_object",   
         "DTS:PackageType": "5",    # SSIS standard package
         "DTS:VersionBuild": "2",    # Sube con guardados
@@ -46,8 +47,9 @@ def register_SSIS_package() -> tuple:
     package_format_version = ET.SubElement(root, "DTS:Property", {"DTS:Name": "PackageFormatVersion"})
     package_format_version.text = "8"
     
-    # Conections
-    root, origin_1_connection_ID, origin_2_connection_LIST, SqlServer_connection_LIST = register_connections(root)
+    # Conections (fixed IDs: the table blocks reference them, see SSIS_Object.deterministic_ids)
+    with SSIS_Object.deterministic_ids("Package\\ConnectionManagers"):
+        root, origin_1_connection_ID, origin_2_connection_LIST, SqlServer_connection_LIST = register_connections(root)
     
     # Add Variables element
     variables = ET.SubElement(root, "DTS:Variables")
@@ -5,10 +5,14 @@ import re
 import numpy as np
 
 from Utils.params import *
+from Utils.data_loader import load_info_pks
 
 from collections import namedtuple
 
 
+# opciones: values of the optional columns of Info_Pks (INFO_PKS_OPTIONAL_COLUMNS) filled for the table
+InfoTabla = namedtuple('InfoTabla', ['tabla_origen', 'tipo_tabla', 'incremental_ORACLE_a_STG', 'incremental_STG_a_ODS', 'pks', 'opciones'], defaults=[None])
+
 
 
 def generate_creation_date() -> str:
@@ -113,24 +117,21 @@ def load_table_info_df() -> pd.DataFrame:
     """
     Loads the table information from the Excel file and cleans the columns.
     """
-    table_info_df = pd.read_excel('data/Info_Pks.xlsx')
+    table_info_df = load_info_pks()
     df_clean = clean_columns(table_info_df)
     return df_clean
     
 
 
 
-def obtain_table_info(nombre_tabla: str, df_tipo_tabla: pd.DataFrame) -> namedtuple:
+def obtain_table_info(nombre_tabla: str, table_registry) -> namedtuple:
     
     """
-    Retrieves the type of table ("DIM" or "FACT") based on a reference table file.
+    Retrieves the info of a table ("DIM" or "FACT", incrementals and pks) from the Info_Pks registry.
 
-    This function compares the name of a table with a list of tables and their types 
-    from an Excel file and determines if the table is of type "DIM" or "FACT".
-    
     Args:
         nombre_tabla (str): The name (of STG!!) of the table you want to verify.
-        df_tipo_tabla (pd.DataFrame): DataFrame that contains the names of the tables and their associated type, from an Excel file.
+        table_registry (TableInfoRegistry): Registry built once from the Info_Pks Excel file.
 
     Returns:
         namedtuple: A namedtuple with the following attributes:
@@ -139,46 +140,14 @@ def obtain_table_info(nombre_tabla: str, df_tipo_tabla: pd.DataFrame) -> namedtu
             - incremental_ORACLE_a_STG (str): Incremental from Oracle to STG.
             - incremental_STG_a_ODS (str): Incremental from STG to ODS.
             - pks (str): Primary keys associated with the table.
+            - opciones (dict): Optional settings of the table (see INFO_PKS_OPTIONAL_COLUMNS).
     
     Note:
-        Ensure that you have imported the Excel file previously with the following line:
-        df_tipo_tabla = pd.read_excel('----/Info_Pks.xlsx')
-        
-        Important: Avoid placing the import inside a loop.
+        Build the registry only once, outside of any loop:
+        table_registry = get_table_info_registry()
     """
     
-    InfoTabla = namedtuple('InfoTabla', ['tabla_origen', 'tipo_tabla', 'incremental_ORACLE_a_STG', 'incremental_STG_a_ODS', 'pks'])
-    
-    nombre_tabla_estandarizado = process_table_name_short(nombre_tabla)
-    
-    # Recorrer el dataframe y encontrar coincidencias con la tabla actual
-    for index, row in df_tipo_tabla.iterrows():
-        tabla_origen = row['TABLAS ORIGEN']
-        tipo_tabla_ = str(row['TIPO TABLA'])
-        incremental_ORACLE_a_STG_ = str(row['INCREMENTAL ORACLE STG'])
-        incremental_STG_a_ODS_ = str(row['INCREMENTAL STG ODS'])
-        row_pks = str(row['PK'])
-        
-        tabla_origen_estandarizado = process_table_name_short(tabla_origen)
-        
-        # Si los nombres coinciden, devolvemos el tipo de tabla
-        if nombre_tabla_estandarizado == tabla_origen_estandarizado:
-            
-            if "FACT" in tipo_tabla_.upper():
-                tipo_tabla =  "FACT"
-                print(f'+1 Fact ({nombre_tabla_estandarizado}) - {tipo_tabla_}')
-            
-            else:
-                tipo_tabla = "DIM"
-            
-            incremental_ORACLE_a_STG = incremental_ORACLE_a_STG_
-            incremental_STG_a_ODS = incremental_STG_a_ODS_
-            pks = get_pks(row_pks)
-   
-            return InfoTabla(nombre_tabla_estandarizado, tipo_tabla, incremental_ORACLE_a_STG, incremental_STG_a_ODS, pks)
-    
-    # Si no se encuentra ninguna coincidencia, devolver "DIM" por defecto
-    return InfoTabla(nombre_tabla_estandarizado, "DIM", "", "", "")
+    return table_registry.get(nombre_tabla)
 
 
 
@@ -224,7 +193,7 @@ def get_STG_table_name(table_name:str, abreviatura_origen:str) -> str:
 
 
 
-def get_ODS_table_name(table_name:str, stg_name:str, abreviatura_origen:str, df_tipo_tabla: pd.DataFrame) -> str:
+def get_ODS_table_name(table_name:str, stg_name:str, abreviatura_origen:str, table_registry) -> str:
     """
     Get the correct name for the ODS tables
     
@@ -232,14 +201,14 @@ def get_ODS_table_name(table_name:str, stg_name:str, abreviatura_origen:str, df_
         table_name (str): ODS table name according to the excel data dict
         stg_name (str): STG table name, for comparing with the information of the pks / dim dict files   
         abreviatura_origen (str): first 3 letters of the origin name
-        df_tipo_tabla (dataframe): df of the tables types (DIM / FACT) & pks
+        table_registry (TableInfoRegistry): registry of the tables types (DIM / FACT) & pks
 
     Returns:
         str: ODS table name
     """
        
     Data_base_name = process_table_name_short(table_name)
-    info_tabla = obtain_table_info(stg_name, df_tipo_tabla)
+    info_tabla = obtain_table_info(stg_name, table_registry)
     tipo_tabla = info_tabla.tipo_tabla
     nuevo_name_tabla = f"[ods].[{abreviatura_origen}_{tipo_tabla}_{Data_base_name}]"
     
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from Utils.data_loader import write_atomically
+
+
+
+"""
+This script defines the BuildManifest class, used to regenerate only the tables whose information changed.
+
+For every table of a generator (STG / ODS tables, Stored Procedures, SSIS blocks) the manifest keeps:
+    - A hash of the rows of the table in Data_Dict.xlsx and of its row in Info_Pks.xlsx
+    - The artifact generated for the table (query, or XML block of the package)
+
+In the next run, the tables with the same hash reuse the artifact; only the rest are generated again.
+The manifest is discarded if the code of the generators or the settings of params change (see code_fingerprint): the
+environment variables read by params.py (KEY_STRATEGY, SP_SOFT_DELETE, STG_POST_LOAD...) change the artifacts too.
+"""
+
+
+# Folders whose code generates the artifacts: if they change, all the artifacts are generated again
+GENERATOR_FOLDERS = ["Utils", "Generate_SQL_Code", "Generate_SSIS_Package"]
+
+
+
+
+def params_fingerprint() -> str:
+    """
+    Returns a hash of the effective settings of Utils/params.py: every UPPER_CASE value, with the environment variables
+    already applied. Any new setting of params is covered without listing it here.
+    """
+
+    from Utils import params
+
+    settings = {name: value for name, value in vars(params).items() if name.isupper()}
+    return hash_object(settings)
+
+
+
+
+def code_fingerprint() -> str:
+    """
+    Returns a hash of the Python code of the generators and of the settings of params (see params_fingerprint).
+    """
+
+    project_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sha = hashlib.sha256()
+
+    for folder in GENERATOR_FOLDERS:
+        folder_path = os.path.join(project_folder, folder)
+        for file_name in sorted(os.listdir(folder_path)):
+            if file_name.endswith(".py"):
+                sha.update(file_name.encode())
+                with open(os.path.join(folder_path, file_name), "rb") as f:
+                    sha.update(f.read())
+
+    sha.update(params_fingerprint().encode())
+
+    return sha.hexdigest()
+
+
+
+
+def hash_table_groups(df: pd.DataFrame, table_column: str, extra_info: dict = None) -> dict:
+    """
+    Hashes the rows of each table of the data dictionary.
+
+    Args:
+        df (pd.DataFrame): Data dictionary, already cleaned by the generator.
+        table_column (str): Column with the table name (key of the manifest).
+        extra_info (dict): Additional information per table to include in the hash (e.g. its Info_Pks row).
+
+    Returns:
+        dict: {table name: hash}
+    """
+
+    if extra_info is None:
+        extra_info = {}
+
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    column_names = "|".join(map(str, df.columns)).encode()
+
+    table_hashes = {}
+    for table_name, positions in df.groupby(table_column, sort=True).indices.items():
+        sha = hashlib.sha256(column_names)
+        sha.update(row_hashes[positions].tobytes())
+        sha.update(repr(extra_info.get(table_name)).encode())
+        table_hashes[table_name] = sha.hexdigest()
+
+    return table_hashes
+
+
+
+
+def registry_info_by_table(df: pd.DataFrame, table_column: str, stg_table_column: str, table_registry) -> dict:
+    """
+    Returns the Info_Pks information (InfoTabla) of each table, looked up with the STG name of its first row.
+    """
+
+    first_rows = df.drop_duplicates(subset=[table_column])
+    return {table_name: table_registry.get(str(stg_name)) for table_name, stg_name in zip(first_rows[table_column], first_rows[stg_table_column])}
+
+
+
+
+def hash_object(*values) -> str:
+    """
+    Hashes any combination of values that can be dumped to JSON (rows of a table, namedtuples, paths...).
+    """
+
+    content = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+
+
+class BuildManifest:
+    """
+    Class holding the hash and the generated artifact of every table of one generator.
+    """
+
+
+    def __init__(self, manifest_path: str, fingerprint: str = None) -> None:
+        """
+        Loads the manifest of a previous run (if any, and if it was generated by the same code).
+
+        Args:
+            manifest_path (str): JSON file of the manifest.
+            fingerprint (str): Hash of the code and the settings of the generators. Defaults to code_fingerprint().
+        """
+
+        self.manifest_path = manifest_path
+        self.fingerprint = fingerprint if fingerprint is not None else code_fingerprint()
+        self.previous_entries = {}
+        self.entries = {}
+        self.reused = 0
+
+        if os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, encoding="utf-8") as f:
+                    content = json.load(f)
+            except ValueError: # Manifiesto ilegible (p.ej. truncado por una versión anterior): se genera todo
+                print(f"Manifest {os.path.basename(manifest_path)} is corrupt: every table is generated again")
+                content = {}
+            if content.get("fingerprint") == self.fingerprint:
+                self.previous_entries = content.get("entries", {})
+
+
+
+    def get(self, key: str, content_hash: str):
+        """
+        Returns the artifact of a table if its hash didn't change (None otherwise).
+        """
+
+        entry = self.previous_entries.get(key)
+        if entry is None or entry["hash"] != content_hash:
+            return None
+
+        self.entries[key] = entry
+        self.reused += 1
+        return entry["artifact"]
+
+
+
+    def put(self, key: str, content_hash: str, artifact) -> None:
+        """
+        Stores the artifact generated for a table (it must be JSON serializable).
+        """
+
+        self.entries[key] = {"hash": content_hash, "artifact": artifact}
+
+
+
+    def split_changed(self, table_hashes: dict) -> tuple:
+        """
+        Separates the tables to generate again from the ones that can reuse their artifact.
+
+        Args:
+            table_hashes (dict): {table name: hash} (see hash_table_groups).
+
+        Returns:
+            tuple: (list of tables to generate, {table name: cached artifact})
+        """
+
+        changed_tables = []
+        cached_artifacts = {}
+
+        for table_name, content_hash in table_hashes.items():
+            artifact = self.get(str(table_name), content_hash)
+            if artifact is None:
+                changed_tables.append(table_name)
+            else:
+                cached_artifacts[table_name] = artifact
+
+        return changed_tables, cached_artifacts
+
+
+
+    def merge_results(self, result_df: pd.DataFrame, table_hashes: dict, cached_artifacts: dict) -> pd.DataFrame:
+        """
+        Stores the new results of a SQL generator and adds the cached ones.
+
+        Args:
+            result_df (pd.DataFrame): Result of the generator for the changed tables, indexed by table name (see ResultCollector).
+            table_hashes (dict): {table name: hash}.
+            cached_artifacts (dict): {table name: cached record}.
+
+        Returns:
+            pd.DataFrame: All the results, in the same order as a full generation (sorted by table name).
+        """
+
+        for table_name, record in zip(result_df.index, result_df.itertuples(index=False)):
+            self.put(str(table_name), table_hashes[table_name], list(record))
+
+        cached_df = pd.DataFrame(list(cached_artifacts.values()), index=list(cached_artifacts.keys()), columns=result_df.columns)
+        merged_df = pd.concat([result_df, cached_df]) if len(cached_df) else result_df
+
+        return merged_df.sort_index().reset_index(drop=True)
+
+
+
+    def save(self) -> None:
+        """
+        Saves the manifest (only the tables of this run). It is written to a temporary file and renamed (see
+        write_atomically): if the process is killed while saving, the manifest of the previous run is kept.
+        """
+
+        folder = os.path.dirname(self.manifest_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        def write_manifest(path: str) -> None:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": self.fingerprint, "entries": self.entries}, f)
+
+        write_atomically(self.manifest_path, write_manifest)
+
+        print(f"Manifest {os.path.basename(self.manifest_path)}: {self.reused} reused, {len(self.entries) - self.reused} generated")
@@ -0,0 +1,76 @@
+import pandas as pd
+
+
+
+"""
+This script defines the ResultCollector class, used by the SQL generators (STG / ODS tables and Stored Procedures).
+
+Appending each table to a DataFrame with pd.concat copies the whole DataFrame on every iteration (O(n²) in number of tables).
+The collector keeps plain records in a list and builds the DataFrame only once, at the end.
+"""
+
+
+
+class ResultCollector:
+    """
+    Class collecting the generated queries of the SQL generators, one record per table.
+    """
+
+    DEFAULT_COLUMNS = ["ORIGEN", "TABLA ORIGEN", "QUERY CREATE"]
+
+
+    def __init__(self, columns: list = None) -> None:
+        """
+        Initializes an empty collector.
+
+        Args:
+            columns (list): Columns of the result. Defaults to ["ORIGEN", "TABLA ORIGEN", "QUERY CREATE"].
+        """
+
+        self.columns = list(columns) if columns else list(self.DEFAULT_COLUMNS)
+        self.records = []
+        self.keys = []
+
+
+
+    def add(self, *values, key=None) -> None:
+        """
+        Adds one record, with the values in the same order as the columns.
+
+        Args:
+            key: Table of the data dictionary that generated the record (index of the result, see class_BuildManifest.py).
+        """
+
+        if len(values) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} values ({self.columns}), got {len(values)}")
+
+        self.records.append(values)
+        self.keys.append(key)
+
+
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Builds the result DataFrame (only once, with all the records), indexed by the key of each record.
+        """
+
+        return pd.DataFrame(self.records, columns=self.columns, index=self.keys)
+
+
+
+    def to_excel(self, output_path: str) -> pd.DataFrame:
+        """
+        Saves the result to an Excel file.
+
+        Returns:
+            pd.DataFrame: The saved DataFrame.
+        """
+
+        result_df = self.to_dataframe()
+        result_df.to_excel(output_path, index=False)
+        return result_df
+
+
+
+    def __len__(self) -> int:
+        return len(self.records)
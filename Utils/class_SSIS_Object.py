@@ -1,5 +1,6 @@
 import uuid
 import xml.etree.ElementTree as ET
+from contextlib import contextmanager
 
 
 class SSIS_Object:
@@ -9,6 +10,11 @@ class SSIS_Object:
     
     existing_ids = set()
     
+    # Deterministic IDs (see deterministic_ids)
+    id_seed : str = None
+    id_counter : int = 0
+    scope_ids : set = None
+    
     connection_info_Origin_1 : list = None
     connection_info_Origin_2 : list = None
     connection_info_SqlServer : list = None
@@ -33,6 +39,9 @@ class SSIS_Object:
             str: Generated unique ID.
         """
         
+        if SSIS_Object.id_seed is not None:
+            return SSIS_Object.generate_deterministic_id()
+        
         new_id = str(uuid.uuid4()).upper()
         while new_id in cls.existing_ids:
             new_id = str(uuid.uuid4()).upper()
@@ -41,6 +50,67 @@ class SSIS_Object:
     
     
     
+    @classmethod
+    def generate_deterministic_id(cls) -> str:
+        """
+        Generates the next ID of the current seed (uuid5 of the seed and a counter).
+        The same block, built again with the same seed, gets the same IDs.
+        The state is kept in SSIS_Object (not in cls), so that Table and SSIS_Object share the same counter.
+        """
+        
+        new_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{SSIS_Object.id_seed}#{SSIS_Object.id_counter}")).upper()
+        SSIS_Object.id_counter += 1
+        while new_id in SSIS_Object.existing_ids: # Colisión con otro bloque: se sigue con el contador
+            new_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{SSIS_Object.id_seed}#{SSIS_Object.id_counter}")).upper()
+            SSIS_Object.id_counter += 1
+        SSIS_Object.existing_ids.add(new_id)
+        SSIS_Object.scope_ids.add(new_id)
+        return new_id
+    
+    
+    
+    @classmethod
+    @contextmanager
+    def deterministic_ids(cls, seed: str):
+        """
+        Context in which the IDs are derived from a seed (e.g. the reference path of a table block) instead of being random.
+        This way the XML of a block doesn't change between runs, and it can be reused (see Utils/class_BuildManifest.py).
+
+        Args:
+            seed (str): Seed of the IDs, unique in the package.
+
+        Yields:
+            set: The IDs generated inside the context.
+        """
+        
+        previous_scope = (SSIS_Object.id_seed, SSIS_Object.id_counter, SSIS_Object.scope_ids)
+        SSIS_Object.id_seed, SSIS_Object.id_counter, SSIS_Object.scope_ids = seed, 0, set()
+        try:
+            yield SSIS_Object.scope_ids
+        finally:
+            SSIS_Object.id_seed, SSIS_Object.id_counter, SSIS_Object.scope_ids = previous_scope
+    
+    
+    
+    @classmethod
+    def register_ids(cls, new_ids: set) -> bool:
+        """
+        Registers IDs generated in another process (parallel generation of the table blocks).
+
+        Args:
+            new_ids (set): IDs generated for one block.
+
+        Returns:
+            bool: False (and nothing is registered) if any of the IDs already exists in the package.
+        """
+        
+        if not cls.existing_ids.isdisjoint(new_ids):
+            return False
+        cls.existing_ids.update(new_ids)
+        return True
+    
+    
+    
     def create_container(self, container_name: str, ruta_reference: str)-> tuple[ET.Element, ET.Element]:
         """
         Creates a sequence container in the SSIS XML.
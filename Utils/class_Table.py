@@ -1,8 +1,11 @@
 from Utils.params import *
-from Utils.Utils import process_table_name_short, get_STG_table_name, get_ODS_table_name
+from Utils.Utils import process_table_name_short, get_STG_table_name, get_ODS_table_name, obtain_table_info
 from Utils.class_SSIS_Object import SSIS_Object
+from Generate_SQL_Code.Watermarks import watermark_query_expression
+from Generate_SQL_Code.Tables_Creation_STG import get_stg_post_load
 
 import pandas as pd
+import copy
 
 
 
@@ -15,6 +18,9 @@ Functions and their purposes:
     - set_connections: Sets up the connection information based on the origin database.
     - set_table_object_info: Sets up the table-related object information such as task names and paths.
     - create_lower_level_container: Creates a lower-level container for the table and returns the sequence container and its executables.
+    - get_partitions: Returns the number of partitions of the extraction of the table (column 'PARTICIONES' of Info_Pks).
+    - for_partition: Returns a copy of the table with the names, paths and query of the DFT of one partition.
+    - set_watermark_info: Sets up the variables and tasks of the incremental extraction by watermark (column 'COLUMNA WATERMARK' of Info_Pks).
 """
 
 
@@ -26,7 +32,7 @@ class Table(SSIS_Object):
     """
     
 
-    def __init__(self, parent_object: list, origin_DB: str, table_name: str, all_info_rows: dict, df_dim_facts:pd.DataFrame) -> None:
+    def __init__(self, parent_object: list, origin_DB: str, table_name: str, all_info_rows: dict, table_registry) -> None:
         """
         Initializes a Table object with the given parameters.
 
@@ -35,7 +41,7 @@ class Table(SSIS_Object):
             origin_DB (str): The origin database name.
             table_name (str): The name of the table.
             all_info_rows (dict): The info of all the wors associated with the table.
-            df_dim_facts (df): The info concerning DIM / Facts
+            table_registry (TableInfoRegistry): The info concerning DIM / Facts
         """
         
         super().__init__(parent_object)
@@ -43,7 +49,7 @@ class Table(SSIS_Object):
         self.table_name = table_name
         
         self.reference_df = pd.DataFrame(all_info_rows) 
-        self.df_dim_fact = df_dim_facts
+        self.table_registry = table_registry
         
         self.first_row_of_reference_df = all_info_rows[0]            
         self.query = self.first_row_of_reference_df["QUERY"]      
@@ -96,7 +102,8 @@ class Table(SSIS_Object):
             name_in_ods_according_to_data_dict = name_in_stg_according_to_data_dict
                         
         self.table_STG_name = get_STG_table_name(name_in_stg_according_to_data_dict, self.origin_connection_display_name)
-        self.table_ODS_name = get_ODS_table_name(name_in_stg_according_to_data_dict, name_in_ods_according_to_data_dict, self.origin_connection_display_name, self.df_dim_fact)
+        self.table_ODS_name = get_ODS_table_name(name_in_stg_according_to_data_dict, name_in_ods_according_to_data_dict, self.origin_connection_display_name, self.table_registry)
+        self.info_tabla = obtain_table_info(name_in_stg_according_to_data_dict, self.table_registry) # DIM / FACT y opciones de Info_Pks
         self.Stored_Procedure_name = self.table_ODS_name.replace("[ods].[", "[ods].[SP_")
         
         # SEQ Container
@@ -123,8 +130,16 @@ class Table(SSIS_Object):
         self.SQL_task_2_EXEC_SP_name = f"EST | SP_{self.origin_connection_display_name}_{self.diplay_name_SSIS}"
         self.SQL_task_2_EXEC_SP_reference_path = f"{self.SEQ_container_reference_path}\\{self.SQL_task_2_EXEC_SP_name}"
         
+        # SQL Task Post Load --> Index / statistics of STG (column 'POST CARGA STG' of Info_Pks; always the index with a batched MERGE)
+        self.stg_post_load = get_stg_post_load(self.info_tabla, self.table_name)
+        self.SQL_task_POST_LOAD_name = f"EST | {self.stg_post_load} STG_{self.origin_connection_display_name}_{self.diplay_name_SSIS}"
+        self.SQL_task_POST_LOAD_reference_path = f"{self.SEQ_container_reference_path}\\{self.SQL_task_POST_LOAD_name}"
+        
         # SQL Server Name
         self.SqlServer_Table_Name = f"[stg].[{self.origin_connection_display_name}_{self.display_name_SqlServer}]"
+        
+        # Incremental extraction by watermark
+        self.set_watermark_info()
        
     
     
@@ -142,6 +157,71 @@ class Table(SSIS_Object):
         
         seq_container, seq_executables = self.create_container(container_name, ruta_reference)
         
-        return seq_container, seq_executables         
+        return seq_container, seq_executables
+    
+    
+    
+    def get_partitions(self) -> int:
+        """
+        Number of partitions (ORA_HASH buckets) of the extraction of the table: 1 if the column 'PARTICIONES' of Info_Pks is empty.
+        Should be called after set_table_object_info.
+        """
+        
+        partitions = self.info_tabla.opciones.get(INFO_PKS_PARTITIONS)
+        return max(int(float(partitions)), 1) if partitions is not None else 1
     
-        
\ No newline at end of file
+    
+    
+    def for_partition(self, partition: int, partitions: int, query: str) -> "Table":
+        """
+        Returns a copy of the table for the DFT of one partition: same SEQ container and SQL Server table,
+        its own DFT (with its source and destination) and query.
+
+        Args:
+            partition (int): The partition, from 0 to partitions - 1.
+            partitions (int): Number of partitions.
+            query (str): The select of the partition.
+
+        Returns:
+            Table: The copy of the table.
+        """
+        
+        partition_info = copy.copy(self)
+        partition_info.query = query
+        
+        partition_info.DFT_task_name = f"{self.DFT_task_name} | P{partition + 1}_{partitions}"
+        partition_info.DFT_task_reference_path = f"{self.SEQ_container_reference_path}\\{partition_info.DFT_task_name}"
+        partition_info.DFT_Origin_task_reference_path = f"{partition_info.DFT_task_reference_path}\\{self.DFT_Origin_task_name}"
+        partition_info.DFT_Destination_task_reference_path = f"{partition_info.DFT_task_reference_path}\\{self.DFT_Destination_task_name}"
+        
+        if self.watermark_column:
+            partition_info.source_query_variable = f"SOURCE_QUERY_P{partition + 1}"
+            _, partition_info.source_query_expression = watermark_query_expression(query)
+        
+        return partition_info
+    
+    
+    
+    def set_watermark_info(self) -> None:
+        """
+        Sets up the incremental extraction by watermark: the variables of the SEQ container (the watermark and the select
+        built with it) and the Execute SQL Tasks reading and advancing the watermark.
+        Without 'COLUMNA WATERMARK' in Info_Pks, watermark_column is None and the table is loaded as before.
+        """
+        
+        self.watermark_column = self.info_tabla.opciones.get(INFO_PKS_WATERMARK_COLUMN)
+        if not self.watermark_column:
+            return
+        
+        # Variables of the SEQ Container
+        self.watermark_variable = "WATERMARK_VALUE"
+        self.source_query_variable = "SOURCE_QUERY"
+        self.watermark_initial_value, self.source_query_expression = watermark_query_expression(self.query)
+        
+        # SQL Task 0 --> Read watermark
+        self.SQL_task_0_WATERMARK_READ_name = f"EST | WATERMARK READ STG_{self.origin_connection_display_name}_{self.diplay_name_SSIS}"
+        self.SQL_task_0_WATERMARK_READ_reference_path = f"{self.SEQ_container_reference_path}\\{self.SQL_task_0_WATERMARK_READ_name}"
+        
+        # SQL Task 3 --> Advance watermark
+        self.SQL_task_3_WATERMARK_ADVANCE_name = f"EST | WATERMARK ADVANCE STG_{self.origin_connection_display_name}_{self.diplay_name_SSIS}"
+        self.SQL_task_3_WATERMARK_ADVANCE_reference_path = f"{self.SEQ_container_reference_path}\\{self.SQL_task_3_WATERMARK_ADVANCE_name}"
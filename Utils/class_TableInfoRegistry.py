@@ -0,0 +1,128 @@
+from functools import lru_cache
+
+import pandas as pd
+
+from Utils.Utils import InfoTabla, load_table_info_df, process_table_name_short, get_pks
+from Utils.params import INFO_PKS_OPTIONAL_COLUMNS
+
+
+
+"""
+This script defines the TableInfoRegistry class, an index over the Info_Pks Excel file.
+
+The Excel file is walked only once, when the registry is built. Every lookup afterwards is a
+dictionary access keyed by the standardized table name (see process_table_name_short).
+
+Functions and their purposes:
+    - __init__: Builds the index from the cleaned Info_Pks DataFrame.
+    - get: Returns the InfoTabla namedtuple of a table (DIM by default if the table is not registered).
+    - get_option: Returns the value of an optional column of Info_Pks for a table (see INFO_PKS_OPTIONAL_COLUMNS).
+    - get_table_info_registry: Builds the registry once per process, so that every generator shares it.
+"""
+
+
+
+class TableInfoRegistry:
+    """
+    Class holding the information of the Info_Pks file (DIM / FACT, incrementals and pks),
+    indexed by the standardized table name.
+    """
+
+
+    def __init__(self, df_tipo_tabla: pd.DataFrame) -> None:
+        """
+        Initializes the registry from the cleaned Info_Pks DataFrame.
+
+        Args:
+            df_tipo_tabla (pd.DataFrame): DataFrame that contains the names of the tables and their associated type, from an Excel file.
+        """
+
+        self.tables = {}
+
+        for row in df_tipo_tabla.to_dict('records'):
+            tabla_origen_estandarizado = process_table_name_short(row['TABLAS ORIGEN'])
+
+            if tabla_origen_estandarizado in self.tables: # Igual que antes: se queda la primera coincidencia del Excel
+                continue
+
+            tipo_tabla_ = str(row['TIPO TABLA'])
+            tipo_tabla = "FACT" if "FACT" in tipo_tabla_.upper() else "DIM"
+
+            self.tables[tabla_origen_estandarizado] = InfoTabla(
+                tabla_origen_estandarizado,
+                tipo_tabla,
+                str(row['INCREMENTAL ORACLE STG']),
+                str(row['INCREMENTAL STG ODS']),
+                get_pks(str(row['PK'])),
+                self.read_options(row)
+            )
+
+
+
+    @staticmethod
+    def read_options(row: dict) -> dict:
+        """
+        Reads the optional columns of a row of Info_Pks: only the columns present in the file and filled for the table.
+        """
+
+        options = {}
+        for column in INFO_PKS_OPTIONAL_COLUMNS:
+            value = row.get(column)
+            if value is not None and str(value).strip() not in ("", "nan", "None", "<NA>"):
+                options[column] = str(value).strip()
+        return options
+
+
+
+    def get(self, nombre_tabla: str) -> InfoTabla:
+        """
+        Retrieves the info of a table.
+
+        Args:
+            nombre_tabla (str): The name (of STG!!) of the table you want to verify.
+
+        Returns:
+            InfoTabla: The info of the table, or a "DIM" table without pks nor incrementals if it is not registered.
+        """
+
+        nombre_tabla_estandarizado = process_table_name_short(nombre_tabla)
+        info_tabla = self.tables.get(nombre_tabla_estandarizado)
+
+        if info_tabla is None: # Si no se encuentra ninguna coincidencia, devolver "DIM" por defecto
+            return InfoTabla(nombre_tabla_estandarizado, "DIM", "", "", "", {})
+
+        return info_tabla
+
+
+
+    def get_option(self, nombre_tabla: str, column: str, default=None):
+        """
+        Retrieves the value of an optional column of Info_Pks for a table.
+
+        Args:
+            nombre_tabla (str): The name (of STG!!) of the table.
+            column (str): One of INFO_PKS_OPTIONAL_COLUMNS.
+            default: Value returned if the column is not in the file or is empty for the table.
+
+        Returns:
+            str: The value in the Excel file, or the default.
+        """
+
+        return self.get(nombre_tabla).opciones.get(column, default)
+
+
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+
+
+
+@lru_cache(maxsize=None)
+def get_table_info_registry() -> TableInfoRegistry:
+    """
+    Builds the registry from the Info_Pks Excel file only once per process.
+    Every generator calling this function shares the same instance.
+    """
+
+    return TableInfoRegistry(load_table_info_df())
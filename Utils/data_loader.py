@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from Utils.params import *
+
+
+
+"""
+Python Script to load the Excel workbooks of the project (Data_Dict.xlsx and Info_Pks.xlsx) only once.
+
+Parsing a big workbook with openpyxl takes seconds, so:
+    - Inside a process, each workbook is parsed once and every generator receives a copy of the same frame.
+    - Between runs, a normalized Parquet copy is saved next to the data (DATA_CACHE_FOLDER).
+      It is keyed on the mtime and the content hash of the Excel file, and read instead of the Excel while the file doesn't change.
+      The copy and its metadata are written to a temporary file and renamed (see write_atomically): the worker processes
+      of 'build --jobs N' may read the cache while another process writes it.
+"""
+
+
+
+# Frames already loaded in this process --> {absolute path: (mtime_ns, size, DataFrame)}
+_loaded_frames = {}
+
+
+
+
+def file_content_hash(file_path: str) -> str:
+    """
+    Returns the sha256 of the content of a file, read in chunks.
+    """
+
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes the columns of a DataFrame so that it can be saved as Parquet:
+        - Object columns mixing numbers and text are converted to numbers if possible, else to text.
+        - Integral floats become '12' and not '12.0' when converted to text.
+        - Null values are kept as null.
+
+    Args:
+        df (pd.DataFrame): DataFrame read from Excel.
+
+    Returns:
+        pd.DataFrame: Normalized DataFrame.
+    """
+
+    def to_text(value):
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    df = df.copy()
+
+    for column in df.columns:
+        if df[column].dtype != 'object':
+            continue
+
+        not_null = df[column].dropna()
+        value_types = set(type(value) for value in not_null)
+
+        if not value_types or value_types == {str}:
+            continue
+
+        numeric_column = pd.to_numeric(not_null, errors='coerce')
+        if numeric_column.notna().all() and not (value_types & {str}):
+            df[column] = pd.to_numeric(df[column])
+        else:
+            df[column] = df[column].map(to_text, na_action='ignore')
+
+    return df
+
+
+
+
+def restore_missing_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parquet stores text nulls as None, Excel as NaN: the rest of the code expects NaN, as read_excel gives it.
+    """
+
+    for column in df.columns:
+        if df[column].dtype == 'object':
+            df[column] = df[column].where(df[column].notna(), np.nan)
+    return df
+
+
+
+
+def write_atomically(file_path: str, write) -> None:
+    """
+    Writes a file through a temporary file in the same folder, renamed with os.replace once it is complete:
+    another process reading the file sees the old content or the new one, never a half-written file.
+
+    Args:
+        file_path (str): Final path of the file.
+        write (callable): Function writing the content to the path it receives.
+    """
+
+    file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".", prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    os.close(file_descriptor)
+
+    try:
+        write(temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+
+
+def read_parquet_copy(parquet_path: str) -> pd.DataFrame:
+    """
+    Reads a Parquet copy of the cache (None if it doesn't exist, e.g. removed by another process after a new copy).
+    """
+
+    try:
+        return restore_missing_values(pd.read_parquet(parquet_path))
+    except FileNotFoundError:
+        return None
+
+
+
+
+def read_excel_cached(file_path: str, cache_folder: str = DATA_CACHE_FOLDER) -> pd.DataFrame:
+    """
+    Reads an Excel file only once per process, using a Parquet copy between runs.
+
+    Args:
+        file_path (str): Path of the Excel file.
+        cache_folder (str): Folder where the Parquet copies and their metadata are saved.
+
+    Returns:
+        pd.DataFrame: A copy of the DataFrame (the callers can modify it freely).
+    """
+
+    absolute_path = os.path.abspath(file_path)
+    file_stat = os.stat(absolute_path)
+
+    # 1. Already loaded in this process
+    loaded = _loaded_frames.get(absolute_path)
+    if loaded and loaded[0] == file_stat.st_mtime_ns and loaded[1] == file_stat.st_size:
+        return loaded[2].copy()
+
+    # 2. Parquet copy of a previous run
+    os.makedirs(cache_folder, exist_ok=True)
+    base_name = os.path.basename(absolute_path)
+    metadata_path = os.path.join(cache_folder, f"{base_name}.json")
+
+    metadata = {}
+    if os.path.exists(metadata_path):
+        with open(metadata_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+
+    parquet_path = os.path.join(cache_folder, metadata.get("parquet", ""))
+    same_stat = metadata.get("mtime_ns") == file_stat.st_mtime_ns and metadata.get("size") == file_stat.st_size
+
+    df = read_parquet_copy(parquet_path) if same_stat and metadata.get("parquet") else None
+
+    if df is None:
+        # El mtime ha cambiado (copia, checkout...) --> solo se vuelve a parsear si el contenido es diferente
+        content_hash = file_content_hash(absolute_path)
+        old_parquet_path = None
+
+        if metadata.get("sha256") == content_hash and metadata.get("parquet"):
+            df = read_parquet_copy(parquet_path)
+
+        if df is None:
+            print(f"Parsing {file_path} (no valid cache)...")
+            parsed_df = normalize_frame(pd.read_excel(absolute_path))
+
+            new_parquet_name = f"{base_name}.{content_hash[:16]}.parquet"
+            write_atomically(os.path.join(cache_folder, new_parquet_name), lambda path: parsed_df.to_parquet(path, index=False))
+
+            if metadata.get("parquet") and os.path.basename(parquet_path) != new_parquet_name:
+                old_parquet_path = parquet_path
+
+            parquet_path = os.path.join(cache_folder, new_parquet_name)
+            df = restore_missing_values(pd.read_parquet(parquet_path)) # Mismos tipos en la primera ejecución que en las siguientes
+
+        # Los metadatos se escriben cuando su Parquet ya está completo
+        metadata = {
+            "mtime_ns": file_stat.st_mtime_ns,
+            "size": file_stat.st_size,
+            "sha256": content_hash,
+            "parquet": os.path.basename(parquet_path)
+        }
+
+        def write_metadata(path: str) -> None:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2)
+
+        write_atomically(metadata_path, write_metadata)
+
+        # La copia anterior se borra después: un proceso con los metadatos viejos puede estar leyéndola
+        if old_parquet_path is not None and os.path.isfile(old_parquet_path):
+            try:
+                os.remove(old_parquet_path)
+            except OSError:
+                pass
+
+    _loaded_frames[absolute_path] = (file_stat.st_mtime_ns, file_stat.st_size, df)
+    return df.copy()
+
+
+
+
+def load_data_dict(data_dict_path: str = None) -> pd.DataFrame:
+    """
+    Loads the data dictionary (Data_Dict.xlsx), raw (each generator applies its own cleaning).
+    """
+
+    if data_dict_path is None:
+        data_dict_path = os.path.join(DATA_FOLDER, DATA_DICT_FILE)
+    return read_excel_cached(data_dict_path)
+
+
+
+
+def load_info_pks(info_pks_path: str = None) -> pd.DataFrame:
+    """
+    Loads the table information file (Info_Pks.xlsx), raw.
+    """
+
+    if info_pks_path is None:
+        info_pks_path = os.path.join(DATA_FOLDER, INFO_PKS_FILE)
+    return read_excel_cached(info_pks_path)
@@ -28,10 +28,62 @@ SQL_SERVER_HOST_NAME = os.getenv("SQL_SERVER_HOST_NAME")
 
 
 
+#### Generation ####
+
+# Worker processes building the SSIS table blocks (1: everything in the main process)
+SSIS_PARALLEL_JOBS = int(os.getenv("SSIS_PARALLEL_JOBS", "1"))
+
+# Tables of each origin split in lanes running in parallel, heaviest tables first (see Generate_SSIS_Package/SSIS_Lanes_Scheduling.py)
+# 0 (default): no lanes, the tables of an origin aren't chained
+SSIS_PARALLEL_LANES = int(os.getenv("SSIS_PARALLEL_LANES", "0"))
+# MaxConcurrentExecutables of the packages (-1: SSIS default, number of processors + 2, the attribute isn't written).
+# It limits all the tasks of the package (partition DFTs, post-load and watermark tasks too), not only the lanes
+SSIS_MAX_CONCURRENT_EXECUTABLES = int(os.getenv("SSIS_MAX_CONCURRENT_EXECUTABLES", "-1"))
+
+# Incremental generation: only the tables whose rows changed are generated again (see Utils/class_BuildManifest.py)
+INCREMENTAL_BUILD = os.getenv("INCREMENTAL_BUILD", "True") == "True"
+BUILD_MANIFEST_FOLDER = ".build_manifest" # Dentro de la carpeta de salida
+
+
+
+#### SSIS Data Flow ####
+
+# Destination profiles of the DFTs (OLE DB Destination properties)
+#   AccessMode 0: table or view (row by row inserts) | 3: table or view - fast load (bulk insert)
+#   FastLoadOptions: TABLOCK gives minimal logging when loading the (truncated) STG tables, ROWS_PER_BATCH is a hint for the bulk insert
+#   FastLoadMaxInsertCommitSize: rows per commit (0: one commit at the end)
+DESTINATION_PROFILES = {
+    "ROW_BY_ROW": {"AccessMode": 0, "FastLoadOptions": "", "FastLoadMaxInsertCommitSize": 2147483647},
+    "FAST_LOAD_FACT": {"AccessMode": 3, "FastLoadOptions": "TABLOCK,ROWS_PER_BATCH = 1000000", "FastLoadMaxInsertCommitSize": 1000000},
+    "FAST_LOAD_DIM": {"AccessMode": 3, "FastLoadOptions": "TABLOCK,ROWS_PER_BATCH = 100000", "FastLoadMaxInsertCommitSize": 0},
+}
+
+# Profile of each type of table (column 'TIPO TABLA' of Info_Pks), unless the column INFO_PKS_DESTINATION_PROFILE says otherwise.
+# Default ROW_BY_ROW (the inserts of before). The fast load profiles are opt-in: TABLOCK takes a table lock on the STG
+# table for the whole load (nothing else can read or write it meanwhile), in exchange for a minimally logged bulk insert
+DESTINATION_PROFILE_BY_TABLE_TYPE = {
+    "FACT": os.getenv("DESTINATION_PROFILE_FACT", "ROW_BY_ROW"),
+    "DIM": os.getenv("DESTINATION_PROFILE_DIM", "ROW_BY_ROW"),
+}
+
+# Buffers of the DFTs: DefaultBufferMaxRows is computed from the estimated row width of each table, so a buffer of
+# DFT_BUFFER_SIZE bytes holds as many rows as fit (between DFT_BUFFER_MIN_ROWS and DFT_BUFFER_MAX_ROWS).
+# Wide tables get a bigger DefaultBufferSize (up to DFT_BUFFER_MAX_SIZE) to keep at least DFT_BUFFER_MIN_ROWS per buffer.
+DFT_BUFFER_SIZE = int(os.getenv("DFT_BUFFER_SIZE", str(32 * 1024 * 1024)))
+DFT_BUFFER_MAX_SIZE = 100 * 1024 * 1024
+DFT_BUFFER_MIN_ROWS = 10000
+DFT_BUFFER_MAX_ROWS = 1000000
+DFT_AUTO_ADJUST_BUFFER_SIZE = os.getenv("DFT_AUTO_ADJUST_BUFFER_SIZE", "True") == "True" # SQL Server 2016+: buffer size = rows x row width
+
+
+
 
 #### Data Dictionnary ####
 
+DATA_FOLDER = "data"
 DATA_DICT_FILE = "Data_Dict.xlsx" 
+INFO_PKS_FILE = "Info_Pks.xlsx"
+DATA_CACHE_FOLDER = os.path.join(DATA_FOLDER, ".cache") # Copias Parquet de los Excel (ver Utils/data_loader.py)
 
 # Nombres columnas
 COLUMNA_CAMPO = 'STG CAMPO ORIGEN'
@@ -60,5 +112,86 @@ ODS_SIZE = 'ODS SIZE'
 ODS_PRECISION = 'ODS PRECISION'
 ODS_SCALE = 'ODS SCALE'
 
+# Optional columns of Info_Pks (per table settings of the SSIS package; empty: default value)
+INFO_PKS_DESTINATION_PROFILE = 'PERFIL DESTINO'     # Name of a profile of DESTINATION_PROFILES
+INFO_PKS_BUFFER_MAX_ROWS = 'BUFFER MAX ROWS'        # DefaultBufferMaxRows of the DFT
+INFO_PKS_BUFFER_SIZE = 'BUFFER SIZE'                # DefaultBufferSize of the DFT (bytes)
+INFO_PKS_LOAD_WEIGHT = 'PESO CARGA'                 # Estimated rows or duration of the load (same unit for all the tables), for the lanes
+INFO_PKS_PARTITIONS = 'PARTICIONES'                 # Extraction split in N ORA_HASH buckets, loaded in parallel (one DFT per bucket)
+INFO_PKS_WATERMARK_COLUMN = 'COLUMNA WATERMARK'     # Date or number column of Oracle: incremental extraction by watermark (instead of 'INCREMENTAL ORACLE STG')
+INFO_PKS_ODS_DDL_PROFILE = 'PERFIL ODS'             # Name of a profile of ODS_DDL_PROFILES
+INFO_PKS_ODS_STORAGE = 'ALMACENAMIENTO ODS'         # Filegroup or partition scheme of the ODS table (see ODS_STORAGE)
+INFO_PKS_STG_POST_LOAD = 'POST CARGA STG'           # INDEX / STATISTICS / NONE (see STG_POST_LOAD)
+INFO_PKS_MERGE_BATCH_SIZE = 'LOTE MERGE'            # Rows per batch of the MERGE of the Stored Procedure (0: one MERGE)
+INFO_PKS_SOFT_DELETE = 'BORRADO ODS'                # MERGE / ANTI_JOIN / NONE (see SP_SOFT_DELETE)
+INFO_PKS_KEY_STRATEGY = 'CLAVE HSH_PK0'             # LEGACY / MD5 / SHA1 / ORA_HASH / NATIVE (see KEY_STRATEGY)
+
+INFO_PKS_OPTIONAL_COLUMNS = [INFO_PKS_DESTINATION_PROFILE, INFO_PKS_BUFFER_MAX_ROWS, INFO_PKS_BUFFER_SIZE, INFO_PKS_LOAD_WEIGHT, INFO_PKS_PARTITIONS, INFO_PKS_WATERMARK_COLUMN,
+                             INFO_PKS_ODS_DDL_PROFILE, INFO_PKS_ODS_STORAGE, INFO_PKS_STG_POST_LOAD, INFO_PKS_MERGE_BATCH_SIZE, INFO_PKS_SOFT_DELETE,
+                             INFO_PKS_KEY_STRATEGY]
+
+# The STG tables are heaps (bulk loaded with TABLOCK with the FAST_LOAD profiles). After the load, before the Stored Procedure:
+#   INDEX: a clustered index on HSH_PK0 (the key of the MERGE), dropped again before the next TRUNCATE
+#   STATISTICS: only UPDATE STATISTICS of the table | NONE (default): nothing, the package of before
+STG_POST_LOAD = os.getenv("STG_POST_LOAD", "NONE") # Opt-in, per table (POST CARGA STG) or for all of them
+STG_POST_LOAD_OPTIONS = ["INDEX", "STATISTICS", "NONE"]
+STG_INDEX_DATA_COMPRESSION = os.getenv("STG_INDEX_DATA_COMPRESSION", "PAGE") # NONE / ROW / PAGE
+
+# DDL profiles of the ODS tables (see Generate_SQL_Code/Tables_Creation_ODS.py)
+#   CLUSTERED_INDEX: PRIMARY_KEY (rowstore, clustered on HSH_PK0) | COLUMNSTORE (clustered columnstore + nonclustered primary key on HSH_PK0)
+#   DATA_COMPRESSION / FILLFACTOR: options of the rowstore clustered index (None: SQL Server default)
+ODS_FILL_FACTOR = int(os.getenv("ODS_FILL_FACTOR", "90")) # HSH_PK0 is random: free space in the pages for the inserts of the MERGE
+
+ODS_DDL_PROFILES = {
+    "ROWSTORE": {"CLUSTERED_INDEX": "PRIMARY_KEY", "DATA_COMPRESSION": None, "FILLFACTOR": None},
+    "COLUMNSTORE": {"CLUSTERED_INDEX": "COLUMNSTORE", "DATA_COMPRESSION": None, "FILLFACTOR": None},
+    "PAGE_COMPRESSION": {"CLUSTERED_INDEX": "PRIMARY_KEY", "DATA_COMPRESSION": "PAGE", "FILLFACTOR": ODS_FILL_FACTOR},
+}
+
+# Profile of each type of table (column 'TIPO TABLA' of Info_Pks), unless the column INFO_PKS_ODS_DDL_PROFILE says otherwise
+ODS_DDL_PROFILE_BY_TABLE_TYPE = {
+    "FACT": os.getenv("ODS_DDL_PROFILE_FACT", "COLUMNSTORE"),
+    "DIM": os.getenv("ODS_DDL_PROFILE_DIM", "PAGE_COMPRESSION"),
+}
+
+# Where the ODS tables are created: a filegroup ("[PRIMARY]") or a partition scheme ("PS_ODS([FCH_CAR])").
+# In a partition scheme the unique index on HSH_PK0 can't be aligned, so it goes to ODS_INDEX_FILEGROUP
+ODS_STORAGE = os.getenv("ODS_STORAGE", "[PRIMARY]")
+ODS_INDEX_FILEGROUP = os.getenv("ODS_INDEX_FILEGROUP", "[PRIMARY]")
+
+# Incremental extraction by watermark (see Generate_SQL_Code/Watermarks.py)
+WATERMARK_TABLE = "[stg].[ETL_WATERMARK]"       # Control table in SQL Server: last value loaded of each table
+WATERMARK_INITIAL_DATE = "1900-01-01 00:00:00"   # Watermark before the first load
+WATERMARK_INITIAL_NUMBER = "-9999999999999999999999999999" # Lowest value of WATERMARK_NUMBER_FORMAT (no exponent: see Watermarks.py)
+
+# Row content hash (HSH_ROW): the Stored Procedures only update the rows whose hash changed
+# Oracle types that can't be hashed in the select (LOBs, LONG): the tables with them update all the matched rows
+ROW_HASH_EXCLUDED_TYPES = ['DB_TYPE_CLOB', 'DB_TYPE_NCLOB', 'DB_TYPE_BLOB', 'DB_TYPE_LONG', 'DB_TYPE_LONG_RAW', 'DB_TYPE_BFILE', 'DB_TYPE_XMLTYPE']
+ROW_HASH_CHUNK_CHARS = 1000 # Máximo de caracteres concatenados en cada standard_hash (VARCHAR2 de 4000 bytes)
+
+# Row key (HSH_PK0), computed in the Oracle select from the primary key (see Generate_SQL_Code/Key_Strategies.py)
+#   LEGACY: standard_hash(TO_CHAR(pk1 || pk2), 'MD5'), binary(16), the key of the tables already loaded (no separator between the columns)
+#   MD5: binary(16) | SHA1: binary(20) | ORA_HASH: 64-bit integer from two ORA_HASH, numeric(19, 0) (cheapest for Oracle)
+#   NATIVE: the primary key itself as text, nvarchar(KEY_NATIVE_MAX_CHARS), only for the tables whose primary key fits
+# All but LEGACY prefix every column of a composite key with its length, and convert the dates with a fixed format
+# Changing the strategy of a table changes all its keys: its ODS table has to be created and loaded again
+KEY_STRATEGY = os.getenv("KEY_STRATEGY", "LEGACY")
+KEY_STRATEGY_OPTIONS = ["LEGACY", "MD5", "SHA1", "ORA_HASH", "NATIVE"]
+KEY_NATIVE_MAX_CHARS = int(os.getenv("KEY_NATIVE_MAX_CHARS", "200"))
+
+# Batched MERGE: the Stored Procedures of the tables with a batch size merge STG in ranges of HSH_PK0 of that many rows,
+# one transaction per batch (the log and the locks of ODS stay small). 0: one MERGE of the whole STG table
+SP_MERGE_BATCH_SIZE = int(os.getenv("SP_MERGE_BATCH_SIZE", "0"))
+
+# Soft delete of the rows of ODS missing from STG (see Generate_SQL_Code/Soft_Delete.py)
+#   MERGE: WHEN NOT MATCHED BY SOURCE (reads the whole ODS table) | ANTI_JOIN: separate UPDATE with NOT EXISTS, limited
+#   to the incremental window of FCH_CAR (indexed in ODS) | NONE: the rows are never marked as deleted
+SP_SOFT_DELETE = os.getenv("SP_SOFT_DELETE", "MERGE") # ANTI_JOIN: opt-in, per table (BORRADO ODS) or for all of them
+SP_SOFT_DELETE_OPTIONS = ["MERGE", "ANTI_JOIN", "NONE"]
+SP_SOFT_DELETE_WINDOW_DAYS = int(os.getenv("SP_SOFT_DELETE_WINDOW_DAYS", "0")) # Window of the tables without 'INCREMENTAL STG ODS' (0: the whole table)
+
+# Column computed by Generate_SQL_Code/SQL_Server_Types.py
+SQL_TYPE = 'SQL_TYPE'
+
 
 
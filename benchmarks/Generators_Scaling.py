@@ -0,0 +1,156 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Ejecutable desde cualquier carpeta
+
+from Utils.params import *
+from Utils.class_TableInfoRegistry import get_table_info_registry
+from Generate_SQL_Code.Tables_Creation_STG import STG_tables_creation
+from Generate_SQL_Code.Tables_Creation_ODS import ODS_tables_creation
+from Generate_SQL_Code.Stored_Procedures_STG_to_ODS import Stored_Procedures_STG_to_ODS
+
+
+"""
+Benchmark of the SQL generators (STG, ODS and stored procedures) on synthetic data dictionaries of growing size.
+
+Every table of the synthetic dictionary has the same fields, so the time per table must stay flat when the number of
+tables grows: the results of the tables are collected in a list and concatenated once (see Utils/class_ResultCollector.py),
+instead of a pd.concat per table, which copied the whole accumulated result for every new table.
+The time includes writing the output Excel file, as in a real run.
+
+Usage (from the root of the repository):
+    python benchmarks/Generators_Scaling.py
+    python benchmarks/Generators_Scaling.py --sizes 100 1000 --fields 10
+"""
+
+
+GENERATORS = {
+    "stg": STG_tables_creation,
+    "ods": ODS_tables_creation,
+    "sp": Stored_Procedures_STG_to_ODS,
+}
+
+DEFAULT_SIZES = [100, 1000, 5000, 20000]
+
+# Tipos Oracle de los campos sintéticos (con su tamaño, precisión y escala en el diccionario)
+FIELD_TYPES = [
+    ("DB_TYPE_NUMBER", 22, 10, 0),
+    ("DB_TYPE_VARCHAR", 100, None, None),
+    ("DB_TYPE_DATE", 7, None, None),
+    ("DB_TYPE_NUMBER", 22, 12, 3),
+    ("DB_TYPE_NVARCHAR", 40, None, None),
+    ("DB_TYPE_TIMESTAMP", 11, None, None),
+]
+
+
+
+def build_data_dict(n_tables: int, n_fields: int) -> pd.DataFrame:
+    """
+    Builds a synthetic data dictionary with n_tables tables of n_fields fields, split between the two origins.
+    """
+
+    rows = []
+    for table in range(n_tables):
+        for field in range(n_fields):
+            oracle_type, size, precision, scale = FIELD_TYPES[field % len(FIELD_TYPES)]
+            rows.append({
+                'ORIGEN': (ORIGIN_1_NAME or "ORIGIN1") if table % 2 == 0 else (ORIGIN_2_NAME or "ORIGIN2"),
+                STG_TABLAS: f"OWN{table % 3}.TAB_{table}", STG_CAMPOS: f"COL_{field}", STG_TIPO: oracle_type,
+                STG_SIZE: size, STG_PRECISION: precision, STG_SCALE: scale,
+                ODS_TABLAS: None, ODS_CAMPOS: None, ODS_TIPO: None, ODS_SIZE: None, ODS_PRECISION: None, ODS_SCALE: None,
+            })
+
+    return pd.DataFrame(rows)
+
+
+
+
+def build_info_pks(n_tables: int) -> pd.DataFrame:
+    """
+    Builds the Info_Pks of the synthetic tables: one fact table of every three, the rest dimensions.
+    """
+
+    return pd.DataFrame([{
+        'TABLAS ORIGEN': f"OWN{table % 3}.TAB_{table}",
+        'TIPO TABLA': "Fact table" if table % 3 == 0 else "Dimension",
+        'INCREMENTAL ORACLE STG': None,
+        'INCREMENTAL STG ODS': None,
+        'PK': "COL_0",
+    } for table in range(n_tables)])
+
+
+
+
+def time_generators(sizes: list, n_fields: int, generators: list) -> pd.DataFrame:
+    """
+    Runs every generator on a synthetic dictionary of each size, in a temporary working folder.
+
+    Returns:
+        pd.DataFrame: One row per size and generator, with the seconds and the milliseconds per table.
+    """
+
+    results = []
+    original_folder = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as work_folder:
+        os.chdir(work_folder) # DATA_FOLDER es relativo: el Info_Pks sintético se lee de aquí
+        os.makedirs(DATA_FOLDER, exist_ok=True)
+
+        try:
+            for n_tables in sizes:
+                data_dict_df = build_data_dict(n_tables, n_fields)
+                build_info_pks(n_tables).to_excel(os.path.join(DATA_FOLDER, INFO_PKS_FILE), index=False)
+                get_table_info_registry.cache_clear()
+                get_table_info_registry() # Carga del Info_Pks fuera de la medida
+
+                for generator in generators:
+                    start = time.perf_counter()
+                    GENERATORS[generator](data_dict_df, os.path.join(work_folder, f"{generator}_{n_tables}.xlsx"))
+                    seconds = time.perf_counter() - start
+
+                    results.append({"tables": n_tables, "generator": generator, "seconds": seconds, "ms_per_table": seconds / n_tables * 1000})
+        finally:
+            os.chdir(original_folder)
+            get_table_info_registry.cache_clear()
+
+    return pd.DataFrame(results)
+
+
+
+
+def print_results(results: pd.DataFrame) -> None:
+    """
+    Prints the milliseconds per table of every generator and size, and the growth of that time from the smallest size
+    to the largest one (about 1x when the generator scales linearly).
+    """
+
+    table = results.pivot(index="tables", columns="generator", values="ms_per_table")
+    print("\nMilliseconds per table:")
+    print(table.round(3).to_string())
+
+    growth = table.iloc[-1] / table.iloc[0]
+    print(f"\nms per table, {table.index[-1]} tables vs {table.index[0]} tables:")
+    for generator, ratio in growth.items():
+        print(f"  {generator}: {ratio:.2f}x")
+
+
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Times the SQL generators on synthetic data dictionaries of growing size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Number of tables of each dictionary.")
+    parser.add_argument("--fields", type=int, default=6, help="Fields per table.")
+    parser.add_argument("--generators", nargs="+", choices=list(GENERATORS), default=list(GENERATORS), help="Generators to time.")
+    return parser.parse_args(arguments)
+
+
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    print_results(time_generators(sorted(args.sizes), args.fields, args.generators))
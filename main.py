@@ -1,10 +1,15 @@
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
+import argparse
 import os
+import time
 
 from Utils.params import *
-from Generate_SSIS_Package.SSIS_Full_Package import create_dtsx
+from Utils.data_loader import load_data_dict
+from Utils.class_BuildManifest import BuildManifest
+from Generate_SSIS_Package.SSIS_Full_Package import create_dtsx, create_table_executor
 from Generate_SQL_Code.Selects_from_Oracle import prepare_data_frame, create_dictionary_from_dataframe
 
 from Generate_SQL_Code.Tables_Creation_STG import STG_tables_creation
@@ -40,50 +45,245 @@ def get_user_choice() -> int:
             
 
 
-def handle_ssis_creation(data_dict_path: str, output_folder: str) -> None:
+def open_manifest(output_folder: str, generator: str, incremental: bool = INCREMENTAL_BUILD) -> BuildManifest:
+    """
+    Opens the manifest of a generator (None if the incremental generation is disabled).
+
+    Args:
+        output_folder (str): The folder where output files are saved.
+        generator (str): Name of the generator (STG, ODS, SP, SSIS).
+        incremental (bool): Reuse the artifacts of the last run.
+
+    Returns:
+        BuildManifest: The manifest of the last run of the generator.
+    """
+    if not incremental:
+        return None
+    return BuildManifest(os.path.join(output_folder, BUILD_MANIFEST_FOLDER, f"{generator}.json"))
+
+
+
+def save_manifest(manifest: BuildManifest) -> None:
+    if manifest is not None:
+        manifest.save()
+
+
+
+def handle_ssis_creation(data_dict_df: pd.DataFrame, output_folder: str, jobs: int = 1, incremental: bool = INCREMENTAL_BUILD) -> None:
     """
     Handles SSIS file creation for two origins.
 
     Args:
-        data_dict_path (str): Path to the data dictionary file.
+        data_dict_df (pd.DataFrame): The data dictionary, already loaded.
         output_folder (str): The folder where output files will be saved.
+        jobs (int): Number of worker processes building the table blocks (1: everything in this process).
+        incremental (bool): Reuse the blocks of the tables that didn't change (see open_manifest).
     """
     current_datetime = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
     output_path = os.path.join(output_folder, 'Select_Queries_Oracle.xlsx')
-    df = prepare_data_frame(input_path_file=data_dict_path, output_path_file=output_path)
+    df = prepare_data_frame(data_dict_df=data_dict_df, output_path_file=output_path)
     data_dictionary = create_dictionary_from_dataframe(df) 
 
-    for origin in [ORIGIN_1_NAME, ORIGIN_2_NAME]:
-        dict_origin = {origin: data_dictionary[origin]}
-        SSIS_output = os.path.join(output_folder, f"SSIS_{current_datetime}_{origin}.dtsx")
-        create_dtsx(dict_origin, SSIS_output) 
+    # The same pool of processes is shared by the packages of both origins
+    executor = create_table_executor(jobs) if jobs > 1 else None
+    manifest = open_manifest(output_folder, "SSIS", incremental)
+
+    try:
+        for origin in [ORIGIN_1_NAME, ORIGIN_2_NAME]:
+            dict_origin = {origin: data_dictionary[origin]}
+            SSIS_output = os.path.join(output_folder, f"SSIS_{current_datetime}_{origin}.dtsx")
+            create_dtsx(dict_origin, SSIS_output, executor = executor, manifest = manifest) 
+        save_manifest(manifest)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+
+# Generators of the batch mode: name --> (description, output file, manifest)
+STAGES = {
+    "stg": ("STG tables", 'STG_Tables_Creation.xlsx', "STG"),
+    "ods": ("ODS tables", 'ODS_Tables_Creation.xlsx', "ODS"),
+    "sp": ("Stored Procedures STG to ODS", 'STG_to_ODS_SPs_Creation.xlsx', "SP"),
+    "ssis": ("SSIS packages", None, "SSIS"),
+}
+
+SQL_GENERATORS = {
+    "stg": STG_tables_creation,
+    "ods": ODS_tables_creation,
+    "sp": Stored_Procedures_STG_to_ODS,
+}
+
+
+
+def run_stage(stage: str, data_dict_df: pd.DataFrame, output_folder: str, jobs: int = 1, incremental: bool = INCREMENTAL_BUILD) -> tuple:
+    """
+    Runs one generator over the data dictionary already loaded.
+    It is a module level function so it can be sent to a worker process.
+
+    Args:
+        stage (str): Name of the generator (see STAGES).
+        data_dict_df (pd.DataFrame): The data dictionary.
+        output_folder (str): The folder where output files will be saved.
+        jobs (int): Worker processes building the SSIS table blocks.
+        incremental (bool): Reuse the artifacts of the last run (see open_manifest).
+
+    Returns:
+        tuple: The name of the stage and its duration in seconds.
+    """
+    start = time.perf_counter()
+
+    if stage == "ssis":
+        handle_ssis_creation(data_dict_df, output_folder, jobs=jobs, incremental=incremental)
+    else:
+        _, output_file, manifest_name = STAGES[stage]
+        manifest = open_manifest(output_folder, manifest_name, incremental)
+        SQL_GENERATORS[stage](data_dict_df, os.path.join(output_folder, output_file), manifest)
+        save_manifest(manifest)
+
+    return stage, time.perf_counter() - start
+
+
+
+def build(stages: list, data_dict_df: pd.DataFrame, output_folder: str, jobs: int = 1, incremental: bool = INCREMENTAL_BUILD) -> dict:
+    """
+    Runs several generators over the same data dictionary.
+    With jobs > 1 the SQL generators run in worker processes, while the SSIS packages are built in this one
+    (their table blocks in a pool of 'jobs' processes).
+
+    Args:
+        stages (list): Names of the generators (see STAGES).
+        data_dict_df (pd.DataFrame): The data dictionary, already loaded.
+        output_folder (str): The folder where output files will be saved.
+        jobs (int): Number of worker processes (1: everything in this process, one generator after the other).
+        incremental (bool): Reuse the artifacts of the last run (see open_manifest).
+
+    Returns:
+        dict: Duration in seconds of each generator.
+    """
+    timings = {}
+    sql_stages = [stage for stage in stages if stage != "ssis"]
+
+    if jobs <= 1 or not sql_stages:
+        for stage in stages:
+            _, timings[stage] = run_stage(stage, data_dict_df, output_folder, jobs, incremental)
+        return timings
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(sql_stages))) as executor:
+        futures = [executor.submit(run_stage, stage, data_dict_df, output_folder, 1, incremental) for stage in sql_stages]
+
+        if "ssis" in stages:
+            _, timings["ssis"] = run_stage("ssis", data_dict_df, output_folder, jobs, incremental)
+
+        for future in futures:
+            stage, seconds = future.result()
+            timings[stage] = seconds
+
+    return {stage: timings[stage] for stage in stages}
+
+
+
+def print_timings(timings: dict) -> None:
+    """
+    Prints the duration of each stage of the batch mode.
+    """
+    labels = {"load": "Load data dictionary", "total": "Total", **{stage: info[0] for stage, info in STAGES.items()}}
+
+    print("\nTimings:")
+    for stage, seconds in timings.items():
+        print(f"  {labels.get(stage, stage):<30} {seconds:8.2f} s")
+
+
+
+def parse_arguments(arguments: list = None) -> argparse.Namespace:
+    """
+    Parses the command line. Without arguments, the interactive menu is shown.
+
+        python main.py build --all --jobs 4
+        python main.py build --stg --ods --full
+
+    Args:
+        arguments (list): The arguments (defaults to sys.argv).
+
+    Returns:
+        argparse.Namespace: The arguments. In the build command, 'stages' has the generators to run.
+    """
+    parser = argparse.ArgumentParser(description="Generates the SQL Server tables, Stored Procedures and SSIS packages of the data dictionary")
+    subparsers = parser.add_subparsers(dest="command")
+
+    build_parser = subparsers.add_parser("build", help="Run the generators without the interactive menu")
+    build_parser.add_argument("--all", action="store_true", help="Run all the generators")
+    for stage, (description, _, _) in STAGES.items():
+        build_parser.add_argument(f"--{stage}", action="store_true", help=f"Generate the {description}")
+    build_parser.add_argument("--jobs", type=int, default=SSIS_PARALLEL_JOBS, help="Number of worker processes (default: SSIS_PARALLEL_JOBS)")
+    build_parser.add_argument("--data-dict", default=os.path.join(DATA_FOLDER, DATA_DICT_FILE), help="Path of the data dictionary")
+    build_parser.add_argument("--output-folder", default="output_folder", help="The folder where output files will be saved")
+    build_parser.add_argument("--full", action="store_true", help="Generate all the tables again, ignoring the build manifests")
+
+    args = parser.parse_args(arguments)
+
+    if args.command == "build":
+        args.stages = [stage for stage in STAGES if args.all or getattr(args, stage)]
+        if not args.stages:
+            build_parser.error("choose the generators to run: --all or any of --stg --ods --sp --ssis")
+
+    return args
+
+
+
+def main_batch(args: argparse.Namespace) -> None:
+    """
+    Batch mode: the data dictionary is loaded once and shared by all the generators.
+    """
+    start = time.perf_counter()
+    os.makedirs(args.output_folder, exist_ok=True)
+
+    data_dict_df = load_data_dict(args.data_dict)
+    timings = {"load": time.perf_counter() - start}
+
+    timings.update(build(args.stages, data_dict_df, args.output_folder, jobs=args.jobs, incremental=INCREMENTAL_BUILD and not args.full))
+    timings["total"] = time.perf_counter() - start
+
+    print_timings(timings)
 
 
 
 def main():
 
-    data_dict_path = os.path.join("data", DATA_DICT_FILE)
+    args = parse_arguments()
+    if args.command == "build":
+        main_batch(args)
+        return
+
+    data_dict_path = os.path.join(DATA_FOLDER, DATA_DICT_FILE)
     output_folder = "output_folder"
     os.makedirs(output_folder, exist_ok=True)
 
     number = get_user_choice()
+    data_dict_df = load_data_dict(data_dict_path)
 
     if number == 1:
-        handle_ssis_creation(data_dict_path, output_folder) 
+        handle_ssis_creation(data_dict_df, output_folder, jobs=SSIS_PARALLEL_JOBS) 
 
     elif number == 2:
         output_path = os.path.join(output_folder,'STG_Tables_Creation.xlsx')
-        STG_tables_creation(data_dict_path, output_path)      
+        manifest = open_manifest(output_folder, "STG")
+        STG_tables_creation(data_dict_df, output_path, manifest)
+        save_manifest(manifest)
 
 
     elif number == 3:
         output_path = os.path.join(output_folder,'ODS_Tables_Creation.xlsx')
-        ODS_tables_creation(data_dict_path, output_path)
+        manifest = open_manifest(output_folder, "ODS")
+        ODS_tables_creation(data_dict_df, output_path, manifest)
+        save_manifest(manifest)
         
 
     elif number == 4:
         output_path = os.path.join(output_folder,'STG_to_ODS_SPs_Creation.xlsx')
-        Stored_Procedures_STG_to_ODS(data_dict_path, output_path)
+        manifest = open_manifest(output_folder, "SP")
+        Stored_Procedures_STG_to_ODS(data_dict_df, output_path, manifest)
+        save_manifest(manifest)
         
 
 
@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+# Los tests importan los módulos del paquete desde la raíz del repositorio (como main.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
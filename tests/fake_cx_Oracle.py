@@ -0,0 +1,153 @@
+import re
+
+
+"""
+Fake of the cx_Oracle driver for the tests of Code_to_interact_with_DBs/Oracle: no Oracle client or server is needed.
+
+A FakeDatabase holds the tables of an origin, each column with its row of ALL_TAB_COLUMNS and the tuple that the real
+driver returns for it in cursor.description. The cursors answer:
+    - The ALL_TAB_COLUMNS query of harvest_table_columns (owners / tables as bind variables)
+    - Any 'SELECT col, col... FROM owner.table' query, possibly wrapped in other selects: its description, and
+      ROWS_PER_TABLE rows unless the query has a 'WHERE 1=0' filter
+
+Every row sent to the client is counted in FakeDatabase.rows_fetched.
+"""
+
+
+ROWS_PER_TABLE = 1000
+
+
+
+class DbType:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"<cx_Oracle.DbType {self.name}>"
+
+
+DB_TYPE_NUMBER = DbType("DB_TYPE_NUMBER")
+DB_TYPE_VARCHAR = DbType("DB_TYPE_VARCHAR")
+DB_TYPE_NVARCHAR = DbType("DB_TYPE_NVARCHAR")
+DB_TYPE_CHAR = DbType("DB_TYPE_CHAR")
+DB_TYPE_DATE = DbType("DB_TYPE_DATE")
+DB_TYPE_TIMESTAMP = DbType("DB_TYPE_TIMESTAMP")
+DB_TYPE_CLOB = DbType("DB_TYPE_CLOB")
+DB_TYPE_RAW = DbType("DB_TYPE_RAW")
+
+
+
+class DatabaseError(Exception):
+    pass
+
+
+
+class FakeDatabase:
+    """
+    Tables of one origin: {(OWNER, TABLE_NAME): [(catalog row, description tuple) per column]}.
+    """
+
+    def __init__(self) -> None:
+        self.tables = {}
+        self.executed = []
+        self.rows_fetched = 0
+
+
+    def add_table(self, owner: str, table_name: str, columns: list) -> None:
+        """
+        Args:
+            columns (list): (COLUMN_NAME, DATA_TYPE, DATA_LENGTH, CHAR_LENGTH, DATA_PRECISION, DATA_SCALE, description) per column.
+                            description is (type, display_size, internal_size, precision, scale), as the driver gives it.
+        """
+        self.tables[(owner.upper(), table_name.upper())] = columns
+
+
+
+class Cursor:
+    def __init__(self, database: FakeDatabase) -> None:
+        self.database = database
+        self.description = None
+        self.rows = []
+
+
+    def execute(self, sql: str, parameters: dict = None, **keyword_parameters):
+        parameters = dict(parameters or keyword_parameters)
+        self.database.executed.append((sql, parameters))
+
+        if "ALL_TAB_COLUMNS" in sql.upper():
+            return self._execute_catalog(parameters)
+
+        selects = re.findall(r"SELECT\s+((?:(?!SELECT).)*?)\s+FROM\s+(\w+)\.(\w+)", sql, re.S | re.I)
+        if not selects:
+            raise DatabaseError(f"ORA-00942: table or view does not exist ({sql})")
+
+        fields, owner, table_name = selects[-1] # La select más interna: la de la tabla
+        columns = self.database.tables.get((owner.upper(), table_name.upper()))
+        if columns is None:
+            raise DatabaseError(f"ORA-00942: table or view does not exist ({owner}.{table_name})")
+
+        wanted = [field.strip().upper() for field in fields.split(",")]
+        self.description = [(name, *description, True) for name, *_, description in columns if wanted == ["*"] or name in wanted]
+        self.rows = [] if re.search(r"WHERE\s+1\s*=\s*0", sql, re.I) else [tuple(range(len(self.description)))] * ROWS_PER_TABLE
+        return self
+
+
+    def _execute_catalog(self, parameters: dict):
+        owner_tables = {(parameters[f"o{i}"], parameters[f"t{i}"]) for i in range(len(parameters) // 2)}
+
+        self.description = [(name,) for name in ['OWNER', 'TABLE_NAME', 'COLUMN_NAME', 'DATA_TYPE', 'DATA_LENGTH', 'CHAR_LENGTH', 'DATA_PRECISION', 'DATA_SCALE']]
+        self.rows = [(owner, table_name, *column[:6]) for (owner, table_name), columns in self.database.tables.items()
+                     if (owner, table_name) in owner_tables for column in columns]
+        return self
+
+
+    def fetchall(self) -> list:
+        rows, self.rows = self.rows, []
+        self.database.rows_fetched += len(rows)
+        return rows
+
+
+    def fetchone(self):
+        if not self.rows:
+            return None
+        self.database.rows_fetched += 1
+        return self.rows.pop(0)
+
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+    def close(self) -> None:
+        pass
+
+
+
+class Connection:
+    def __init__(self, database: FakeDatabase) -> None:
+        self.database = database
+        self.closed = False
+
+
+    def cursor(self) -> Cursor:
+        if self.closed:
+            raise DatabaseError("DPI-1010: not connected")
+        return Cursor(self.database)
+
+
+    def ping(self) -> None:
+        if self.closed:
+            raise DatabaseError("DPI-1010: not connected")
+
+
+    def close(self) -> None:
+        self.closed = True
+
+
+
+def makedsn(host, port, service_name=None) -> str:
+    return f"{host}:{port}/{service_name}"
+
+
+def connect(user=None, password=None, dsn=None, database: FakeDatabase = None, **kwargs) -> Connection:
+    return Connection(database if database is not None else FakeDatabase())
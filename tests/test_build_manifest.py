@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+import Utils.class_BuildManifest as class_BuildManifest
+from Utils.class_BuildManifest import BuildManifest
+
+
+def save_manifest(manifest_path: str, artifact: str) -> None:
+    manifest = BuildManifest(manifest_path, fingerprint="fingerprint")
+    manifest.put("TABLE", "hash", artifact)
+    manifest.save()
+
+
+
+def test_saved_manifest_is_reused(tmp_path):
+    manifest_path = str(tmp_path / ".build_manifest" / "stg.json")
+    save_manifest(manifest_path, "CREATE TABLE ...")
+
+    assert BuildManifest(manifest_path, fingerprint="fingerprint").get("TABLE", "hash") == "CREATE TABLE ..."
+    assert os.listdir(tmp_path / ".build_manifest") == ["stg.json"]
+
+
+
+def test_interrupted_save_keeps_the_previous_manifest(tmp_path, monkeypatch):
+    manifest_path = str(tmp_path / "stg.json")
+    save_manifest(manifest_path, "previous")
+
+    def killed_while_writing(content, f):
+        f.write('{"fingerprint": "finger')
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(class_BuildManifest.json, "dump", killed_while_writing)
+    with pytest.raises(KeyboardInterrupt):
+        save_manifest(manifest_path, "new")
+    monkeypatch.undo()
+
+    assert BuildManifest(manifest_path, fingerprint="fingerprint").get("TABLE", "hash") == "previous"
+    assert os.listdir(tmp_path) == ["stg.json"]
+
+
+
+def test_corrupt_manifest_generates_every_table(tmp_path):
+    manifest_path = tmp_path / "stg.json"
+    manifest_path.write_text('{"fingerprint": "finger', encoding="utf-8")
+
+    assert BuildManifest(str(manifest_path), fingerprint="fingerprint").get("TABLE", "hash") is None
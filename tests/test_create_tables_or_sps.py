@@ -0,0 +1,154 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import Code_to_interact_with_DBs.SQL_Server.Create_Tables_or_SPs as deployment
+from Code_to_interact_with_DBs.SQL_Server.Create_Tables_or_SPs import ACTION_CREATED, ACTION_ERROR, create_tables_in_SQL_Server
+
+
+DEADLOCK_MESSAGE = "Transaction (Process ID 57) was deadlocked on lock resources with another process and has been chosen as the deadlock victim. Rerun the transaction. (1205)"
+
+
+
+def build_queries(n_tables: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        'TABLA ORIGEN': [f"OWN.TAB_{table}" for table in range(n_tables)],
+        'QUERY CREATE': [f"CREATE TABLE TAB_{table} (ID INTEGER, NAME TEXT)" for table in range(n_tables)],
+    })
+
+
+
+def sqlite_connect(database_path):
+    """
+    'connect' of the deployment: one sqlite3 connection per call (used from the threads of the pool).
+    """
+    connections = []
+
+    def connect():
+        connection = sqlite3.connect(str(database_path), check_same_thread=False, timeout=30)
+        connections.append(connection)
+        return connection
+
+    connect.connections = connections
+    return connect
+
+
+
+class DeadlockingCursor:
+    """
+    sqlite3 cursor whose first 'failures' executions (shared by all the cursors) fail as a SQL Server deadlock.
+    """
+
+    def __init__(self, cursor, failures: list) -> None:
+        self.cursor = cursor
+        self.failures = failures
+
+    def execute(self, query: str):
+        if self.failures[0] > 0:
+            self.failures[0] -= 1
+            raise sqlite3.OperationalError(DEADLOCK_MESSAGE)
+        return self.cursor.execute(query)
+
+    def close(self) -> None:
+        self.cursor.close()
+
+
+
+class DeadlockingConnection:
+    def __init__(self, connection, failures: list) -> None:
+        self.connection = connection
+        self.failures = failures
+
+    def cursor(self) -> DeadlockingCursor:
+        return DeadlockingCursor(self.connection.cursor(), self.failures)
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def rollback(self) -> None:
+        self.connection.rollback()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+
+def deadlocking_connect(database_path, failures: int):
+    connect = sqlite_connect(database_path)
+    remaining_failures = [failures]
+
+    def deadlocking():
+        return DeadlockingConnection(connect(), remaining_failures)
+
+    deadlocking.connections = connect.connections
+    return deadlocking
+
+
+
+def existing_tables(database_path) -> set:
+    with sqlite3.connect(str(database_path)) as connection:
+        return {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Waits of the backoff, recorded instead of slept.
+    """
+    recorded = []
+    monkeypatch.setattr(deployment.time, "sleep", recorded.append)
+    return recorded
+
+
+
+def test_statements_are_deployed_with_sqlite(tmp_path):
+    database_path = tmp_path / "destination.db"
+    connect = sqlite_connect(database_path)
+
+    result = create_tables_in_SQL_Server(build_queries(12), str(tmp_path / "Updated.xlsx"), connect=connect, workers=4, rate=None)
+
+    assert (result['ACTION'] == ACTION_CREATED).all()
+    assert existing_tables(database_path) == {f"TAB_{table}" for table in range(12)}
+    assert len(connect.connections) <= 4 # Conexiones reutilizadas por el pool
+    assert (tmp_path / f"Updated_final_{deployment.USED_DB}.xlsx").exists()
+
+
+
+def test_resume_skips_the_deployed_statements(tmp_path):
+    database_path = tmp_path / "destination.db"
+    create_tables_in_SQL_Server(build_queries(5), str(tmp_path / "Updated.xlsx"), connect=sqlite_connect(database_path), workers=2, rate=None)
+
+    def connect_not_expected():
+        raise AssertionError("No statement should be executed again")
+
+    result = create_tables_in_SQL_Server(build_queries(5), str(tmp_path / "Updated.xlsx"), connect=connect_not_expected, workers=2, rate=None, resume=True)
+
+    assert (result['ACTION'] == ACTION_CREATED).all()
+
+
+
+def test_transient_error_is_retried_with_exponential_backoff(tmp_path, sleeps):
+    database_path = tmp_path / "destination.db"
+    connect = deadlocking_connect(database_path, failures=2)
+
+    result = create_tables_in_SQL_Server(build_queries(1), str(tmp_path / "Updated.xlsx"), connect=connect, workers=1, rate=None, max_retries=3, backoff=0.5)
+
+    assert result.at[0, 'ACTION'] == ACTION_CREATED
+    assert sleeps == [0.5, 1.0]
+    assert len(connect.connections) == 3 # La conexión de cada deadlock se descarta
+    assert existing_tables(database_path) == {"TAB_0"}
+
+
+
+def test_transient_error_gives_up_after_the_retries(tmp_path, sleeps):
+    database_path = tmp_path / "destination.db"
+    connect = deadlocking_connect(database_path, failures=10)
+
+    result = create_tables_in_SQL_Server(build_queries(1), str(tmp_path / "Updated.xlsx"), connect=connect, workers=1, rate=None, max_retries=3, backoff=0.5)
+
+    assert result.at[0, 'ACTION'] == ACTION_ERROR
+    assert "(1205)" in result.at[0, 'SQL Server message']
+    assert sleeps == [0.5, 1.0, 2.0]
+    assert existing_tables(database_path) == set()
@@ -0,0 +1,102 @@
+import sys
+
+import pandas as pd
+
+import fake_cx_Oracle
+from fake_cx_Oracle import FakeDatabase
+
+sys.modules.setdefault("cx_Oracle", fake_cx_Oracle) # Sin cliente Oracle en los tests: el script solo necesita poder importarlo
+
+from Utils.params import *
+from Code_to_interact_with_DBs.Oracle.Get_Types_and_Lenght import OracleSessionManager, describe_query, fill_types_and_lenghts, harvest_table_columns
+
+
+ORIGIN = "ORIGIN1"
+
+# Columnas de prueba: fila de ALL_TAB_COLUMNS y descripción del driver (type, display_size, internal_size, precision, scale)
+COLUMNS = [
+    ("ID", "NUMBER", 22, 0, None, None, (fake_cx_Oracle.DB_TYPE_NUMBER, 127, 22, 0, -127)),
+    ("AMOUNT", "NUMBER", 22, 0, 12, 3, (fake_cx_Oracle.DB_TYPE_NUMBER, 17, 22, 12, 3)),
+    ("QUANTITY", "NUMBER", 22, 0, None, 0, (fake_cx_Oracle.DB_TYPE_NUMBER, 39, 22, 38, 0)),            # INTEGER
+    ("RATE", "FLOAT", 22, 0, 126, None, (fake_cx_Oracle.DB_TYPE_NUMBER, 127, 22, 126, -127)),
+    ("NAME", "VARCHAR2", 400, 100, None, None, (fake_cx_Oracle.DB_TYPE_VARCHAR, 100, 400, None, None)),  # VARCHAR2(100 CHAR)
+    ("LOCAL_NAME", "NVARCHAR2", 200, 100, None, None, (fake_cx_Oracle.DB_TYPE_NVARCHAR, 100, 200, None, None)),
+    ("CREATED", "DATE", 7, 0, None, None, (fake_cx_Oracle.DB_TYPE_DATE, 23, None, None, None)),
+    ("UPDATED", "TIMESTAMP(6)", 11, 0, None, 6, (fake_cx_Oracle.DB_TYPE_TIMESTAMP, 23, None, 0, 6)),
+    ("NOTES", "CLOB", 4000, 0, None, None, (fake_cx_Oracle.DB_TYPE_CLOB, None, None, None, None)),
+    ("GUID", "RAW", 16, 0, None, None, (fake_cx_Oracle.DB_TYPE_RAW, 16, 16, None, None)),
+]
+
+
+
+def build_database(n_tables: int, columns: list = COLUMNS) -> FakeDatabase:
+    database = FakeDatabase()
+    for table in range(n_tables):
+        database.add_table(f"OWN{table % 3}", f"TAB_{table}", columns)
+    return database
+
+
+
+def build_data_dict(n_tables: int, columns: list = COLUMNS) -> pd.DataFrame:
+    rows = []
+    for table in range(n_tables):
+        table_name = f"OWN{table % 3}.TAB_{table}"
+        query = f"SELECT {', '.join(column[0] for column in columns)} FROM {table_name}"
+        for column in columns:
+            rows.append({COLUMNA_ORIGEN: ORIGIN, COLUMNA_TABLA: table_name, COLUMNA_CAMPO: column[0], 'CAMPO ORIGEN': column[0], COLUMNA_QUERY: query,
+                         COLUMNA_TIPO: None, COLUMNA_LONGITUD: None, COLUMNA_PRECISION: None, COLUMNA_ESCALA: None})
+    return pd.DataFrame(rows)
+
+
+
+def sessions_for(database: FakeDatabase) -> OracleSessionManager:
+    return OracleSessionManager(connectors={ORIGIN: lambda: fake_cx_Oracle.connect(database=database)})
+
+
+
+def test_describe_query_fetches_no_rows():
+    database = build_database(1)
+    cursor = fake_cx_Oracle.connect(database=database).cursor()
+
+    description = describe_query(cursor, "SELECT ID, NAME FROM OWN0.TAB_0;")
+
+    assert [column[0] for column in description] == ["ID", "NAME"]
+    assert "WHERE 1=0" in database.executed[-1][0]
+    assert database.rows_fetched == 0
+
+
+
+def test_describe_pass_fetches_no_rows(tmp_path):
+    database = build_database(20)
+
+    with sessions_for(database) as sessions:
+        df = fill_types_and_lenghts(build_data_dict(20), str(tmp_path / "Data_Dict.xlsx"), sessions=sessions, use_catalog=False)
+
+    assert len(database.executed) == 20 # Una descripción por query
+    assert database.rows_fetched == 0
+    assert df[COLUMNA_TIPO].notna().all()
+
+
+
+def test_catalog_size_is_the_display_size_of_the_driver():
+    with sessions_for(build_database(1)) as sessions:
+        catalog = harvest_table_columns(sessions, ORIGIN, [("OWN0", "TAB_0")])
+
+    display_sizes = [description[1] if description[1] is not None else '' for *_, description in COLUMNS]
+    assert catalog[COLUMNA_LONGITUD].tolist() == display_sizes
+
+
+
+def test_catalog_and_describe_give_the_same_dictionary(tmp_path):
+    database = build_database(300)
+    metadata_columns = [COLUMNA_TIPO, COLUMNA_LONGITUD, COLUMNA_PRECISION, COLUMNA_ESCALA]
+
+    with sessions_for(database) as sessions:
+        from_catalog = fill_types_and_lenghts(build_data_dict(300), str(tmp_path / "catalog.xlsx"), sessions=sessions, use_catalog=True)
+    catalog_queries = len(database.executed)
+
+    with sessions_for(database) as sessions:
+        from_describe = fill_types_and_lenghts(build_data_dict(300), str(tmp_path / "describe.xlsx"), sessions=sessions, use_catalog=False)
+
+    assert catalog_queries == 1 # 300 tablas x 10 campos en una query de ALL_TAB_COLUMNS, sin describir ninguna query
+    pd.testing.assert_frame_equal(from_catalog[metadata_columns], from_describe[metadata_columns])
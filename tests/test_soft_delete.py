@@ -0,0 +1,67 @@
+import pytest
+
+import Generate_SQL_Code.Soft_Delete as soft_delete
+from Utils.params import *
+from Generate_SQL_Code.Soft_Delete import needs_fch_car_index, needs_fch_car_refresh, soft_delete_update, soft_delete_window
+from Generate_SQL_Code.Tables_Creation_ODS import ODS_Tables_creation_Logic
+
+from test_stored_procedures_stg_to_ods import FCH_CAR_REFRESH, build_data_dict, build_registry, stored_procedure
+
+
+FCH_CAR_INDEX = "INDEX [IX_ORI_DIM_TAB_A_FCH_CAR] NONCLUSTERED (FCH_CAR) INCLUDE (HSH_PK0, REG_ACT)"
+
+
+
+def info_tabla(**options):
+    return build_registry([("OWN.TAB_A", options)]).get("OWN.TAB_A")
+
+
+
+def ods_ddl(**options) -> str:
+    return ODS_Tables_creation_Logic(build_data_dict(["OWN.TAB_A"]), build_registry([("OWN.TAB_A", options)]))['QUERY CREATE'].iloc[0]
+
+
+
+def test_soft_delete_update_text():
+    window = soft_delete_window(info_tabla(**{'INCREMENTAL STG ODS': "AND ODS.FCH_CAR > GETDATE()-1"}))
+
+    assert soft_delete_update("[ods].[ORI_DIM_TAB_A]", "[stg].[ORI_TAB_A]", window) == """UPDATE ODS
+            SET REG_ACT = 0
+            FROM [ods].[ORI_DIM_TAB_A] ODS
+            WHERE ISNULL(ODS.REG_ACT, '') <> '0' AND ODS.FCH_CAR > GETDATE()-1
+            AND NOT EXISTS (SELECT 1 FROM [stg].[ORI_TAB_A] STG WHERE STG.HSH_PK0 = ODS.HSH_PK0);"""
+
+    assert soft_delete_update("[ods].[ORI_DIM_TAB_A]", "[stg].[ORI_TAB_A]", window, top="@BatchSize").startswith("UPDATE TOP (@BatchSize) ODS")
+
+
+
+def test_window_of_days(monkeypatch):
+    monkeypatch.setattr(soft_delete, "SP_SOFT_DELETE_WINDOW_DAYS", 30)
+
+    assert soft_delete_window(info_tabla()) == " AND ODS.FCH_CAR >= DATEADD(DAY, -30, GETDATE())"
+
+
+
+@pytest.mark.parametrize("options, window_days, expected", [
+    ({INFO_PKS_SOFT_DELETE: "ANTI_JOIN", 'INCREMENTAL STG ODS': "AND ODS.FCH_CAR > GETDATE()-1"}, 0, True),
+    ({INFO_PKS_SOFT_DELETE: "ANTI_JOIN"}, 30, True),
+    ({INFO_PKS_SOFT_DELETE: "ANTI_JOIN"}, 0, False),   # Sin ventana: toda la tabla, el índice no sirve
+    ({INFO_PKS_SOFT_DELETE: "MERGE", 'INCREMENTAL STG ODS': "AND ODS.FCH_CAR > GETDATE()-1"}, 0, False),
+    ({INFO_PKS_SOFT_DELETE: "ANTI_JOIN", INFO_PKS_WATERMARK_COLUMN: "COL_1"}, 30, False),
+])
+def test_fch_car_index_in_the_ods_ddl(monkeypatch, options, window_days, expected):
+    monkeypatch.setattr(soft_delete, "SP_SOFT_DELETE_WINDOW_DAYS", window_days)
+
+    assert needs_fch_car_index(info_tabla(**options), "OWN.TAB_A") == expected
+    assert (FCH_CAR_INDEX in ods_ddl(**options)) == expected
+
+
+
+def test_anti_join_window_refreshes_fch_car_before_marking(monkeypatch):
+    monkeypatch.setattr(soft_delete, "SP_SOFT_DELETE_WINDOW_DAYS", 30)
+    sp = stored_procedure("OWN.TAB_A", **{INFO_PKS_SOFT_DELETE: "ANTI_JOIN"})
+
+    assert needs_fch_car_refresh(info_tabla(**{INFO_PKS_SOFT_DELETE: "ANTI_JOIN"}), "OWN.TAB_A")
+    assert "WHEN NOT MATCHED BY SOURCE" not in sp
+    assert sp.index("MERGE [ods]") < sp.index(FCH_CAR_REFRESH) < sp.index("SET REG_ACT = 0")
+    assert "AND ODS.FCH_CAR >= DATEADD(DAY, -30, GETDATE())" in sp
@@ -0,0 +1,96 @@
+import pandas as pd
+
+from Utils.params import *
+from Utils.Utils import clean_columns
+from Utils.class_TableInfoRegistry import TableInfoRegistry
+from Generate_SQL_Code.Tables_Creation_ODS import clean_df_ODS
+from Generate_SQL_Code.Stored_Procedures_STG_to_ODS import generate_stored_procedure
+from Generate_SQL_Code.Tables_Creation_STG import get_stg_post_load, stg_post_load_sql
+
+
+HASH_CONDITION = "WHEN MATCHED AND (ODS.HSH_ROW <> STG.HSH_ROW"
+FCH_CAR_REFRESH = "SET FCH_CAR = STG.FCH_CAR"
+
+
+
+def build_data_dict(tables: list) -> pd.DataFrame:
+    rows = [{'ORIGEN': "ORIGIN1", STG_TABLAS: table, STG_CAMPOS: field, STG_TIPO: oracle_type, STG_SIZE: 10, STG_PRECISION: None, STG_SCALE: None,
+             ODS_TABLAS: None, ODS_CAMPOS: None, ODS_TIPO: None, ODS_SIZE: None, ODS_PRECISION: None, ODS_SCALE: None}
+            for table in tables for field, oracle_type in [("COL_0", "DB_TYPE_VARCHAR"), ("COL_1", "DB_TYPE_NUMBER")]]
+    return clean_df_ODS(pd.DataFrame(rows))
+
+
+
+def build_registry(info_pks: list) -> TableInfoRegistry:
+    rows = [{'TABLAS ORIGEN': table, 'TIPO TABLA': "Dimension", 'INCREMENTAL ORACLE STG': None, 'INCREMENTAL STG ODS': None, 'PK': "COL_0", **options}
+            for table, options in info_pks]
+    return TableInfoRegistry(clean_columns(pd.DataFrame(rows)))
+
+
+
+def stored_procedure(table: str, **options) -> str:
+    result_df = generate_stored_procedure(build_data_dict([table]), build_registry([(table, options)]))
+    return result_df['QUERY CREATE'].iloc[0]
+
+
+
+def test_merge_without_window_keeps_fch_car_of_unchanged_rows():
+    sp = stored_procedure("OWN.TAB_A")
+
+    assert HASH_CONDITION in sp
+    assert "WHEN NOT MATCHED BY SOURCE THEN" in sp
+    assert FCH_CAR_REFRESH not in sp # Sin ventana: se revisan todos los registros de ODS
+
+
+
+def test_merge_with_fch_car_window_refreshes_fch_car_of_unchanged_rows():
+    sp = stored_procedure("OWN.TAB_B", **{'INCREMENTAL STG ODS': "AND ODS.FCH_CAR > GETDATE()-1"})
+
+    assert HASH_CONDITION in sp
+    assert "WHEN NOT MATCHED BY SOURCE AND ODS.FCH_CAR > GETDATE()-1 THEN" in sp
+    assert """UPDATE ODS
+            SET FCH_CAR = STG.FCH_CAR
+            FROM [ods].[ORI_DIM_TAB_B] ODS
+            INNER JOIN [stg].[ORI_TAB_B] STG ON STG.HSH_PK0 = ODS.HSH_PK0
+            WHERE (ODS.FCH_CAR < STG.FCH_CAR OR ODS.FCH_CAR IS NULL);""" in sp
+    assert sp.index("MERGE [ods]") < sp.index(FCH_CAR_REFRESH)
+
+
+
+def test_merge_with_window_on_other_column_keeps_fch_car():
+    sp = stored_procedure("OWN.TAB_C", **{'INCREMENTAL STG ODS': "AND ODS.COL_1 > 100"})
+
+    assert FCH_CAR_REFRESH not in sp
+
+
+
+def test_batched_merge_refreshes_fch_car_of_each_batch():
+    sp = stored_procedure("OWN.TAB_D", **{'INCREMENTAL STG ODS': "AND ODS.FCH_CAR > GETDATE()-1", INFO_PKS_MERGE_BATCH_SIZE: "100000"})
+
+    assert "WHERE (ODS.FCH_CAR < STG.FCH_CAR OR ODS.FCH_CAR IS NULL) AND (@LastKey IS NULL OR STG.HSH_PK0 > @LastKey) AND STG.HSH_PK0 <= @MaxKey;" in sp
+    assert sp.index("SET @Rows = @@ROWCOUNT;") < sp.index(FCH_CAR_REFRESH) < sp.index("COMMIT TRANSACTION;")
+
+
+
+def test_batched_merge_walks_stg_by_key_ranges_on_the_clustered_index():
+    options = {INFO_PKS_MERGE_BATCH_SIZE: "100000", INFO_PKS_STG_POST_LOAD: "NONE"}
+    sp = stored_procedure("OWN.TAB_E", **options)
+
+    assert "DECLARE @BatchSize int = 100000;" in sp
+    assert """SELECT TOP (@BatchSize) HSH_PK0
+                    FROM [stg].[ORI_TAB_E]
+                    WHERE @LastKey IS NULL OR HSH_PK0 > @LastKey
+                    ORDER BY HSH_PK0""" in sp
+    assert "WHERE (@LastKey IS NULL OR HSH_PK0 > @LastKey) AND HSH_PK0 <= @MaxKey" in sp
+    assert "SET @LastKey = @MaxKey;" in sp
+
+    # El recorrido por rangos necesita el índice clustered de STG sobre HSH_PK0, aunque Info_Pks diga NONE
+    post_load = get_stg_post_load(build_registry([("OWN.TAB_E", options)]).get("OWN.TAB_E"), "OWN.TAB_E")
+    assert post_load == "INDEX"
+    assert stg_post_load_sql("[stg].[ORI_TAB_E]", post_load).startswith("CREATE CLUSTERED INDEX [CIX_ORI_TAB_E_HSH_PK0] ON [stg].[ORI_TAB_E] ([HSH_PK0])")
+
+
+
+def test_stg_post_load_without_batches_follows_info_pks():
+    assert get_stg_post_load(build_registry([("OWN.TAB_F", {})]).get("OWN.TAB_F"), "OWN.TAB_F") == STG_POST_LOAD
+    assert get_stg_post_load(build_registry([("OWN.TAB_F", {INFO_PKS_STG_POST_LOAD: "statistics"})]).get("OWN.TAB_F"), "OWN.TAB_F") == "STATISTICS"
@@ -0,0 +1,51 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from Generate_SSIS_Package.SSIS_Streaming_Writer import DTSX_Stream_Writer, add_tables_placeholder
+
+
+def build_skeleton() -> ET.Element:
+    root = ET.Element("Package")
+    add_tables_placeholder(ET.SubElement(root, "Executables"))
+    return root
+
+
+
+def test_clean_close_replaces_the_package(tmp_path):
+    output_file_path = tmp_path / "ORIGIN.dtsx"
+    output_file_path.write_text("old package", encoding="utf-8")
+
+    with DTSX_Stream_Writer(str(output_file_path), build_skeleton()) as writer:
+        writer.next_section()
+        writer.write_element(ET.Element("Table"))
+        assert output_file_path.read_text(encoding="utf-8") == "old package" # Mientras se escribe, el paquete anterior sigue igual
+
+    assert ET.parse(output_file_path).getroot().find("Executables/Table") is not None
+    assert not os.path.exists(f"{output_file_path}.tmp")
+
+
+
+def test_error_keeps_the_previous_package_and_deletes_the_temporary_file(tmp_path):
+    output_file_path = tmp_path / "ORIGIN.dtsx"
+    output_file_path.write_text("old package", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        with DTSX_Stream_Writer(str(output_file_path), build_skeleton()) as writer:
+            writer.next_section()
+            raise RuntimeError("generation failed")
+
+    assert output_file_path.read_text(encoding="utf-8") == "old package"
+    assert not os.path.exists(f"{output_file_path}.tmp")
+
+
+
+def test_error_without_previous_package_leaves_nothing(tmp_path):
+    output_file_path = tmp_path / "ORIGIN.dtsx"
+
+    with pytest.raises(RuntimeError):
+        with DTSX_Stream_Writer(str(output_file_path), build_skeleton()):
+            raise RuntimeError("generation failed")
+
+    assert os.listdir(tmp_path) == []
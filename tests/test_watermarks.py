@@ -0,0 +1,40 @@
+import re
+
+from Utils.params import *
+from Generate_SQL_Code.Watermarks import WATERMARK_NUMBER_FORMAT, advance_watermark_sql, watermark_filter, watermark_query_expression
+
+
+NLS_ARGUMENT = "'NLS_NUMERIC_CHARACTERS=''.,'''"
+
+
+
+def test_number_filter_doesnt_depend_on_the_session_nls():
+    where = watermark_filter("ID_MOV", "DB_TYPE_NUMBER")
+
+    assert where == f"WHERE ID_MOV >= TO_NUMBER('{WATERMARK_INITIAL_NUMBER}', '{WATERMARK_NUMBER_FORMAT}', {NLS_ARGUMENT})"
+
+
+
+def test_saved_numbers_fit_the_format_read_by_oracle():
+    integer_digits, decimal_digits = WATERMARK_NUMBER_FORMAT.split("D")
+
+    # decimal(38, 10): 28 cifras enteras y 10 decimales, con '.' (sin exponente, que el formato no lee)
+    assert (len(integer_digits), len(decimal_digits)) == (28, 10)
+    assert "CONVERT(nvarchar(64), CONVERT(decimal(38, 10), ROUND(MAX(ID_MOV), 10, 1)))" in advance_watermark_sql("[stg].[ORI_MOV]", "ID_MOV", is_date=False)
+    assert re.fullmatch(r"-?\d{1,28}(\.\d{1,10})?", WATERMARK_INITIAL_NUMBER)
+
+
+
+def test_expression_replaces_only_the_value():
+    query = f"SELECT ID_MOV FROM OWN.MOV {watermark_filter('ID_MOV', 'DB_TYPE_NUMBER')}"
+
+    initial_value, expression = watermark_query_expression(query)
+
+    assert initial_value == WATERMARK_INITIAL_NUMBER
+    assert expression == f"\"SELECT ID_MOV FROM OWN.MOV WHERE ID_MOV >= TO_NUMBER('\" + @[User::WATERMARK_VALUE] + \"', '{WATERMARK_NUMBER_FORMAT}', {NLS_ARGUMENT})\""
+
+
+
+def test_date_filter_keeps_its_format():
+    assert watermark_filter("FCH_MOD", "DB_TYPE_DATE") == f"WHERE FCH_MOD >= TO_DATE('{WATERMARK_INITIAL_DATE}', 'YYYY-MM-DD HH24:MI:SS')"
+    assert "CONVERT(nvarchar(19), MAX(FCH_MOD), 120)" in advance_watermark_sql("[stg].[ORI_MOV]", "FCH_MOD", is_date=True)